@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+
+"""what the test_*.py files share: python -m pytest
+
+run and check are fixtures, so a test asks for them by name"""
+
+import io
+import sys
+import warnings
+
+import pytest
+
+import mouseExec
+
+
+# the peephole pass off, which is the reference, and on
+MODES = [{"optimize": False}, {"optimize": True}]
+
+
+def _run(source, **kwds):
+    """(the stack, the warnings) running source on a fresh Mouse(**kwds) left"""
+    mouse = mouseExec.Mouse(**kwds)
+    saved = sys.stdout
+    sys.stdout = io.StringIO()
+    try:
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            mouse.execute(list(source))
+    finally:
+        sys.stdout = saved
+    return mouse._stack.inspect(), [str(warning.message) for warning in caught]
+
+
+def _check(source, stack, warned = (), modes = MODES):
+    """source leaves stack, and warns with messages starting with warned,
+    in every one of modes"""
+    for kwds in modes:
+        left, caught = _run(source, **kwds)
+        assert left == stack, kwds
+        assert len(caught) == len(warned), (kwds, caught)
+        for message, start in zip(caught, warned):
+            assert message.startswith(start), (kwds, message)
+
+
+@pytest.fixture
+def run():
+    return _run
+
+
+@pytest.fixture
+def check():
+    return _check
@@ -2,13 +2,40 @@
 
 """mouse16 - a concatenative stack-based language
 
-Usage: mouse16.py [ -nth ] [ -s | -v ] [ --lib=FILE ] [ SCRIPT... ]
+Usage: mouse16.py [ -nth ] [ -s | -v ] [ --lib=FILE ] [ --depth=N ] [ --ropes ]
+                  [ --workers=N ] [ --chunksize=N ] [ --jit ]
+                  [ --load=FILE ] [ --dump=FILE ] [ --metrics=FILE ] [ --memprofile ]
+                  [ SCRIPT... ]
+       mouse16.py --each [ --sep=STR ] [ --lib=FILE ] [ --depth=N ] [ --ropes ]
+                  [ --workers=N ] [ --chunksize=N ] [ --jit ] [ --metrics=FILE ]
+                  [ --memprofile ] SCRIPT
+       mouse16.py --serve [ --socket=PATH ] [ --pool=N ] [ --lib=FILE ]
+                  [ --depth=N ] [ --ropes ] [ --workers=N ] [ --chunksize=N ] [ --jit ]
 
 Options:
 
     -n,        --dry        don't write anything to disk/network
     -t,        --trace      show a detailed, realtime traceback
-    -lFILE,    --lib=FILE   load FILE as a library (WIP)
+    -lFILE,    --lib=FILE   load FILE as a library, run once & cached
+               --depth=N    how deeply calls may nest [default: 10000]
+               --ropes      join & reverse big strings without copying
+               --workers=N  how many processes ¨ maps over [default: 0]
+               --chunksize=N  how many elements ¨ sends at once [default: 0]
+               --jit        compile hot numeric loops into Python
+               --load=FILE  start from the stacks dumped in FILE (- for stdin)
+               --dump=FILE  dump the stacks to FILE at the end (- for stdout,
+                            and what the scripts write goes to stderr)
+               --metrics=FILE  write what ran, as JSON, to FILE at the end
+                            (- for stderr; see mouseMetrics)
+               --memprofile  measure what each operator and source position
+                            allocates, and print the top ones to stderr at
+                            the end (slow; see mouseMemprof)
+               --each       run SCRIPT once for each line of stdin (see mouseStream)
+               --sep=STR    split stdin at STR instead (\\t, \\0 and so on work)
+               --serve      run scripts sent by mouseClient.py, from a pool
+                            of interpreters kept ready behind a Unix socket
+               --socket=PATH  the socket to serve on (see mouseClient.py)
+               --pool=N     how many interpreters to keep ready [default: 4]
     -s,        --silent     don't print errors or warnings
     -v,        --verbose    log everything
     -h,        --help       print this help & exit
@@ -38,19 +65,13 @@ __all__ = [
     "interpret",
     "Stack",
     "Mouse",
-    "CaptainHook",
     "LiteralTable",
 ]
 
-# mostly for self-interpretation and non-self-recursivity
-sys.setrecursionlimit(sys.getrecursionlimit() * 3)
-
 # affects underflowerror behaviour and shebang interpretation
 _FROMFILE = False
 # logging messages use the filename
 _FILENAME = "stdin (typewriter)"
-# programmatical check if the parser's jumped or not -- used by LiteralTable
-_U_READ_AHEAD = False
 # only write to tty fds
 _DRYRUN = False
 # like python -m trace --trace <FILE>
@@ -59,14 +80,14 @@ _TRACERT = False
 _SILENT = False
 # print *everything*
 _VERBOSE = False
-# over importing string -- also improves performance
-DIGITS = frozenset("0123456789.")
 
 def main() -> None:
     """main entry point (hopefully)"""
     global _FROMFILE, _FILENAME, _DRYRUN, _TRACERT, _SILENT, _VERBOSE
 
-    args = docopt.docopt(__doc__, version=__file__ + " " + __version__)
+    global mouse
+
+    args = docopt(__doc__, version=__file__ + " " + __version__)
 
     _DRYRUN  = args["-n"]
     _TRACERT = args["-t"]
@@ -75,48 +96,138 @@ def main() -> None:
 
     fnames = args["SCRIPT"]  # type: str
 
-    if len(fnames) == 0:
-        interpret(args)
+    options = dict(
+        depth=int(args["--depth"]), ropes=args["--ropes"],
+        # 0 leaves it to mouseParallel
+        workers=int(args["--workers"]) or None,
+        chunksize=int(args["--chunksize"]) or None,
+        jit=args["--jit"],
+        memprofile=args["--memprofile"],
+        # --metrics counts each instruction too
+        counting=bool(args["--metrics"]),
+    )
+
+    if args["--serve"]:
+        import mouseServe
+        mouseServe.serve(
+            args["--socket"], int(args["--pool"]), args["--lib"], **options
+        )
+        exit(0)
+
+    mouse = mouseExec.Mouse(**options)
 
-    elif len(fnames) == 1:
+    if args["--each"]:
+        import codecs
+        import mouseStream
+        if args["--lib"]:
+            mouse.load_library(args["--lib"])
+        with open(fnames[0], "r") as filio:
+            source = filio.read()
+        sep = "\n"
+        if args["--sep"]:
+            sep = codecs.decode(args["--sep"], "unicode_escape")
         try:
-            os.stat(fnames[0])
-        except IOError as error:
-            print(error,
-                "\nstat: cannot stat '" + fnames[0] +
-                "': no such file or directory, interpreting using stdio instead\n")
-            interpret(args)
+            mouseStream.each(mouse, source, sep=sep)
+        finally:
+            if not _wrap_up(args) and sys.exc_info()[0] is None:
+                exit(2)
+        exit(0)
+
+    if args["--lib"]:
+        mouse.load_library(args["--lib"])
+
+    if args["--load"]:
+        import mouseDump
+        try:
+            mouseDump.load_file(mouse, args["--load"])
+        except (IOError, OSError, ValueError) as error:
+            print("can't load the stacks from " + args["--load"] + ": " + str(error))
             exit(2)
-        else:
-            _FROMFILE = True
-            _FILENAME = fnames[0]
-            try:
-                filio = open(_FILENAME, 'r')
-                prog = list(filio.read())
-            finally:
-                filio.close()
-            mouse.execute(prog)
-            exit(0)
 
-    # open multiple files at once
-    elif len(fnames) > 1:
-        for fname in fnames:
+    # with the stacks dumped to stdout, what the scripts write goes to
+    # stderr instead, so the dump can be piped straight into --load=-
+    stdout = sys.stdout
+    if args["--dump"] == "-":
+        sys.stdout = sys.stderr
+
+    try:
+        if len(fnames) == 0:
+            interpret(args)
+
+        elif len(fnames) == 1:
             try:
-                os.stat(fname)
+                os.stat(fnames[0])
             except IOError as error:
                 print(error,
-                    "\nstat: cannot stat '" + fname +
-                    "': no such file or directory")
+                    "\nstat: cannot stat '" + fnames[0] +
+                    "': no such file or directory, interpreting using stdio instead\n")
+                interpret(args)
+                exit(2)
             else:
                 _FROMFILE = True
-                _FILENAME = fname
+                _FILENAME = fnames[0]
                 try:
                     filio = open(_FILENAME, 'r')
                     prog = list(filio.read())
                 finally:
                     filio.close()
                 mouse.execute(prog)
-        exit(0)
+                exit(0)
+
+        # open multiple files at once
+        elif len(fnames) > 1:
+            for fname in fnames:
+                try:
+                    os.stat(fname)
+                except IOError as error:
+                    print(error,
+                        "\nstat: cannot stat '" + fname +
+                        "': no such file or directory")
+                else:
+                    _FROMFILE = True
+                    _FILENAME = fname
+                    try:
+                        filio = open(_FILENAME, 'r')
+                        prog = list(filio.read())
+                    finally:
+                        filio.close()
+                    mouse.execute(prog)
+            exit(0)
+    finally:
+        sys.stdout = stdout
+        # however the scripts ended, hand on what they left. anything that
+        # can't be written is reported by itself, not raised over whatever
+        # the scripts raised; if they didn't, the exit status says so
+        if not _wrap_up(args) and sys.exc_info()[0] in (None, SystemExit):
+            exit(2)
+
+
+def _wrap_up(args) -> bool:
+    """write the stack dump, metrics and memory profile args ask for,
+    printing why to stderr for each that can't be; whether they all were"""
+    jobs = []  # type: List[Tuple[str, Callable[[], None]]]
+    if args["--dump"]:
+        import mouseDump
+        jobs.append((
+            "dump the stacks to " + args["--dump"],
+            lambda: mouseDump.dump_file(mouse, args["--dump"]),
+        ))
+    if args["--metrics"]:
+        jobs.append((
+            "write the metrics to " + args["--metrics"],
+            lambda: mouse.metrics.dump_file(args["--metrics"]),
+        ))
+    if args["--memprofile"]:
+        jobs.append(("report the allocations", mouse.memprofile.report))
+
+    done = True
+    for what, job in jobs:
+        try:
+            job()
+        except (IOError, OSError, TypeError, ValueError) as error:
+            print("can't " + what + ": " + str(error), file=sys.stderr)
+            done = False
+    return done
 
 def interpret(args) -> None:
     """an interpreter: it reads stdin."""
@@ -148,5 +259,4 @@ def interpret(args) -> None:
 
 
 if __name__ == "__main__":
-    mouse = mouseExec.Mouse()
     main()
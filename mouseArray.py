@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+"""packed numeric arrays for mouse16
+
+an array value is an array.array of doubles: + - * / < > = work on them
+element by element, against another array (as far as the shorter one goes)
+or against a number, which is used for every element. one operator on an
+array of a million numbers is one dispatch, not a million.
+
+NumPy is used to do the work if it's installed, and the pure Python
+array module otherwise; either way, the values on the stack are plain
+array.array objects. (NumPy sums in a different order, so a total can
+differ in its last bits.)"""
+
+import array
+import itertools
+import operator
+
+from mouseClutter import *
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+__all__ = [
+    "ARRAY",
+    "TYPECODE",
+    "new",
+    "elementwise",
+    "divmod_",
+    "negate",
+    "total",
+    "iota",
+]
+
+
+ARRAY = array.array
+
+# every array holds C doubles
+TYPECODE = "d"
+
+# BINOPS operator name -> (the Python operator, the NumPy ufunc name)
+_ELEMENTWISE = {
+    "add": (operator.add, "add"),
+    "sub": (operator.sub, "subtract"),
+    "mlt": (operator.mul, "multiply"),
+    "lss": (operator.lt,  "less"),
+    "gtr": (operator.gt,  "greater"),
+    "equ": (operator.eq,  "equal"),
+}
+
+
+def new(values = ()):
+    """a new array of the numbers in values"""
+    return array.array(TYPECODE, values)
+
+
+def _fromnumpy(result):
+    arr = array.array(TYPECODE)
+    arr.frombytes(result.astype(numpy.float64).tobytes())
+    return arr
+
+
+def _operands(x, y):
+    """x and y as NumPy arrays of equal length, or numbers, without copying"""
+    if isinstance(x, ARRAY):
+        x = numpy.frombuffer(x, dtype=numpy.float64)
+    if isinstance(y, ARRAY):
+        y = numpy.frombuffer(y, dtype=numpy.float64)
+    if isinstance(x, numpy.ndarray) and isinstance(y, numpy.ndarray):
+        n = min(len(x), len(y))
+        x, y = x[:n], y[:n]
+    return x, y
+
+
+def _pairs(x, y):
+    """x and y as iterables to zip together, a number repeating forever"""
+    return (
+        x if isinstance(x, ARRAY) else itertools.repeat(x),
+        y if isinstance(y, ARRAY) else itertools.repeat(y),
+    )
+
+
+def elementwise(name, x, y):
+    """the array of x name y, element by element: a comparison gives 1 or 0"""
+    func, ufunc = _ELEMENTWISE[name]
+    if not isnone(numpy):
+        return _fromnumpy(getattr(numpy, ufunc)(*_operands(x, y)))
+    return array.array(TYPECODE, map(func, *_pairs(x, y)))
+
+
+def divmod_(x, y):
+    """(x modulo y, x divided by y) as two arrays, like / on numbers
+    raises ZeroDivisionError if any divisor is zero"""
+    if not isnone(numpy):
+        x, y = _operands(x, y)
+        if not numpy.all(y):
+            raise ZeroDivisionError("array division by zero")
+        return _fromnumpy(numpy.mod(x, y)), _fromnumpy(x / y)
+    x, y = _pairs(x, y)
+    x, y = itertools.tee(x), itertools.tee(y)
+    return (
+        array.array(TYPECODE, map(operator.mod, x[0], y[0])),
+        array.array(TYPECODE, map(operator.truediv, x[1], y[1])),
+    )
+
+
+def negate(arr):
+    """every element of arr with its sign flipped"""
+    if not isnone(numpy):
+        return _fromnumpy(-numpy.frombuffer(arr, dtype=numpy.float64))
+    return array.array(TYPECODE, map(operator.neg, arr))
+
+
+def total(arr):
+    """the sum of the elements of arr"""
+    if not isnone(numpy):
+        return float(numpy.frombuffer(arr, dtype=numpy.float64).sum())
+    return float(sum(arr))
+
+
+def iota(n):
+    """the array 0, 1, ... n-1"""
+    if not isnone(numpy):
+        return _fromnumpy(numpy.arange(n, dtype=numpy.float64))
+    return array.array(TYPECODE, range(n))
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+"""mouseBench - timings for the mouse16 interpreter
+
+Usage: mouseBench.py [ -n N ] [ SUITE... ]
+
+Options:
+
+    -n N, --number=N   how many times to run each case [default: 100000]
+    -h, --help         print this help & exit
+
+Suites: ops, progs, records. Omitting SUITE runs all of them.
+"""
+
+import io
+import sys
+import timeit
+import warnings
+
+import mouseExec
+import mouseStack
+import mouseStream
+
+from docopt import docopt
+
+
+__all__ = [
+    "bench_ops",
+    "bench_progs",
+    "bench_records",
+    "main",
+]
+
+
+# name -> (x, y, operator name): x is pushed first, then y
+OPCASES = [
+    ("add num+num",    1,           2,           "add"),
+    ("add str+str",    "ab",        "cd",        "add"),
+    ("add str+num",    "abc",       3,           "add"),
+    ("add numstr+num", "12",        3,           "add"),
+    ("sub str-num",    "abcdef",    2,           "sub"),
+    ("mlt str*str",    "abcd" * 16, "efgh" * 16, "mlt"),
+    ("equ str=str",    "abcd" * 16, "abcd" * 16, "equ"),
+    ("equ str=num",    "abc",       294,         "equ"),
+    ("dmd num/num",    7,           2,           "dmd"),
+    ("lss num<num",    1,           2,           "lss"),
+]
+
+
+def _report(name, seconds, number):
+    if seconds / number < 1e-3:
+        print("{:<32} {:>9.0f} ns/op".format(name, seconds / number * 1e9))
+    else:
+        print("{:<32} {:>9.3f} ms/op".format(name, seconds / number * 1e3))
+
+
+def bench_ops(number):
+    """time single operators on one Stack, per operand type pair"""
+    stk = mouseStack.Stack()
+    raw = stk.inspect()
+
+    for name, x, y, opname in OPCASES:
+        op = getattr(stk, opname)
+
+        def case():
+            raw.append(x)
+            raw.append(y)
+            op()
+            raw.clear()
+
+        _report(name, min(timeit.repeat(case, number=number, repeat=3)), number)
+
+
+# name -> mouse source; each is run from a fresh interpreter
+PROGRAMS = [
+    ("arith",     "2 2+5= 1 3*7/ 4 4<+ 9 2-_ 6 6=" * 20),
+    ("strings",   '"ab" "cd"+ "x" 3* "ab"_ "abcabc" "b"- "q" "q"=' * 20),
+    ("countdown", "2000 $[1-5\\]"),
+    ("whileloop", "2000$(1-$)"),
+    ("stackloop", "0 2000$(%1+%1-$)"),
+    ("loopsum",   "0 10000$(%^+%1-$)"),
+    ("arraysum",  "10000⍳Σ"),
+    ("arraymap",  "2000⍳{$*1+}¨Σ"),
+    ("polyloop",  "0 2000$(%^$*3*^2*-1++%1-$)"),
+    ("commented", "1 2+ ; sum of one and two\n" * 20),
+    ("comments",  "¶ the sum of one and two\n1 2+\n" * 20),
+    ("quotations", "0 1000{$}{1-%{1+}`%}¦"),
+    ("words",      '{1+}"inc": 0 1000{$}{1-%inc%}¦'),
+    ("tailcalls",  '{1-$[loop]}"loop": 2000 loop'),
+    ("evalstring", '0 1000$(1-%"1+"`%$)'),
+    ("pyescape",   '0 1000$(%"!!PY!!stack.push(stack.pop() + 1)"`%1-$)'),
+    ("concat",     '""2000$(1-%"' + "abcdefghij" * 5 + '"+%$)'),
+]
+
+# modes a program is timed in: name -> Mouse() keyword arguments
+MODES = [
+    ("reference", {"optimize": False}),
+    ("optimized", {}),
+    ("ropes",     {"ropes": True}),
+    ("jit",       {"jit": True}),
+]
+
+
+def bench_progs(number):
+    """time compiling, then running, whole programs in each interpreter mode"""
+    number = max(1, number // 1000)
+
+    for name, source in PROGRAMS:
+        for mode, kwds in MODES:
+            mouse = mouseExec.Mouse(**kwds)
+            prog  = mouse.compile(source)
+
+            def compile_case():
+                mouse.compile(source)
+
+            def run_case():
+                mouse._stack.clean()
+                mouse._retstk.clean()
+                mouse.run(prog)
+
+            stdout, sys.stdout = sys.stdout, io.StringIO()
+            try:
+                compiling = min(timeit.repeat(compile_case, number=number, repeat=3))
+                running   = min(timeit.repeat(run_case, number=number, repeat=3))
+            finally:
+                sys.stdout = stdout
+            _report(name + " " + mode + " compile", compiling, number)
+            _report(name + " " + mode + " run", running, number)
+
+
+_NUMBERS = "".join(str(n) + "\n" for n in range(1000))
+
+# name -> (mouse source, the input it streams through, the separator)
+STREAMS = [
+    ("square",  "$*",        _NUMBERS,         "\n"),
+    ("tag",     '"<"%+">"+', "word\n" * 1000, "\n"),
+    ("printed", "$!10,",     _NUMBERS,         "\n"),
+    ("fields",  "2*",        "ab;" * 1000,     ";"),
+]
+
+
+def bench_records(number):
+    """time streaming records through a program, as --each does"""
+    number = max(1, number // 10000)
+
+    for name, source, text, sep in STREAMS:
+        mouse = mouseExec.Mouse()
+        count = []
+
+        def case():
+            count.append(
+                mouseStream.each(mouse, source, io.StringIO(text), io.StringIO(), sep)
+            )
+
+        seconds = min(timeit.repeat(case, number=number, repeat=3))
+        records = count[-1] * number
+        print("{:<32} {:>9.0f} records/s".format(name + " each", records / seconds))
+
+
+SUITES = {
+    "ops":     bench_ops,
+    "progs":   bench_progs,
+    "records": bench_records,
+}
+
+
+def main():
+    args = docopt(__doc__)
+    number = int(args["--number"])
+
+    # the benchmarks exercise type errors on purpose
+    warnings.simplefilter("ignore")
+
+    for suite in args["SUITE"] or sorted(SUITES):
+        print("# " + suite)
+        SUITES[suite](number)
+
+
+if __name__ == "__main__":
+    main()
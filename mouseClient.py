@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+"""mouseClient - run mouse16 scripts on a mouse16.py --serve daemon
+
+Usage: mouseClient.py [ --socket=PATH ] ( -e CODE | SCRIPT )
+
+Options:
+
+    -e CODE,   --eval=CODE    run CODE instead of a script file
+               --socket=PATH  the daemon's socket (by default $MOUSE16_SOCKET,
+                              or mouse16-UID.sock in $TMPDIR)
+    -h,        --help         print this help & exit
+
+whatever is piped to stdin goes to the script's ?, and the script's output
+and exit status come back as if it had run here. this only imports the
+standard library, so it starts in a fraction of the time mouse16.py does.
+
+the wire format (also used by mouseServe) is a stream of frames: a kind
+byte, a 4 byte big-endian length, then that many bytes of payload."""
+
+import os
+import socket
+import struct
+import sys
+
+
+__all__ = [
+    "SOCKET",
+    "send",
+    "recv",
+    "run",
+    "main",
+]
+
+
+# the socket a daemon listens on, if none is given
+SOCKET = os.environ.get("MOUSE16_SOCKET") or os.path.join(
+    os.environ.get("TMPDIR", "/tmp"), "mouse16-" + str(os.getuid()) + ".sock"
+)
+
+FRAME = struct.Struct(">cI")
+
+# request frames, client -> daemon
+SCRIPT = b"S"  # the text of a script
+PATH   = b"P"  # the path of a script for the daemon to read
+STDIN  = b"I"  # what the script's stdin holds
+END    = b"E"  # the request's complete
+
+# response frames, daemon -> client
+STDOUT = b"O"  # some of what the script wrote to stdout
+STDERR = b"R"  # some of what it wrote to stderr (warnings, errors)
+EXIT   = b"X"  # its exit status, a 4 byte big-endian int; the last frame
+
+
+def send(sock, kind, payload = b""):
+    """send one frame"""
+    sock.sendall(FRAME.pack(kind, len(payload)) + payload)
+
+
+def _recvall(sock, n):
+    """exactly n bytes from sock, or None if it closes first"""
+    chunks = []  # type: List[bytes]
+    while n:
+        chunk = sock.recv(min(n, 1 << 16))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv(sock):
+    """(kind, payload) of the next frame, or (None, b"") at the end"""
+    head = _recvall(sock, FRAME.size)
+    if head is None:
+        return None, b""
+    kind, size = FRAME.unpack(head)
+    payload = _recvall(sock, size) if size else b""
+    if payload is None:
+        return None, b""
+    return kind, payload
+
+
+def run(script = None, path = None, stdin = b"", sockpath = SOCKET,
+        out = None, err = None):
+    """run a script's text (or the script at path) on the daemon at
+    sockpath, writing what it writes to the binary files out and err
+    (sys.stdout's and sys.stderr's buffers by default); its exit status"""
+    out = sys.stdout.buffer if out is None else out
+    err = sys.stderr.buffer if err is None else err
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(sockpath)
+        if path is None:
+            send(sock, SCRIPT, script.encode("utf-8"))
+        else:
+            send(sock, PATH, os.path.abspath(path).encode("utf-8"))
+        if len(stdin):
+            send(sock, STDIN, stdin)
+        send(sock, END)
+        while True:
+            kind, payload = recv(sock)
+            if kind == STDOUT:
+                out.write(payload)
+                out.flush()
+            elif kind == STDERR:
+                err.write(payload)
+                err.flush()
+            elif kind == EXIT:
+                return struct.unpack(">i", payload)[0]
+            else:
+                err.write(b"mouseClient: the daemon hung up\n")
+                return 1
+
+
+def _usage(status):
+    print(__doc__)
+    sys.exit(status)
+
+
+def main():
+    """parse argv by hand: docopt is worth importing only in the daemon"""
+    args = sys.argv[1:]
+    sockpath, code, script = SOCKET, None, None
+    while len(args):
+        arg = args.pop(0)
+        if arg in ("-h", "--help"):
+            _usage(0)
+        elif arg.startswith("--socket="):
+            sockpath = arg[len("--socket="):]
+        elif arg == "--socket" and len(args):
+            sockpath = args.pop(0)
+        elif arg.startswith("--eval="):
+            code = arg[len("--eval="):]
+        elif arg in ("-e", "--eval") and len(args):
+            code = args.pop(0)
+        elif arg.startswith("-e") and len(arg) > 2:
+            code = arg[2:]
+        elif script is None and not arg.startswith("-"):
+            script = arg
+        else:
+            _usage(2)
+    if (code is None) == (script is None):
+        _usage(2)
+
+    stdin = b"" if sys.stdin.isatty() else sys.stdin.buffer.read()
+    try:
+        status = run(code, script, stdin, sockpath)
+    except OSError as error:
+        print("mouseClient: can't reach a daemon at " + sockpath + ": " + str(error), file=sys.stderr)
+        status = 2
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
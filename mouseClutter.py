@@ -1,3 +1,5 @@
+import functools
+
 isnum    = lambda num: type(num) in (int, float)
 
 isarr    = lambda ary: type(ary) in (list, tuple, dict)
@@ -22,6 +24,9 @@ isnone   = lambda x: isinstance(x, type(None))
 
 nop      = lambda *args: None
 
+# the glyphs a number literal is made of: over importing string, and faster
+DIGITS = frozenset("0123456789.")
+
 # I don't /want/ to pass a tuple to any/all
 
 allof = lambda *args: all([i for i in args])
@@ -29,19 +34,144 @@ allof = lambda *args: all([i for i in args])
 anyof = lambda *args: any([i for i in args])
 
 
-def coer(obj, typ):
-    if typ == "num":
+class BadInternalCallException(Exception):
+    """
+    actually-fatal exceptions about probable bugs in Mouse/this program
+    """
+    pass
+
+
+# coercion
+
+class _NotNum(object):
+    """what numify gives back for anything that isn't a numeric literal"""
+    def __repr__(self):
+        return "NOTNUM"
+
+NOTNUM = _NotNum()
+
+# the decimal point: a full stop, or the locale-independent ~ as in 123~0
+DECIMAL_POINTS = frozenset(".~")
+
+_NUMERALS = frozenset("0123456789")
+
+_SIGNS = frozenset("+-")
+
+_EXPONENTS = frozenset("eE")
+
+
+def _scan_num(stn):
+    """recognize a numeric literal in one pass over stn, without raising
+    return int, float or None for "not a number"
+    accepts an optional sign, digits with at most one decimal point
+    (. or ~) and an optional exponent, surrounded by optional whitespace"""
+    stn   = stn.strip()
+    end   = len(stn)
+    i     = 0
+    point = -1
+
+    if i < end and stn[i] in _SIGNS:
+        i += 1
+
+    digits = 0
+    while i < end:
+        c = stn[i]
+        if c in _NUMERALS:
+            digits += 1
+        elif c in DECIMAL_POINTS and point < 0:
+            point = i
+        else:
+            break
+        i += 1
+
+    if digits == 0:
+        return None
+
+    isfloat = point >= 0
+    if i < end and stn[i] in _EXPONENTS:
+        i += 1
+        if i < end and stn[i] in _SIGNS:
+            i += 1
+        start = i
+        while i < end and stn[i] in _NUMERALS:
+            i += 1
+        if i == start:
+            return None
+        isfloat = True
+
+    if i != end:
+        return None
+
+    if not isfloat:
         try:
-            return float(obj)
+            return int(stn)
         except ValueError:
-            # let caller handle exceptions thrown by supplying a non-numeral
-            return int(obj)
-    elif isinstance(obj, typ):
+            # past the int <-> str digit limit: as big as a float gets
+            return float(stn)
+    if point >= 0 and stn[point] == "~":
+        stn = stn[:point] + "." + stn[point + 1:]
+    return float(stn)
+
+
+# strings longer than this aren't cached: the cache would keep them alive
+NUMCACHEMAX = 32
+
+
+@functools.lru_cache(maxsize=4096)
+def _numify_short(stn):
+    num = _scan_num(stn)
+    return NOTNUM if isnone(num) else num
+
+
+def _numify_str(stn):
+    if len(stn) <= NUMCACHEMAX:
+        return _numify_short(stn)
+    num = _scan_num(stn)
+    return NOTNUM if isnone(num) else num
+
+
+def numify(obj):
+    """the numeric value of obj, or NOTNUM if it hasn't got one
+    numbers are themselves; strings must be numeric literals.
+    results for short strings are kept in an LRU cache, because the same
+    operands tend to come round again and again"""
+    if isnum(obj):
+        return obj
+    if isstr(obj):
+        return _numify_str(obj)
+    return NOTNUM
+
+
+# type names coer understands, beyond "num"
+COERCIONS = {
+    "int":   int,
+    "float": float,
+    "str":   str,
+    "bool":  bool,
+    "list":  list,
+    "tuple": tuple,
+}
+
+
+def coer(obj, typ):
+    """convert obj to typ, which is "num", a name in COERCIONS or a type
+    "num" gives a float and raises ValueError for a non-numeral, for the
+    caller to handle; anything else that fails is a BadInternalCallException"""
+    if typ == "num":
+        num = numify(obj)
+        if num is NOTNUM:
+            raise ValueError("not a numeral: " + repr(obj))
+        return float(num)
+
+    conv = COERCIONS.get(typ, typ)
+    if not isinstance(conv, type):
+        raise BadInternalCallException("junk type coersion: no such type " + repr(typ))
+    if isinstance(obj, conv):
         return obj
     try:
-        return exec(typ + "(" + str(obj) + ")")
-    except (ValueError, TypeError, NameError) as error:
-        raise BadInternalCallException("junk type coersion", error)
+        return conv(obj)
+    except (ValueError, TypeError) as error:
+        raise BadInternalCallException("junk type coersion") from error
 
 
 def flt_part(num):
@@ -0,0 +1,953 @@
+#!/usr/bin/env python3
+
+"""turns mouse source into a Program: a dense stream of instructions
+
+lex() reads the source once, classifying each glyph by what it is bound to
+in the interpreter's funcdict (a mouseRegistry.Registry), so rebinding a
+glyph changes how it lexes. nop glyphs and ¶ comments are skipped there
+and then, so they cost nothing when the program runs.
+optimize() then runs a peephole pass over the result: it
+folds arithmetic and comparisons on literals, and fuses common operator
+pairs into single superinstructions. blocks() then marks straight-line runs
+whose stack depth can be worked out from the operators' documented stack
+effects, so they can run without checking for underflow at every step. both passes only ever treat a glyph
+as a builtin while the funcdict still binds it to that builtin.
+
+a quotation { } is compiled into its own Program while its parent is lexed,
+and pushed as a Quotation; calling it runs that Program in a new frame,
+or in its caller's frame if that's a tail call.
+a word defined with : is bound in the funcdict to a Word, a cell holding its
+body, so call sites compile straight to calls to the cell.
+
+every instruction remembers the span of source it came from, and a
+SourceMap turns source offsets into instructions and lines, so \\ (goto)
+still takes source offsets, even ones in comments and whitespace, and
+diagnostics still point into the source."""
+
+import array
+import bisect
+import functools
+import re
+import weakref
+
+import mouseStack
+
+from mouseClutter import *
+
+
+__all__ = [
+    "LIT",
+    "OP",
+    "CALL",
+    "NOP",
+    "IF",
+    "JUMP",
+    "WHILE",
+    "ENTER",
+    "BLOCK",
+    "JIT",
+    "GOTO",
+    "WARN",
+    "LiteralTable",
+    "SourceMap",
+    "Program",
+    "Quotation",
+    "Word",
+    "lex",
+    "optimize",
+    "effect",
+    "blocks",
+    "compile_mouse",
+    "glue",
+]
+
+
+# opcodes: an instruction is an (opcode, argument) pair
+
+LIT  = 0  # push the argument
+OP   = 1  # call the argument, a builtin that can't rebind anything
+CALL = 2  # call the argument, which might change the funcdict
+NOP  = 3  # do nothing; the lexer never emits it, but mouseMemprof does
+IF   = 4  # pop; if false, jump to the argument (or warn if it's None)
+JUMP = 5  # jump to the argument
+GOTO = 6  # pop a source offset and jump there
+WARN = 7  # log the argument, a (message, errno) pair
+# pop; if false, jump to the argument's exit pc (or warn if it's None),
+# otherwise count an iteration of the argument's loop number
+WHILE = 8
+# call the argument; if it gives back a Program, run that in a new frame
+ENTER = 9
+# the argument is (depth, fast, rise, ops): if the stack is at least depth
+# deep, call each of fast, which stand for the instructions after this one,
+# and skip them. rise is how much deeper than that the stack gets on the
+# way, and ops are the operators the instructions call (None for a literal),
+# for mouseMetrics
+BLOCK = 10
+# the argument is (version, function, pc, loop number), put in by mouseJit:
+# call the function on the stack's list, and go on at pc, counting what it
+# returns as iterations of the loop number (if it's not None). if the
+# function returns None, or the funcdict isn't at version, go on in the
+# program as it was before instead
+JIT = 11
+
+OPNAMES = (
+    "LIT", "OP", "CALL", "NOP", "IF", "JUMP", "GOTO", "WARN", "WHILE", "ENTER",
+    "BLOCK", "JIT",
+)
+
+# stack methods that are safe to run at compile time on literal operands
+FOLDABLE = ("add", "sub", "mlt", "dmd", "flr", "lss", "gtr", "equ", "neg")
+
+# the most operands a foldable operator takes (string - takes three)
+FOLDWINDOW = 3
+
+# the longest string folding may make: anything longer is left for run time
+FOLDMAX = 1024
+
+# stack methods that never touch the funcdict, so needn't be followed by a check
+PURE = FOLDABLE + (
+    "dup", "swap", "over", "rot", "roll", "drop", "nip", "tuck",
+    "put", "emit", "get", "reveal", "pack", "explode", "total", "iota",
+    "dupadd", "dupmlt", "swapsub", "swaplss", "swapgtr",
+)
+
+# (first, second) -> the Stack method that does both in one dispatch
+SUPERINSTRUCTIONS = {
+    ("dup",  "add"): "dupadd",
+    ("dup",  "mlt"): "dupmlt",
+    ("swap", "sub"): "swapsub",
+    ("swap", "lss"): "swaplss",
+    ("swap", "gtr"): "swapgtr",
+}
+
+_NUMBER = re.compile(r"[.\d]+")
+
+# a stack effect comment, ( in -- out ), opening a docstring
+_EFFECT = re.compile(r"\s*\(([^()]*)--([^()]*)\)")
+
+
+class LiteralTable(object):
+    def __init__(self):
+        """container for the compiler to keep track of all literals in the program
+        such that nothing tries to jump into one."""
+        self.tabl  = {}              # type: Dict[int, range]
+        self.count = len(self.tabl)  # type: int
+
+    def new(
+            self:    object,
+            index:   int,
+            rangeof: range
+        ) -> None:
+        """adds an item to the string table
+        fails with an error if index exists"""
+        if not isinstance(rangeof, range):
+            raise TypeError("need a range value not {}".format(
+                    type(rangeof)
+                )
+            )
+
+        if index in self.tabl:
+            raise BadInternalCallException(
+                "cannot update string #{} at {} to table: string exists".format(
+                    str(index), repr(rangeof)
+                )
+            )
+        self.tabl[index] = rangeof  # type: range
+        self.count += 1
+
+    def get(
+            self:  object,
+            index: int
+        ) -> bool:
+        """whether index is inside (but not at the start of) a literal"""
+        return anyof(*(
+            index in rangeof and index != start
+            for start, rangeof in self.tabl.items()
+        ))
+
+
+class SourceMap(object):
+
+    def __init__(self, source, spans):
+        """where a program's instructions are in its source, for spans, and
+        where its lines start, as sorted arrays searched by bisection"""
+        self.size   = len(source)  # type: int
+        self.count  = len(spans)   # type: int
+        # the offset each line starts at
+        self.lines  = array.array("l", [0])
+        at = source.find("\n")
+        while at >= 0:
+            self.lines.append(at + 1)
+            at = source.find("\n", at + 1)
+        # the offset each instruction that has any source starts at, its pc,
+        # and the furthest any of them up to it reaches
+        self.starts = array.array("l")
+        self.pcs    = array.array("l")
+        self.ends   = array.array("l")
+        for pc, (start, end) in enumerate(spans):
+            # the first instruction at an offset is the one to jump to
+            if end > start and (not len(self.starts) or start > self.starts[-1]):
+                self.starts.append(start)
+                self.pcs.append(pc)
+                self.ends.append(max(end, self.ends[-1] if len(self.ends) else 0))
+
+    def pc(self, offset):
+        """the pc to go to for a source offset: the first instruction at or
+        after it, skipping whatever compiled to nothing, or None if the
+        offset is inside an instruction's span (such as a literal's)"""
+        if offset >= self.size:
+            return self.count
+        n = bisect.bisect_left(self.starts, offset)
+        if n < len(self.starts) and self.starts[n] == offset:
+            return self.pcs[n]
+        if offset < 0 or (n and self.ends[n - 1] > offset):
+            return None
+        return self.pcs[n] if n < len(self.starts) else self.count
+
+    def after(self, offset):
+        """the pc of the first instruction starting at or after a source
+        offset, even if the offset is inside another one's span"""
+        n = bisect.bisect_left(self.starts, offset)
+        return self.pcs[n] if n < len(self.starts) else self.count
+
+    def position(self, offset):
+        """the 1-based (line, char) of a source offset"""
+        line = bisect.bisect_right(self.lines, offset)
+        return line, offset - self.lines[line - 1] + 1
+
+
+def _finishes(code, pc):
+    """whether running code from pc reaches the end without doing anything"""
+    while pc < len(code):
+        opcode, arg = code[pc]
+        if opcode == NOP:
+            pc += 1
+        elif opcode == JUMP and arg > pc:
+            pc = arg
+        else:
+            return False
+    return True
+
+
+class Program(object):
+
+    def __init__(
+            self, source, code, spans, version, literals,
+            base = None, loops = (), recompile = True
+        ):
+        """a compiled mouse program; treat it as immutable, except for the
+        loop iteration counters, and the JIT swapping instructions for ones
+        which do the same thing"""
+        self.source   = source    # type: str
+        self.code     = code      # type: Tuple[Tuple[int, Any], ...]
+        self.spans    = spans     # type: Tuple[Tuple[int, int], ...]
+        self.version  = version   # type: int
+        self.literals = literals  # type: LiteralTable
+        # the unoptimized program, for jumps into the middle of a folded run
+        self.base     = self if isnone(base) else base  # type: Program
+        # whether this came from source that can be compiled again
+        self.recompile = recompile  # type: bool
+        # the source offset of each ( loop, and how many times it's gone round;
+        # an optimized program shares its counters with the unoptimized one
+        self.loops    = loops     # type: Tuple[int, ...]
+        self.iterations = (
+            [0] * len(loops) if self.base is self else self.base.iterations
+        )  # type: List[int]
+        # the pcs an ENTER returns to with nothing left to do but finish,
+        # where the runner can reuse the caller's frame for the callee
+        self.tails    = frozenset(
+            pc + 1 for pc, (opcode, _) in enumerate(code)
+            if opcode == ENTER and _finishes(code, pc + 1)
+        )  # type: FrozenSet[int]
+        # popped \\ operand -> the (Program, pc) it's already been checked
+        # to jump to; a Program's source never changes, so nor do these
+        self.targets  = {}        # type: Dict[Any, Tuple[Program, int]]
+        # source offset -> pc, and -> (line, char)
+        self.map      = SourceMap(source, spans)  # type: SourceMap
+        # this program before the JIT swapped anything into it
+        self.plain    = self      # type: Program
+
+    def offset(self, pc):
+        """the source offset instruction pc starts at (or the end of the source)"""
+        if pc < len(self.spans):
+            return self.spans[pc][0]
+        return len(self.source)
+
+    def position(self, offset):
+        """the 1-based (line, char) of a source offset"""
+        return self.map.position(offset)
+
+    def loop_counts(self):
+        """[((line, char), iterations)] for each ( loop, in source order"""
+        return [
+            (self.position(offset), self.iterations[n])
+            for n, offset in enumerate(self.loops)
+        ]
+
+    def __len__(self):
+        return len(self.code)
+
+    def __repr__(self):
+        return "<Program of {} instructions from {} chars{}>".format(
+            len(self.code), len(self.source),
+            "" if self.base is self else ", optimized",
+        )
+
+    def dis(self):
+        """a readable listing of the instructions"""
+        return "\n".join(
+            "{:>5} {:>5} {:<5} {!r}".format(
+                pc, self.spans[pc][0], OPNAMES[opcode], arg
+            )
+            for pc, (opcode, arg) in enumerate(self.code)
+        )
+
+
+class Quotation(object):
+
+    def __init__(self, prog, mouse):
+        """a compiled block of code, as pushed by { }
+        the source is what it is; each interpreter that calls it gets the
+        Program compiled for it, which is kept until its funcdict changes"""
+        self.source   = prog.source  # type: str
+        self.programs = weakref.WeakKeyDictionary()
+        self.programs[mouse] = prog
+
+    def program(self, mouse):
+        """the Program to run this quotation in the interpreter mouse"""
+        prog = self.programs.get(mouse)
+        if isnone(prog) or prog.version != mouse.funcdict.version:
+            prog = self.programs[mouse] = mouse.compile(self.source)
+        return prog
+
+    # compiled Programs belong to their interpreters: a quotation sent to
+    # another process (see mouseParallel) goes as its source alone
+    def __getstate__(self):
+        return {"source": self.source}
+
+    def __setstate__(self, state):
+        self.source   = state["source"]
+        self.programs = weakref.WeakKeyDictionary()
+
+    def __repr__(self):
+        return "{" + self.source + "}"
+
+    __str__ = __repr__
+
+
+class Word(object):
+
+    def __init__(self, mouse, name, body):
+        """a word defined by : in the interpreter mouse: a named cell
+        holding a Quotation. compiled call sites call the cell, not the body,
+        so redefining a word swaps its body without recompiling them"""
+        self.mouse    = mouse
+        self.name     = name  # type: str
+        self.body     = body  # type: Quotation
+        self.__name__ = name  # type: str
+
+    def __call__(self):
+        """the Program for the runner to call"""
+        return self.body.program(self.mouse)
+
+    @property
+    def __doc__(self):
+        return "( ? -- ? )\n\tuser word: " + repr(self.body)
+
+    def __repr__(self):
+        return "<Word " + self.name + " " + repr(self.body) + ">"
+
+
+def _builtins(mouse, names):
+    """map the interpreter's bound stack methods back to their names"""
+    return {getattr(mouse._stack, name): name for name in names}
+
+
+def _syntax(mouse):
+    """map the bindings the compiler handles itself to what they are"""
+    return {
+        nop:                    "nop",
+        mouse._lit_string:      "string",
+        mouse._lit_char:        "char",
+        mouse._comment:         "comment",
+        mouse._simple_if:       "if",
+        mouse._simple_fi:       "fi",
+        mouse._simple_while:    "while",
+        mouse._simple_elihw:    "elihw",
+        mouse._goto:            "goto",
+        mouse._mk_quot:         "quote",
+        mouse._mk_touq:         "unquote",
+        mouse._string_as_mouse: "enter",
+        mouse._doif:            "enter",
+        mouse._dofor:           "enter",
+    }
+
+
+@functools.lru_cache(maxsize=32)
+def _string_pattern(delim):
+    """a regex matching a string literal between two unescaped delim"""
+    return re.compile(
+        r'{0}([^{0}\\]*(?:\\.[^{0}\\]*)*){0}'.format(re.escape(delim))
+    )
+
+
+def _filename():
+    """the script mouse16.py is running, for diagnostics"""
+    # imported late: mouse16 imports everything else
+    import mouse16
+    return mouse16._FILENAME
+
+
+class _Lexer(object):
+
+    def __init__(self, mouse, source, optimized):
+        """one pass over source, in which each quotation is compiled
+        into its own Program as it's reached. equal string literals,
+        wherever they are in the source, share one str"""
+        self.mouse     = mouse
+        self.source    = source     # type: str
+        self.optimized = optimized  # type: bool
+        self.table     = mouse.funcdict
+        self.pure      = self.table.cache("pure", lambda: _builtins(mouse, PURE))
+        self.syntax    = self.table.cache("syntax", lambda: _syntax(mouse))
+        # lengths of the multi-glyph names, longest first, for maximal munch
+        self.widths    = self.table.cache("widths", lambda: sorted(
+            {len(name) for name in self.table if len(name) > 1}, reverse=True
+        ))  # type: List[int]
+        # the glyphs that quote string literals
+        self.quotes    = self.table.cache("quotes", lambda: tuple(
+            name for name in self.table
+            if self.syntax.get(self.table[name][0]) == "string"
+        ))  # type: Tuple[str, ...]
+        # text -> the one str every literal of that text pushes
+        self.strings   = {}  # type: Dict[str, str]
+        # comment glyph -> whether it makes line comments in this source
+        self.lined     = {}  # type: Dict[str, bool]
+        # where we are, for diagnostics
+        self.line      = 1
+        self.linestart = 0
+
+    def where(self, offset):
+        return "char " + str(offset - self.linestart + 1) + ", line " + str(self.line)
+
+    def _line_comments(self, glyph):
+        """whether every glyph in the source, outside string literals, is
+        at the start of a line (after any indentation): if so, each one
+        starts a comment up to the end of its line"""
+        text = self.source
+        for quote in self.quotes:
+            text = _string_pattern(quote).sub(lambda match: " " * len(match.group()), text)
+        at = text.find(glyph)
+        while at >= 0:
+            if text[text.rfind("\n", 0, at) + 1:at].strip(" \t"):
+                return False
+            at = text.find(glyph, at + len(glyph))
+        return True
+
+    def _comment_end(self, glyph, i):
+        """the offset after the comment whose glyph ends just before i,
+        or None if it's a block comment that never ends"""
+        source = self.source
+        if glyph not in self.lined:
+            self.lined[glyph] = self._line_comments(glyph)
+        if self.lined[glyph]:
+            end = source.find("\n", i)
+            return len(source) if end < 0 else end
+        while True:
+            close = source.find(glyph, i)
+            if close < 0:
+                return None
+            # a string literal before it hides it
+            quotes = [
+                (source.find(quote, i, close), quote) for quote in self.quotes
+            ]
+            quotes = [(at, quote) for at, quote in quotes if at >= 0]
+            if not len(quotes):
+                return close + len(glyph)
+            at, quote = min(quotes)
+            match = _string_pattern(quote).match(source, at)
+            i = at + len(quote) if isnone(match) else match.end()
+
+    def _program(self, frame, stop):
+        """the Program frame has lexed, up to the offset stop"""
+        prog = Program(
+            self.source[frame.start:stop], tuple(frame.code), tuple(frame.spans),
+            self.table.version, frame.literals, loops=tuple(frame.loops),
+        )
+        if not isnone(frame.opener) and self.optimized:
+            prog = blocks(self.mouse, optimize(self.mouse, prog))
+        return prog
+
+    def lex(self):
+        """lex the whole source to a Program. each { } quotation gets a
+        _Frame of its own, on a stack rather than in a recursive call,
+        so they can nest as deep as memory allows"""
+        source = self.source
+        mouse  = self.mouse
+        end    = len(source)
+        frame  = _Frame(0)
+        outer  = []  # type: List[_Frame]
+        i      = 0
+
+        while True:
+            if i >= end:
+                if not len(outer):
+                    break
+                # found EOF inside a quotation: it ends here, unclosed
+                body, opener = self._program(frame, end), frame.opener
+                frame = outer.pop()
+                frame.emit(WARN, (
+                    "found EOF before matching brace: at " + frame.inner, 2
+                ), opener, opener + frame.width)
+                frame.literal(opener, end)
+                frame.emit(LIT, Quotation(body, mouse), opener, end)
+                continue
+
+            tok = source[i]
+
+            if tok in DIGITS:
+                text  = _NUMBER.match(source, i).group()
+                try:
+                    num = float(text) if "." in text else int(text)
+                except ValueError:
+                    num = 0.0
+                frame.literal(i, i + len(text))
+                frame.emit(LIT, num, i, i + len(text))
+                i += len(text)
+                continue
+
+            for width in self.widths:
+                if source[i:i + width] in self.table:
+                    tok = source[i:i + width]
+                    break
+            width = len(tok)
+
+            func, args = self.table.get(tok, (None, ()))
+            kind = self.syntax.get(func)
+
+            if isnone(func):
+                frame.emit(WARN, (
+                    "at " + self.where(i) + " of file " + _filename() +
+                    ": ignoring token '" + tok +
+                    "' which needs a definition before it can be used", 2
+                ), i, i + width)
+
+            elif isinstance(func, Word):
+                frame.emit(ENTER, func, i, i + width)
+
+            elif isnone(kind):
+                if len(args):
+                    func = _partial(func, args)
+                frame.emit(OP if func in self.pure else CALL, func, i, i + width)
+
+            elif kind == "string":
+                match = _string_pattern(tok).match(source, i)
+                if isnone(match):
+                    frame.emit(WARN, (
+                        "parser found EOF before closing quote at " + str(i), 2
+                    ), i, i + width)
+                else:
+                    text = self.strings.get(match.group(1))
+                    if isnone(text):
+                        text = self.strings[match.group(1)] = match.group(1)
+                        self.mouse.metrics.literalmisses += 1
+                    else:
+                        self.mouse.metrics.literalhits += 1
+                    frame.literal(*match.span())
+                    frame.emit(LIT, text, *match.span())
+                    self.line     += match.group().count("\n")
+                    self.linestart = max(
+                        self.linestart, source.rfind("\n", i, match.end()) + 1
+                    )
+                    i = match.end()
+                    continue
+
+            elif kind == "char":
+                if i + width < end:
+                    frame.literal(i, i + width + 1)
+                    frame.emit(LIT, ord(source[i + width]), i, i + width + 1)
+                    if source[i + width] == "\n":
+                        self.line     += 1
+                        self.linestart = i + width + 1
+                    i += width + 1
+                    continue
+                frame.emit(WARN, (
+                    "found EOF before character for literal at " +
+                    self.where(i + width) + " : file " + _filename(), 2
+                ), i, i + width)
+
+            elif kind == "nop":
+                pass
+
+            elif kind == "if":
+                frame.ifs.append(len(frame.code))
+                frame.emit(IF, None, i, i + width)
+
+            elif kind == "fi":
+                if len(frame.ifs):
+                    opener = frame.ifs.pop()
+                    frame.code[opener] = (IF, len(frame.code))
+
+            elif kind == "while":
+                frame.whiles.append(len(frame.code))
+                frame.emit(WHILE, (None, len(frame.loops)), i, i + width)
+                frame.loops.append(i - frame.start)
+
+            elif kind == "elihw":
+                if len(frame.whiles):
+                    opener = frame.whiles.pop()
+                    frame.code[opener] = (
+                        WHILE, (len(frame.code) + 1, frame.code[opener][1][1])
+                    )
+                    frame.emit(JUMP, opener, i, i + width)
+                else:
+                    frame.emit(WARN, (
+                        "found a closing brace without an opener at " + self.where(i), 2
+                    ), i, i + width)
+
+            elif kind == "goto":
+                frame.emit(GOTO, None, i, i + width)
+
+            elif kind == "comment":
+                after = self._comment_end(tok, i + width)
+                if isnone(after):
+                    frame.emit(WARN, (
+                        "found EOF before the end of the comment at " + self.where(i), 2
+                    ), i, i + width)
+                    after = end
+                self.line     += source.count("\n", i, after)
+                self.linestart = max(self.linestart, source.rfind("\n", i, after) + 1)
+                i = after
+                continue
+
+            elif kind == "enter":
+                frame.emit(ENTER, func, i, i + width)
+
+            elif kind == "quote":
+                # the quotation's { is noted on the frame around it
+                frame.inner, frame.width = self.where(i), width
+                outer.append(frame)
+                frame = _Frame(i + width, i)
+                i += width
+                continue
+
+            elif kind == "unquote":
+                if len(outer):
+                    body, opener = self._program(frame, i), frame.opener
+                    frame = outer.pop()
+                    frame.literal(opener, i + width)
+                    frame.emit(LIT, Quotation(body, mouse), opener, i + width)
+                    i += width
+                    continue
+                frame.emit(WARN, (
+                    "found a closing brace without an opener at " + self.where(i), 2
+                ), i, i + width)
+
+            if tok == "\n":
+                self.line     += 1
+                self.linestart = i + 1
+            i += width
+
+        return self._program(frame, end)
+
+
+class _Frame(object):
+
+    def __init__(self, start, opener = None):
+        """what's been lexed of the source from start on: all of it, or,
+        if opener is the offset of a {, the quotation it opens"""
+        self.start    = start   # type: int
+        self.opener   = opener  # type: Optional[int]
+        self.code     = []  # type: List[Tuple[int, Any]]
+        self.spans    = []  # type: List[Tuple[int, int]]
+        self.literals = LiteralTable()
+        self.ifs      = []  # type: List[int]
+        self.whiles   = []  # type: List[int]
+        self.loops    = []  # type: List[int]
+        # where the { of the quotation being lexed inside this one is, for
+        # diagnostics, and how wide it is
+        self.inner    = ""  # type: str
+        self.width    = 0   # type: int
+
+    # offsets in a Program are relative to the start of its own source
+    def emit(self, opcode, arg, first, stop):
+        self.code.append((opcode, arg))
+        self.spans.append((first - self.start, stop - self.start))
+
+    def literal(self, first, stop):
+        self.literals.new(first - self.start, range(first - self.start, stop - self.start))
+
+
+def lex(mouse, source):
+    """compile source to an unoptimized Program, using mouse's funcdict"""
+    return _Lexer(mouse, source, False).lex()
+
+
+def _partial(func, args):
+    """bind an operator to the arguments its funcdict entry gives it"""
+    def call():
+        return func(*args)
+    call.__name__ = getattr(func, "__name__", "call")
+    call.__doc__  = getattr(func, "__doc__", None)
+    return call
+
+
+class _Unfoldable(Exception):
+    """raised by a scratch stack instead of logging anything"""
+    pass
+
+
+class _Scratch(mouseStack.Stack):
+    """a stack to run operators on at compile time: any warning,
+    underflow included, means the operation can't be folded"""
+
+    def log(self, *args, **kwds):
+        raise _Unfoldable()
+
+
+def _too_big(op, values):
+    """whether op on the last two of values would repeat a string past FOLDMAX"""
+    if op != "mlt" or len(values) < 2:
+        return False
+    x, y = values[-2:]
+    if isstr(x) and isnum(y):
+        return len(x) * abs(y) > FOLDMAX
+    if isnum(x) and isstr(y):
+        return abs(x) * len(y) > FOLDMAX
+    return False
+
+
+def _fold(op, values):
+    """run op on a scratch stack holding values
+    return the stack afterwards, or None if op warned or underflowed,
+    or would make a string longer than FOLDMAX"""
+    if _too_big(op, values):
+        return None
+    scratch = _Scratch()
+    scratch.pushn(values)
+    try:
+        getattr(scratch, op)()
+    except (_Unfoldable, ArithmeticError, TypeError, ValueError, MemoryError):
+        return None
+    after = scratch.inspect()
+    if anyof(*(isstr(item) and len(item) > FOLDMAX for item in after)):
+        return None
+    return after
+
+
+def optimize(mouse, prog):
+    """peephole-optimize an unoptimized Program, giving a new Program
+    which falls back on prog for jumps into anything it folded away"""
+    table    = mouse.funcdict
+    foldable = table.cache("foldable", lambda: _builtins(mouse, FOLDABLE))
+    fusable  = table.cache("fusable", lambda: _builtins(
+        mouse, set(name for pair in SUPERINSTRUCTIONS for name in pair)
+    ))
+
+    # static jump targets: nothing may be folded or fused across one
+    targets = _targets(prog.code)
+
+    code  = []     # type: List[Tuple[int, Any]]
+    spans = []     # type: List[Tuple[int, int]]
+    remap = {}     # type: Dict[int, int]
+    run   = 0      # how many instructions at the end of code are a literal run
+    fence = False  # whether a jump target lies between code[-1] and here
+
+    for pc, (opcode, arg) in enumerate(prog.code):
+        start, stop = prog.spans[pc]
+        remap[pc] = len(code)
+
+        if pc in targets:
+            run   = 0
+            fence = True
+
+        if opcode == NOP:
+            continue
+
+        if opcode == LIT:
+            code.append((opcode, arg))
+            spans.append((start, stop))
+            run  += 1
+            fence = False
+            continue
+
+        if opcode == OP and arg in foldable and run:
+            # no operator takes more than FOLDWINDOW operands
+            window = min(run, FOLDWINDOW)
+            values = [lit for _, lit in code[len(code) - window:]]
+            after  = _fold(foldable[arg], values)
+            if not isnone(after):
+                # what's left of the window, then what the operator made of the rest
+                keep = 0
+                while keep < min(window, len(after)) and after[keep] is values[keep]:
+                    keep += 1
+                first = spans[len(spans) - window + keep][0] if keep < window else start
+                del code[len(code) - window + keep:]
+                del spans[len(spans) - window + keep:]
+                for n, value in enumerate(after[keep:]):
+                    code.append((LIT, value))
+                    spans.append((first, stop) if n == 0 else (stop, stop))
+                run += len(after) - window
+                continue
+
+        run = 0
+
+        if (
+            opcode == OP and arg in fusable and not fence
+            and len(code) and code[-1][0] == OP and code[-1][1] in fusable
+        ):
+            name = SUPERINSTRUCTIONS.get((fusable[code[-1][1]], fusable[arg]))
+            if not isnone(name):
+                code[-1]  = (OP, getattr(mouse._stack, name))
+                spans[-1] = (spans[-1][0], stop)
+                continue
+
+        code.append((opcode, arg))
+        spans.append((start, stop))
+        fence = False
+
+    remap[len(prog.code)] = len(code)
+
+    code = [_retarget(opcode, arg, remap) for opcode, arg in code]
+
+    return Program(
+        prog.source, tuple(code), tuple(spans), prog.version, prog.literals,
+        base=prog, loops=prog.loops, recompile=prog.recompile,
+    )
+
+
+def _targets(code):
+    """the pcs the instructions in code can jump to by themselves"""
+    targets = set()  # type: Set[int]
+    for opcode, arg in code:
+        if opcode in (IF, JUMP) and not isnone(arg):
+            targets.add(arg)
+        elif opcode == WHILE and not isnone(arg[0]):
+            targets.add(arg[0])
+    return targets
+
+
+@functools.lru_cache(maxsize=None)
+def _effect_of(doc):
+    match = _EFFECT.match(doc)
+    if isnone(match):
+        return None
+    ins, outs = match.group(1).split(), match.group(2).split()
+    if "?" in ins or "?" in outs:
+        return None
+    # items at the bottom it leaves where they were, it doesn't take:
+    # the z in ( z y x -- z x-y ), or the y in ( y x -- y x x )
+    keep = 0
+    while (
+        keep < min(len(ins), len(outs)) and ins[keep] == outs[keep]
+        and ins[keep] not in outs[keep + 1:]
+    ):
+        keep += 1
+    return len(ins) - keep, len(outs) - len(ins)
+
+
+def effect(func):
+    """(how deep the stack must be, how much deeper it gets) for func,
+    from the ( in -- out ) its docstring starts with, or None if it hasn't
+    one. the in side can name items it leaves alone, which it doesn't need.
+    it's the usual case, so a type error or the like can make the change in
+    depth differ"""
+    doc = getattr(func, "__doc__", None)
+    if not isstr(doc):
+        return None
+    return _effect_of(doc)
+
+
+def blocks(mouse, prog):
+    """mark each straight-line run of literals and builtins with known
+    stack effects in prog with a BLOCK, which checks how deep the stack
+    is once and then runs unchecked twins of the builtins. the run itself
+    stays where it was, for jumps into its middle and for the BLOCK
+    to fall back on when the stack is too shallow"""
+    stack   = mouse._stack
+    targets = _targets(prog.code)
+    code    = []  # type: List[Tuple[int, Any]]
+    spans   = []  # type: List[Tuple[int, int]]
+    remap   = {}  # type: Dict[int, int]
+    pc      = 0
+
+    while pc < len(prog.code):
+        end   = pc
+        depth = 0  # how much deeper than on entry the stack is
+        need  = 0  # how deep it has to be on entry
+        rise  = 0  # the deepest it gets, past how deep it was on entry
+        fast  = []  # type: List[Callable]
+        ops   = []  # type: List[Callable]
+        twins = 0
+        while end < len(prog.code) and (end == pc or end not in targets):
+            opcode, arg = prog.code[end]
+            if opcode == LIT:
+                fast.append(functools.partial(stack.push, arg))
+                ops.append(None)
+                depth += 1
+            elif opcode == OP:
+                eff = effect(arg)
+                if isnone(eff):
+                    break
+                need   = max(need, eff[0] - depth)
+                depth += eff[1]
+                ops.append(arg)
+                twin   = None
+                if getattr(arg, "__self__", None) is stack:
+                    twin = stack.unchecked(arg.__name__)
+                if isnone(twin):
+                    fast.append(arg)
+                else:
+                    fast.append(twin)
+                    twins += 1
+            else:
+                break
+            rise = max(rise, depth)
+            end += 1
+
+        first = len(code)
+        if twins and end - pc > 1:
+            code.append((BLOCK, (need, tuple(fast), rise, tuple(ops))))
+            spans.append(prog.spans[pc])
+        for at in range(pc, max(end, pc + 1)):
+            remap[at] = len(code)
+            code.append(prog.code[at])
+            spans.append(prog.spans[at])
+        remap[pc] = first
+        pc = max(end, pc + 1)
+
+    remap[len(prog.code)] = len(code)
+
+    code = [_retarget(opcode, arg, remap) for opcode, arg in code]
+
+    return Program(
+        prog.source, tuple(code), tuple(spans), prog.version, prog.literals,
+        base=prog.base, loops=prog.loops, recompile=prog.recompile,
+    )
+
+
+def _retarget(opcode, arg, remap):
+    """an instruction, with any jump target in it mapped through remap"""
+    if opcode in (IF, JUMP) and not isnone(arg):
+        return opcode, remap[arg]
+    if opcode == WHILE and not isnone(arg[0]):
+        return opcode, (remap[arg[0]], arg[1])
+    return opcode, arg
+
+
+def compile_mouse(mouse, source, optimized = True):
+    """lex, and optionally optimize, source for the interpreter mouse
+    (quotations inside it are optimized as they're compiled)"""
+    prog = _Lexer(mouse, source, optimized).lex()
+    if optimized:
+        prog = blocks(mouse, optimize(mouse, prog))
+    return prog
+
+
+def glue(mouse, code, loops = ()):
+    """a Program put together by hand from instructions which don't come from
+    any source (so it never needs recompiling), such as the ones _doif makes"""
+    return Program(
+        "", tuple(code), ((0, 0),) * len(code), mouse.funcdict.version,
+        LiteralTable(), loops=loops, recompile=False,
+    )
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+
+"""binary stack dumps for mouse16: --dump=FILE, --load=FILE
+
+a dump holds both of an interpreter's stacks, every item tagged with its
+type, so a pipeline of mouse16 jobs can hand its whole state on without
+printing numbers and strings only to read them back in:
+
+    mouse16.py --dump=- first.mou | mouse16.py --load=- second.mou
+
+the format is MAGIC, then the main stack, then the secondary stack. a stack
+is a count followed by that many items; an item is a tag byte and then:
+
+    n   (None)    nothing
+    i   int       its zigzag-encoded LEB128 varint, however big it is
+    f   float     8 bytes, a little-endian double
+    s   str       a varint byte length, then UTF-8 (ropes are flattened)
+    q   quotation the same, of its source
+    a   array     a varint element count, zero bytes up to the next
+                  multiple of 8 in the dump, then little-endian doubles
+
+an array's data is written straight from the array's own buffer, and read
+straight from a memoryview of the dump into the new array, in one copy."""
+
+import array
+import mmap
+import struct
+import sys
+
+import mouseArray
+import mouseCompile
+
+from mouseRope import Rope
+
+
+__all__ = [
+    "MAGIC",
+    "dump",
+    "load",
+    "dump_file",
+    "load_file",
+]
+
+
+MAGIC = b"mouse16\x01"
+
+_DOUBLE = struct.Struct("<d")
+
+# arrays need their doubles in this byte order
+_SWAP = sys.byteorder != "little"
+
+
+def _varint(n):
+    """n >= 0 as an unsigned LEB128 varint"""
+    out = bytearray()
+    while n > 0x7f:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _text(tag, text):
+    data = text.encode("utf-8")
+    return tag + _varint(len(data)) + data
+
+
+def _items(stk, offset):
+    """(bytes or buffer) pieces encoding the items of stk, for a dump
+    which is offset bytes long before them"""
+    head = [_varint(len(stk))]
+    offset += len(head[0])
+    for item in stk:
+        kind = type(item)
+        if item is None:
+            piece = b"n"
+        elif kind is int:
+            piece = b"i" + _varint(item << 1 if item >= 0 else (~item << 1) | 1)
+        elif kind is float:
+            piece = b"f" + _DOUBLE.pack(item)
+        elif kind is str or kind is Rope:
+            piece = _text(b"s", str(item))
+        elif kind is mouseCompile.Quotation:
+            piece = _text(b"q", item.source)
+        elif kind is mouseArray.ARRAY:
+            piece = b"a" + _varint(len(item))
+            pad   = -(offset + len(piece)) % 8
+            head.append(piece + b"\0" * pad)
+            offset += len(piece) + pad
+            if _SWAP:
+                item = array.array(item.typecode, item)
+                item.byteswap()
+            data = memoryview(item).cast("B")
+            head.append(data)
+            offset += len(data)
+            continue
+        else:
+            raise TypeError("can't dump a " + repr(kind).split("'")[1])
+        head.append(piece)
+        offset += len(piece)
+    return head, offset
+
+
+def dump(mouse, binfile):
+    """write both of mouse's stacks to the binary file binfile"""
+    binfile.write(MAGIC)
+    offset = len(MAGIC)
+    for stk in (mouse._stack, mouse._retstk):
+        pieces, offset = _items(stk.inspect(), offset)
+        for piece in pieces:
+            binfile.write(piece)
+
+
+class _Reader(object):
+
+    def __init__(self, data):
+        """a cursor over a dump, without copying it"""
+        self.view = memoryview(data).cast("B")
+        self.pos  = 0
+
+    def take(self, n):
+        if self.pos + n > len(self.view):
+            raise ValueError("the stack dump is cut short")
+        piece = self.view[self.pos:self.pos + n]
+        self.pos += n
+        return piece
+
+    def varint(self):
+        n, shift = 0, 0
+        while True:
+            byte = self.take(1)[0]
+            n |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return n
+            shift += 7
+
+    def item(self):
+        tag = bytes(self.take(1))
+        if tag == b"n":
+            return None
+        if tag == b"i":
+            n = self.varint()
+            return n >> 1 if not n & 1 else ~(n >> 1)
+        if tag == b"f":
+            return _DOUBLE.unpack(self.take(8))[0]
+        if tag == b"s":
+            return str(self.take(self.varint()), "utf-8")
+        if tag == b"q":
+            quot = mouseCompile.Quotation.__new__(mouseCompile.Quotation)
+            quot.__setstate__({"source": str(self.take(self.varint()), "utf-8")})
+            return quot
+        if tag == b"a":
+            count = self.varint()
+            self.take(-self.pos % 8)
+            arr = mouseArray.new()
+            arr.frombytes(self.take(count * arr.itemsize))
+            if _SWAP:
+                arr.byteswap()
+            return arr
+        raise ValueError("bad item tag " + repr(tag) + " in the stack dump")
+
+    def items(self):
+        return [self.item() for _ in range(self.varint())]
+
+
+def load(mouse, data):
+    """replace both of mouse's stacks with the ones dumped in data,
+    a bytes-like object; raises ValueError if it isn't a stack dump"""
+    reader = _Reader(data)
+    try:
+        if bytes(reader.take(len(MAGIC))) != MAGIC:
+            raise ValueError("not a mouse16 stack dump")
+        main = reader.items()
+        ret  = reader.items()
+    finally:
+        # so a mapped file can be closed
+        reader.view.release()
+    mouse._stack.__stack__[:]  = main
+    mouse._retstk.__stack__[:] = ret
+
+
+def dump_file(mouse, path):
+    """dump mouse's stacks to the file at path, or stdout if it's -"""
+    if path == "-":
+        sys.stdout.flush()
+        dump(mouse, sys.stdout.buffer)
+        sys.stdout.buffer.flush()
+        return
+    with open(path, "wb") as binfile:
+        dump(mouse, binfile)
+
+
+def load_file(mouse, path):
+    """load mouse's stacks from the dump at path, or stdin if it's -"""
+    if path == "-":
+        return load(mouse, sys.stdin.buffer.read())
+    with open(path, "rb") as binfile:
+        try:
+            data = mmap.mmap(binfile.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # an empty file can't be mapped
+            data = b""
+        try:
+            load(mouse, data)
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
@@ -1,120 +1,110 @@
+import collections
+import math
+import time
+
+import mouseArray
+import mouseCompile
+import mouseJit
+import mouseMetrics
+import mouseRegistry
 import mouseStack
 
 from mouseClutter import *
 
-from mouse16 import DIGITS, _FILENAME, _FROMFILE
-
-class CaptainHook(object):
-    def __init__(self):
-        """allows "hooking" index variable assignment"""
-        self.v = (0, None)  # type: Tuple[int, LiteralTable]
-
-    def __eq__(
-            self: object,
-            o:    object
-        ) -> bool:
-        if o == self.v:
-            return True
-        return False
-
-    def __gt__(
-            self: object,
-            o:    object
-        ) -> bool:
-        if o > self.v:
-            return True
-        return False
-
-    def __lt__(
-            self: object,
-            o:    object
-        ) -> bool:
-        if o < self.v:
-            return True
-        return False
-
-    def __setattr__(
-            self: object,
-            n:    object,
-            info: object
-        ) -> None:
-        value, othercls = info
-        if isnum(value):
-            global _U_READ_AHEAD
-            if isnone(othercls):
-                super().__setattr__(n, value)
-                return
-            elif othercls.tabl.get(value):
-                raise BadInternalCallException(
-                    "the parser tried to jump inside a string"
-                )
-            #print("mode of", n, "changed from", self.v, "to", value)
-            #print("whether a jump had occurred this cycle changed from", _U_READ_AHEAD, "to True")
-            _U_READ_AHEAD = True
-            super().__setattr__(n, value)
+from mouseCompile import LIT, OP, CALL, IF, JUMP, GOTO, WARN, WHILE, ENTER, BLOCK, JIT
 
-        else:
-            raise TypeError(
-                "need an integer not" + str(type(value))
-            )
+from mouseRope import ROPEMIN, unrope
 
-class LiteralTable(object):
-    def __init__(self):
-        """container for the parser to keep track of all literals in the program
-        such that it doesn't try to jump to one."""
-        self.tabl  = {}              # type: Dict[int, object]
-        self.count = len(self.tabl)  # type: int
-
-    def new(
-            self:    object,
-            index:   int,
-            rangeof: range
-        ) -> None:
-        """adds an item to the string table
-        fails with an error if index exists"""
-        if not isinstance(rangeof, range):
-            raise TypeError("need a range value not {}".format(
-                    type(rangeof)
-                )
-            )
 
-        if index in self.tabl:
-            raise BadInternalCallException(
-                "cannot update string #{} at {} to table: string exists".format(
-                    str(index), repr(rangeof)
-                )
-            )
-        self.tabl[index] = rangeof  # type: range
-
-    def get(
-            self:    object,
-            index:   int,
-            byrange: int
-        ) -> bool:
-        """boolean based on query of string table"""
-        print("querying string: at", str(index), repr(byrange))
-        return anyof(index in self.tabl, byrange in self.tabl.values())
-
-    def __del__(self):
-        """immutability!! yay!! doesn't affect garbage collection, though"""
-        pass
+# how deeply calls may nest, by default
+DEPTH = 10000
+
+# how many distinct strings run with ` to keep compiled
+STRINGCACHE = 256
+
+# how many distinct !!PY!! strings to keep compiled
+PYCACHE = 256
+
+# how many checked \ targets each program keeps
+GOTOCACHE = 1024
 
 class Mouse(object):
 
-    def __init__(self):
-        """a parser + runner class."""
+    def __init__(
+        self, optimize = True, depth = DEPTH, ropes = False,
+        workers = None, chunksize = None, jit = False, memprofile = False,
+        jithot = mouseJit.JITHOT, ropemin = ROPEMIN, counting = False
+    ):
+        """a parser + runner class.
+        optimize=False runs programs exactly as they're lexed, without the
+        peephole pass: that's the reference for the optimized engine.
+        depth is how deeply calls may nest before it's a recursion error.
+        ropes=True joins and reverses big strings without copying them.
+        workers and chunksize are how ¨ spreads an array over processes
+        (None for mouseParallel's defaults).
+        jit=True translates hot loops into Python (see mouseJit).
+        what it runs is counted in self.metrics (see mouseMetrics);
+        counting=True counts every instruction and operator call as well.
+        memprofile=True measures what everything it compiles allocates,
+        in self.memprofile (see mouseMemprof).
+        jithot and ropemin are how many times round a loop goes before the
+        JIT compiles it, and how long a string has to be to make a rope:
+        lower than the defaults, they let mouseFuzz reach both quickly"""
+
+        self.optimize  = optimize   # type: bool
+
+        self.depth     = depth      # type: int
+
+        self.workers   = workers    # type: Optional[int]
+
+        self.chunksize = chunksize  # type: Optional[int]
+
+        self.jit       = jit        # type: bool
+
+        self.jithot    = jithot     # type: int
+
+        # source -> Quotation, for strings run with `
+        self._strings = {}  # type: Dict[str, mouseCompile.Quotation]
+
+        # python source -> code object, for !!PY!! strings, least recent first
+        self._python  = collections.OrderedDict()  # type: OrderedDict[str, CodeType]
 
         self._stack = mouseStack.Stack()
 
         self._retstk = mouseStack.Stack()
 
-        self.funcdict = {
+        self._stack.ropes = self._retstk.ropes = ropes
+
+        self._stack.ropemin = self._retstk.ropemin = ropemin
+
+        # name -> the stacks besides the main one, which § trades with the
+        # main stack, and » and « move items to and from. ~ trades with "~"
+        self.stacks = {"~": self._retstk}  # type: Dict[str, mouseStack.Stack]
+
+        self.metrics = mouseMetrics.Metrics(self, counting)  # type: mouseMetrics.Metrics
+
+        self.memprofile = None  # type: Optional[mouseMemprof.Profile]
+        if memprofile:
+            import mouseMemprof
+            self.memprofile = mouseMemprof.Profile(self)
+
+        # where !!PY!! strings run: what they assign is still there next time
+        self.namespace = {
+            "__builtins__": __builtins__,
+            "mouse":  self,
+            "self":   self,  # what !!PY!! code has always called it
+            "stack":  self._stack,
+            "retstk": self._retstk,
+        }  # type: Dict[str, Any]
+
+        self.funcdict = mouseRegistry.Registry({
             chr(4): (nop,                ()),  # make ^D silent
             "\n":   (nop,                ()),
             "\r":   (nop,                ()),  # windows compatibilty
             "\"": (self._lit_string,     ()),  # quotes for strings
             "\'": (self._lit_char,       ()),  # apostrophe pushes nxt charcode
             " ":  (nop,                  ()),  # whitespace needs to be defined
+            "¶":  (self._comment,        ()),  # comments, skipped by the lexer
             # control structs: double sided
             "[": (self._simple_if,       ()),  # if
             "]": (self._simple_fi,       ()),  # fi
@@ -123,6 +113,8 @@ class Mouse(object):
             #quotations: not quite the same
             "{": (self._mk_quot,         ()),  # begin quotation
             "}": (self._mk_touq,         ()),  # end
+            "|": (self._doif,            ()),  # if/else on quotations
+            "¦": (self._dofor,           ()),  # while on quotations
             #goto is a Temporary Replacement for for(;;) and while
             "\\":(self._goto,            ()),
             #misc/other operators
@@ -145,9 +137,20 @@ class Mouse(object):
             ";": (self._stack.reveal,    ()),  # show the content of stack
             "`": (self._string_as_mouse, ()),  # execs a string
             "~": (self._trade_ret_main,  ()),
-            "None": (self._retstk.push, (self._stack.pop)),
-            "None": (self._stack.push, (self._retstk.pop)),
-        } # type: Dict[str, Tuple[object, object]]
+            "§": (self._trade_named,     ()),  # ~ with any named stack
+            "»": (self._move_to,         ()),  # move n items to a stack
+            "«": (self._move_from,       ()),  # move n items from a stack
+            ":": (self._new_word,        ()),  # define a word
+            # packed numeric arrays
+            "⊂": (self._stack.pack,      ()),  # n items -> array
+            "⊃": (self._stack.explode,   ()),  # array -> items, n
+            "Σ": (self._stack.total,     ()),  # sum an array
+            "⍳": (self._stack.iota,      ()),  # array 0 .. n-1
+            "¨": (self._pmap,            ()),  # map code over an array
+        }) # type: mouseRegistry.Registry
+
+        # name -> the word : defined under it
+        self.words = {}  # type: Dict[str, mouseCompile.Word]
 
         self.funcdict["#"] = (self._print_bound_ops, ())
 
@@ -156,21 +159,18 @@ class Mouse(object):
         print a list of currently defined operators and their functions."""
         __import__("pydoc").pager(
             "\na list of currently bound functions and operators:\n\n" +
-            "\n\n".join([
-                str(list(self.funcdict.keys())[i])
-                +  "\t"  + str(list(self.funcdict.values())[i][0].__name__)
-                + "\n\t" + str(list(self.funcdict.values())[i][0].__doc__)
-                for i in range(len(list(self.funcdict.keys())))
-                if  str(list(self.funcdict.values())[i][0].__doc__) != "None"
-                and str(list(self.funcdict.keys())[i])              != "None"
-            ])
+            "\n\n".join(
+                name + "\t" + funcname + "\n\t" + doc
+                for name, funcname, doc in self.funcdict.listing()
+            )
         )
 
-    def _get_tokens(self):
-        """to make sure we don't accidentally write to the program while it's running.
-        as with the Stack(), it's still possible, as is a self-modifying
-        implementation but this feels safer"""
-        return self.__tokens__
+    def compile(self, source):
+        """compile a string of mouse code against the current funcdict"""
+        prog = mouseCompile.compile_mouse(self, source, self.optimize)
+        if not isnone(self.memprofile):
+            self.memprofile.instrument(prog)
+        return prog
 
     def execute(self, proglist):
         """parse and JIT run mouse code"""
@@ -183,144 +183,277 @@ class Mouse(object):
                 + repr(type(proglist)).split("'")[1]
             ) from error
 
-        self.__tokens__  = [str(i) for i in proglist]
-        self.toklist     = self._get_tokens()
-        self.__progstr__ = "".join(self.toklist)
-
-        self.idx       = CaptainHook()
-        self.lit_table = LiteralTable()
-
-        self.line = 1
-        self.char = 1
-
-        # self._condwhile = True  # while loops are true by default
-
-        while True:
-            global _U_READ_AHEAD
-            _U_READ_AHEAD = False
+        self.run(self.compile("".join([str(i) for i in proglist])))
 
-            self._update_counters()
-
-            try:
-                self.tok = self.toklist[self.idx.v]
-
-            except IndexError:
-                if (
-                    len(self._stack.inspect())
-                    and _FROMFILE
-                ):
-                    self._stack.put()
-                break
-
-            if self.tok in DIGITS:
-                self._lit_num()
-                continue
-
-            elif self.tok in self.funcdict:
-                self.func, self.arg = self.funcdict.get(self.tok, nop)
-                try:
-                    self.func(*self.arg)
-                except ValueError as error:
-                    raise BadInternalCallException(
-                        "junk call, possible bug found"
-                    ) from error
-
-            else:
-                nodeftupl = (
-                    "at char " + str(self.char) + ", line " + str(self.line) +
-                    " of file " + _FILENAME + ": ignoring token '" + self.tok +
-                    "' which needs a definition before it can be used"
-                )
-                self._stack.log(nodeftupl, 2)
-
-            if not _U_READ_AHEAD:
-                self.idx.v = (self.idx.v + 1, self.lit_table)
+        # imported late: mouse16 imports everything else
+        import mouse16
+        if (
+            len(self._stack.inspect())
+            and mouse16._FROMFILE
+        ):
+            self._stack.put()
 
     # end def Mouse.execute
 
-    def _lit_num(self):
-        """( -- x )
-        catenate each contiguous numeral into a number, then push that"""
-        import re
-        num_match = re.compile(r"^([.\d]+[.\d]+|[.\d])")
-        result = re.match(num_match, "".join(self.toklist[self.idx.v:]))  # type: object
-        rangeof = range(self.idx.v, self.idx.v + result.span()[1])
-        self.lit_table.new(self.idx.v, rangeof)
+    def run(self, prog):
+        """run a compiled Program to its end"""
+        table = self.funcdict
+        stack = self._stack
+        push  = stack.push
+        depth = self.depth
+        code  = prog.code
+        end   = len(code)
+        loops = prog.iterations
+        pc    = 0
+        metrics = self.metrics
+        # whether to count each instruction, which costs a call apiece
+        counting = metrics.counting
+        # the deepest the stack's been in this run, that a BLOCK knew of
+        deepest = metrics.maxstack
+        started = time.perf_counter()
+        # how many times round a loop goes before it's compiled (never, if 0)
+        hot   = self.jithot if self.jit else 0
+        # (program, pc) to go back to when the program running now ends
+        frames = []  # type: List[Tuple[mouseCompile.Program, int]]
 
-        num = result.groups()[0]
         try:
-            num = float(num) if "." in num else int(num)
-        except ValueError:
-            self._stack.push(0.0)
+            while True:
+                while pc < end:
+                    opcode, arg = code[pc]
+                    pc += 1
+                    if counting:
+                        metrics.count(opcode, arg)
+
+                    if opcode == OP:
+                        arg()
+
+                    elif opcode == LIT:
+                        push(arg)
+
+                    elif opcode == CALL:
+                        arg()
+                        if table.version != prog.version:
+                            # something was rebound: carry on in a recompiled program
+                            prog, pc = self._recompile(prog, pc)
+                            code, end = prog.code, len(prog.code)
+                            loops = prog.iterations
+
+                    elif opcode == BLOCK:
+                        if len(stack.__stack__) >= arg[0]:
+                            start = pc
+                            if len(stack.__stack__) + arg[2] > deepest:
+                                deepest = len(stack.__stack__) + arg[2]
+                            try:
+                                for fast in arg[1]:
+                                    fast()
+                                    pc += 1
+                            except IndexError:
+                                # an operator took a path its stack effect
+                                # doesn't describe: carry on checking,
+                                # starting over with the one that failed
+                                pass
+                            metrics.blocked += pc - start
+                            if counting:
+                                metrics.block(arg, pc - start)
+
+                    elif opcode == JIT:
+                        ran = None
+                        if table.version == arg[0]:
+                            ran = arg[1](stack.__stack__)
+                        if isnone(ran):
+                            # it's not what the region was compiled for:
+                            # carry on as if it had never been compiled
+                            prog = prog.plain
+                            code = prog.code
+                            pc  -= 1
+                        else:
+                            pc = arg[2]
+                            if not isnone(arg[3]):
+                                loops[arg[3]] += ran
+                                metrics.jitted += ran
+
+                    elif opcode == IF:
+                        cond = stack.pop()
+                        if isnone(cond) or bool(cond):
+                            continue
+                        if isnone(arg):
+                            stack.log(
+                                "found EOF before matching brace: at char "
+                                + str(prog.position(prog.offset(pc - 1))[1]), 2
+                            )
+                            continue
+                        metrics.branches += 1
+                        pc = arg
+
+                    elif opcode == WHILE:
+                        cond = stack.pop()
+                        if not isnone(cond) and bool(cond):
+                            loops[arg[1]] += 1
+                            if loops[arg[1]] == hot:
+                                mouseJit.compile_loop(self, prog, pc - 1)
+                                code = prog.code
+                            continue
+                        if isnone(arg[0]):
+                            stack.log(
+                                "found EOF before matching brace: at char "
+                                + str(prog.position(prog.offset(pc - 1))[1]), 2
+                            )
+                            continue
+                        metrics.exits += 1
+                        pc = arg[0]
+
+                    elif opcode == JUMP:
+                        # only a ) jumps back to a ( loop's test, or the JIT
+                        # standing in for it: the JUMPs | and ¦ glue
+                        # together go somewhere else
+                        if arg < pc and code[arg][0] in (WHILE, JIT):
+                            metrics.loops += 1
+                        pc = arg
+
+                    elif opcode == GOTO:
+                        whereto = stack.pop()
+                        try:
+                            target = prog.targets.get(whereto)
+                        except TypeError:  # unhashable, so never cached
+                            target = None
+                        if isnone(target):
+                            prog, pc = self._goto_offset(prog, pc, whereto)
+                        else:
+                            metrics.gotohits += 1
+                            prog, pc = target
+                        code, end = prog.code, len(prog.code)
+                        loops = prog.iterations
+
+                    elif opcode == WARN:
+                        stack.log(*arg)
+
+                    elif opcode == ENTER:
+                        callee = arg()
+                        if table.version != prog.version:
+                            prog, pc = self._recompile(prog, pc)
+                            code, end = prog.code, len(prog.code)
+                            loops = prog.iterations
+                        if isinstance(callee, mouseCompile.Program):
+                            metrics.sample()
+                            # a tail call doesn't need its caller's frame
+                            if pc not in prog.tails:
+                                if len(frames) >= depth:
+                                    stack.error("recursionerr")
+                                    return
+                                frames.append((prog, pc))
+                            prog, pc = callee, 0
+                            code, end = prog.code, len(prog.code)
+                            loops = prog.iterations
+
+                if not len(frames):
+                    break
+                # the callee's done: return to its caller
+                metrics.sample()
+                prog, pc = frames.pop()
+                if table.version != prog.version:
+                    prog, pc = self._recompile(prog, pc)
+                code, end = prog.code, len(prog.code)
+                loops = prog.iterations
+
+        except ValueError as error:
+            raise BadInternalCallException(
+                "junk call, possible bug found"
+            ) from error
 
-        self._stack.push(num)
+        finally:
+            if deepest > metrics.maxstack:
+                metrics.maxstack = deepest
+            metrics.sample()
+            metrics.runtime += time.perf_counter() - started
+
+    # end def Mouse.run
+
+    def _recompile(self, prog, pc):
+        """the program and pc to carry on from, after the funcdict's changed"""
+        if not prog.recompile:
+            return prog, pc
+        offset = prog.offset(pc)
+        old    = prog
+        prog   = self.compile(prog.source)
+        if prog.loops == old.loops:
+            prog.iterations[:] = old.iterations
+        to = prog.map.pc(offset)
+        if not isnone(to):
+            return prog, to
+        prog = prog.base
+        to   = prog.map.pc(offset)
+        if isnone(to):
+            # what was rebound changed how the source lexes, so that an
+            # instruction now starts before where it stopped and ends after:
+            # that one's been run already, in part, so go on after it
+            to = prog.map.after(offset)
+        return prog, to
+
+    def _goto_offset(self, prog, pc, whereto):
+        """the program and pc to jump to for the popped \\ operand whereto
+        the first jump to each target checks it, and caches it in the program"""
+        key = whereto
+        self.metrics.gotomisses += 1
+        try:
+            whereto = int(float(whereto))
+        except (ValueError, TypeError, OverflowError):  # float(None) is a TypeError
+            self._stack.log("can't _goto a non-numeral index", 1)
+            return prog, pc
 
-        self.idx.v = (
-            self.idx.v + len(str(num)),
-            self.lit_table
-        )
+        if whereto < 0:
+            self._stack.log("can't _goto " + str(whereto) + ": before the start of the program", 3)
+            return prog, pc
 
-    def _lit_string(self):
-        """( -- "string" )
-        push everything between unescaped quotes to the stack,
-        then update the parser's string table with the range."""
-        import re
-        # get the string delimiter from the function list
-        # using the function whose fingerprint we know
-        # to essentially reverse-engineer the function dict
-        string_delim = list(self.funcdict.keys())[
-                list(self.funcdict.values())
-                .index((self._lit_string, ()))]
-
-        # get the string, using the possibly custom delimiter interpolated
-        expr = re.compile(
-            r'{}([^{}\\]*(?:\\.[^{}\\]*)*){}'
-            .format(
-                string_delim,
-                string_delim,
-                string_delim,
-                string_delim,
-            )
-        )
+        # whitespace and comments go to whatever comes after them
+        to = prog.map.pc(whereto)
+        if not isnone(to):
+            target = prog, to
 
-        # extract it
-        result = re.match(expr, "".join(self.toklist[self.idx.v:]))
+        # somewhere the optimizer folded away; the unoptimized program has it
+        elif not isnone(prog.base.map.pc(whereto)):
+            target = prog.base, prog.base.map.pc(whereto)
 
-        # get its expanse
-        try:
-            rangeof = range(self.idx.v, self.idx.v + result.span()[1])
-        except AttributeError:
-            return self._stack.log("parser found EOF before closing quote at " + str(self.idx.v), 2, stklvl=4)
+        else:
+            self._stack.log("can't _goto " + str(whereto) + ": it's inside a literal", 2)
+            return prog, pc
 
-        # add its entry to the table or fail
-        self.lit_table.new(self.idx.v, rangeof)
+        if len(prog.targets) < GOTOCACHE:
+            try:
+                prog.targets[key] = target
+            except TypeError:  # unhashable
+                pass
+        return target
 
-        self._stack.push(result.groups()[0])
+    def _lit_string(self):
+        """( -- "string" )
+        push everything between unescaped quotes to the stack.
+        string literals are read by the compiler, which looks
+        for whichever glyph is bound to this"""
 
-        # update the parser's index
-        self.idx.v = (
-            self.idx.v + len(repr(result.groups()[0])),
-            self.lit_table
-        )
+    def _comment(self):
+        """¶
+        a comment, up to the next ¶ outside a string literal. if the source
+        has ¶ only at the starts of lines, each is a comment up to the end of
+        its line instead. comments are skipped by the compiler, which looks
+        for whichever glyph is bound to this"""
 
     def _lit_char(self):
         """ ( -- x )
-        push the charcode of the next char in the program,
-        then tell the parser to skip that char"""
+        push the charcode of the next char in the program.
+        character literals are read by the compiler, which looks
+        for whichever glyph is bound to this"""
+
+    def load_library(self, path):
+        """run a mouse library once per process and share its results
+        with this interpreter (see mouseLib)"""
+        import mouseLib
         try:
-            self._stack.push(
-                ord(self.toklist[
-                    self.idx.v + 1]))
-
-        except IndexError:
-            self._stack.log(
-                "found EOF before character for literal at char " +
-                str(self.char + 1) + ", line " + str(self.line) +
-                " : file " + _FILENAME, 2
-            )
-        else:
-            self.lit_table.new(self.idx.v, range(1))       # add string to list
-            self.idx.v = (self.idx.v + 2, self.lit_table)  # skip next char
+            lib = mouseLib.load(path, self)
+        except (IOError, OSError) as error:
+            self._stack.log("can't load library " + repr(path) + ": " + str(error), 3)
+            return
+        lib.install(self)
+        return lib
 
     def _writer(self):
         """ ( x -- )
@@ -328,139 +461,151 @@ class Mouse(object):
         (WIP)"""
         self._stack.put()
 
-    def _next_brace(self, match):
-        """walk the program, trying to find a matching brace"""
-        depth = 0
-        prog  = self.toklist[self.idx.v:]
-        if len(match) != 1 or match not in "([{}])":
-            raise mouseStack.BadInternalCallException("junk paren type")
-
-        if match in "()":
-            group = ["(", ")"]
-
-        elif match in "[]":
-            group = ["[", "]"]
-
-        elif match in "{}":
-            group = ["{", "}"]
-
-        for i, e in enumerate(prog):
-            if e == group[0]:    # found a homogenous opener
-                depth += 1
-
-            elif e == group[1]:  # found a homogenous closer
-                depth -= 1
-
-            if depth == 0:
-                return self.idx.v + i
-
-        self._stack.log(
-            "found EOF before matching brace: at char "
-            + str(self.char), 2
-        )
-
-    def _last_brace(self, match):
-        """walk the program in reverse, trying to find a matching brace"""
-        depth = 0
-        prog  = reversed(self.toklist[:self.idx.v])
-        if len(match) != 1 or match not in "([{}])":
-            raise BadInternalCallException("junk paren type")
-
-        if match in "()":
-            group = ["(", ")"]
-
-        elif match in "[]":
-            group = ["[", "]"]
-
-        elif match in "{}":
-            group = ["{", "}"]
-
-        for i, e in enumerate(prog):
-            if e == group[0]:    # found a homogenous opener
-                depth -= 1
-            elif e == group[1]:  # found a homogenous closer
-                depth += 1
-
-            if depth == 0:
-                return self.idx.v - i
-
-        raise BadInternalCallException("junk paren code")
-
     def _string_as_mouse(self):
         """ ( x -- )
-        pop a string off the stack and give it to the runner"""
+        pop a quotation or a string off the stack and give it to the runner.
+        either is returned as the Program to call, so the runner can
+        call it in a frame of its own instead of recursing"""
         prog = self._stack.pop()
+        if isnone(prog):
+            return None
+        if isinstance(prog, mouseCompile.Quotation):
+            return prog.program(self)
+        prog = unrope(prog)
         if isstr(prog) and prog.startswith("!!PY!!"):
             try:
-                exec(prog[6:])
+                exec(self._compile_python(prog[6:]), self.namespace)
             except Exception as error:
                 print(str(error) + "\n")
             except KeyboardInterrupt:
                 pass
             except EOFError:
                 return
+            return None
+        return self._quote(prog if isstr(prog) else str(prog)).program(self)
+
+    def _compile_python(self, source):
+        """the code object for the python source of a !!PY!! string,
+        compiled only if it isn't one of the last PYCACHE to have run"""
+        code = self._python.get(source)
+        if isnone(code):
+            self.metrics.pymisses += 1
+            code = compile(source, "<!!PY!!>", "exec")
+            if len(self._python) >= PYCACHE:
+                self._python.popitem(last=False)
+            self._python[source] = code
         else:
-            try:
-                self.execute(prog)
-            except TypeError:
-                try:
-                    self.execute(list(str(prog)))
-                except Exception as error:
-                    self._stack.log("tried to exec junk; failed (" + error + ")", 3)
+            self.metrics.pyhits += 1
+            self._python.move_to_end(source)
+        return code
+
+    def _quote(self, source):
+        """the Quotation for a string of code, compiled only the first time
+        it's run (until STRINGCACHE others have been)"""
+        quot = self._strings.get(source)
+        if isnone(quot):
+            self.metrics.strmisses += 1
+            if len(self._strings) >= STRINGCACHE:
+                self._strings.clear()
+            quot = mouseCompile.Quotation(self.compile(source), self)
+            self._strings[source] = quot
+        else:
+            self.metrics.strhits += 1
+        return quot
 
     def _trade_ret_main(self):
         """ ( ? -- ? )
         swap the contents of the main stack with the secondary stack"""
-        oldstk = self._stack.clean()   # type: List[Any]
-        oldret = self._retstk.clean()  # type: List[Any]
-
-        self._stack.__stack__  = oldret
-        self._retstk.__stack__ = oldstk
-
-    def _get_addr(self):
-        """readahead and put an address on the stack"""
-        self._lit_char()
-        addr = self._stack.copy()
-        if isnone(addr):
-            self._stack.error("stackunderflow")
-
-        elif isint(addr):
-            del addr
-
-        elif isstr(addr) and len(addr) == 1:
-            self._stack.drop()
-            self._stack.push(ord(addr))
-
-        else:
-            self._stack.push(int(id(addr)))
-
-    def _update_counters(self):
-        """get the current line number and char number on that line"""
-        for i, e in enumerate(self.__progstr__):
-            if i == self.idx.v:
-                break
-            if e == "\n":
-                self.line += 1
-                self.char  = 1
-            else:
-                self.char += 1
+        self.trade(self._retstk)
+
+    def trade(self, other):
+        """swap the contents of the main stack with the Stack other's,
+        by swapping the lists they hold: it takes the same time however
+        deep they are. nothing may keep a stack's list across a trade"""
+        self._stack.__stack__, other.__stack__ = other.__stack__, self._stack.__stack__
+        self.metrics.sample()
+
+    def named(self, name):
+        """the stack called name, made empty the first time it's used"""
+        stk = self.stacks.get(name)
+        if isnone(stk):
+            stk = self.stacks[name] = mouseStack.Stack()
+            stk.ropes   = self._stack.ropes
+            stk.ropemin = self._stack.ropemin
+        return stk
+
+    def move(self, count, source, dest):
+        """move the top count items of the Stack source onto dest,
+        in the same order, in one slice"""
+        items = source.__stack__
+        if count > len(items):
+            source.error("stackunderflow")
+            return
+        if count > 0:
+            dest.__stack__.extend(items[-count:])
+            del items[-count:]
+            self.metrics.sample()
+
+    def _pop_stack(self):
+        """pop the name of a stack: a string, or the charcode of one glyph;
+        that stack, or None"""
+        name = self._stack.pop()
+        if isnone(name):
+            return None
+        if isnum(name):
+            try:
+                name = chr(int(name))
+            except (ValueError, OverflowError):
+                pass
+        name = unrope(name)
+        if not isstr(name) or not len(name):
+            self._stack.log("can't name a stack " + repr(name), 1)
+            return None
+        return self.named(name)
+
+    def _trade_named(self):
+        """ ( ? s -- ? )
+        pop the name of a stack, and swap the contents of the main stack
+        with it: '~§ is ~, and a name not used before starts out empty"""
+        other = self._pop_stack()
+        if not isnone(other):
+            self.trade(other)
+
+    def _pop_count(self):
+        """pop a count of items to move, or None"""
+        count = self._stack.pop()
+        if isnone(count):
+            return None
+        # inf and nan are numbers, but not counts
+        if not isnum(count) or not math.isfinite(count):
+            self._stack.log("can't move " + repr(count) + " items", 1)
+            return None
+        return int(count)
+
+    def _move_to(self):
+        """ ( ? n s -- ? )
+        pop the name of a stack and a count, then move that many items
+        from the top of the main stack onto the named one, keeping their order"""
+        dest  = self._pop_stack()
+        count = self._pop_count()
+        if not isnone(dest) and not isnone(count):
+            self.move(count, self._stack, dest)
+
+    def _move_from(self):
+        """ ( ? n s -- ? )
+        pop the name of a stack and a count, then move that many items
+        from the top of the named stack onto the main one, keeping their order"""
+        source = self._pop_stack()
+        count  = self._pop_count()
+        if not isnone(source) and not isnone(count):
+            self.move(count, source, self._stack)
 
     # basic control flow operators jump around the source somewhat arbitrarily
 
     def _simple_if(self):
         """IFF
-        jumps the pointer around the program based on a condition"""
-        cond = self._stack.pop()
-        if isnone(cond):
-            return
-        if bool(cond):
-            self.idx.v = (self.idx.v + 1, self.lit_table)
-        else:
-            nb = self._next_brace("[")
-            if isnone(nb):
-                return
-            self._stack.push(nb)
-            self._goto()
+        jumps the pointer around the program based on a condition:
+        compiled to a branch past the matching ]"""
 
     def _simple_fi(self):
         """FFI
@@ -470,50 +615,143 @@ class Mouse(object):
 
     def _simple_while(self):
         """WHILE 1
-        jumps the pointer back to the opener while the top of the stack is true"""
-        print("reached an open brace")
+        pops a condition each time round: while it's true, runs up to the
+        matching ), which jumps straight back here; when it's false (or the
+        stack is empty), jumps past the )"""
 
     def _simple_elihw(self):
         """ELIHW
-        ends a simple while/for loop (nop/perma-placeholder)"""
-        nb = self._last_brace(")")
-        if isnone(nb):
-            return
-        self._stack.push(nb)
-        self._goto()
+        ends a simple while/for loop: compiled to a jump back to the opener"""
 
     def _goto(self):
         """( x -- )
         pops an int from the stack and jumps to that char in the source code
-        (unless the position is occupied by a literal in the LiteralTable)"""
-        whereto = self._stack.pop()
-        try:
-            whereto = int(float(whereto))
-        except (ValueError, TypeError):  # coersion of None to float is a TypeError
-            self._stack.log("can't _goto a non-numeral index", 1)
-        else:
-            self.idx.v = (whereto, self.lit_table)
+        (unless the position is occupied by a literal)"""
 
     # quotation based control structs
 
     def _mk_quot(self):
-        """handle parsing of quotations/lists"""
-        pass
+        """{
+        begins a quotation: everything up to the matching } is compiled,
+        once, into a block of code which is pushed instead of run"""
 
     def _mk_touq(self):
-        """the end of a quotation/list"""
-        pass
+        """}
+        the end of a quotation"""
 
     def _new_word(self):
-        """pop a quotation and an address to an identifier,
-        then assign that identifier to that function in the dict"""
-        pass
+        """( q n -- )
+        pop a name and a quotation (or a string of code), then bind the name
+        to a word which calls it. the name is a string of glyphs, or the
+        charcode of a single glyph; redefining a word swaps its body,
+        without recompiling anything that calls it"""
+        name = unrope(self._stack.pop())
+        body = unrope(self._stack.pop())
+        if isnone(name) or isnone(body):
+            return
+
+        if isnum(name):
+            try:
+                name = chr(int(name))
+            except (ValueError, OverflowError):
+                pass
+        if (
+            not isstr(name) or not len(name)
+            or name[0] in DIGITS or anyof(*map(str.isspace, name))
+        ):
+            self._stack.log("can't name a word " + repr(name), 1)
+            return
+
+        if isstr(body):
+            body = self._quote(body)
+        if not isinstance(body, mouseCompile.Quotation):
+            self._stack.log(
+                "can't define the word " + name + " as a "
+                + repr(type(body)).split("'")[1], 1
+            )
+            return
+
+        self.define(name, body)
+
+    def define(self, name, body):
+        """bind name to a word calling the Quotation body, or give
+        the word already bound to name a new body"""
+        word = self.words.get(name)
+        if not isnone(word) and self.funcdict.get(name, (None,))[0] is word:
+            word.body = body
+            return
+        word = self.words[name] = mouseCompile.Word(self, name, body)
+        self.funcdict[name] = (word, ())
 
     def _dofor(self):
-        """do something while something else is true"""
-        pass
+        """( c b -- )
+        pops a quotation to run as the body, and one as the condition:
+        runs the condition, then pops what it left; while that's true,
+        runs the body and goes round again"""
+        body = self._stack.pop()
+        cond = self._stack.pop()
+        if isnone(body) or isnone(cond):
+            return None
+        enter = self._string_as_mouse
+        return mouseCompile.glue(self, (
+            (LIT,   cond),
+            (ENTER, enter),
+            (WHILE, (6, 0)),
+            (LIT,   body),
+            (ENTER, enter),
+            (JUMP,  0),
+        ), loops=(0,))
+
+    def _pmap(self):
+        """( a q -- b )
+        pop a quotation (or a string of code) and an array, and run the code
+        once per element, each on a stack of its own holding just that
+        element, in parallel (see mouseParallel). push the array of the
+        numbers the runs left on top, in order"""
+        import mouseParallel
+        code = self._stack.pop()
+        arr  = self._stack.pop()
+        if isnone(code) or isnone(arr):
+            return
+        if not isinstance(arr, mouseArray.ARRAY):
+            self._stack.log("can't map over a " + repr(type(arr)).split("'")[1], 1)
+            return
+        code = unrope(code)
+        if isinstance(code, mouseCompile.Quotation):
+            code = code.source
+        if not isstr(code):
+            self._stack.log("can't map a " + repr(type(code)).split("'")[1], 1)
+            return
+
+        try:
+            out = mouseParallel.pmap(self, code, arr, self.workers, self.chunksize)
+        except Exception as error:
+            self._stack.log("the map of " + repr(code) + " failed: " + str(error), 3)
+            return
+        if not all(map(isnum, out)):
+            self._stack.log(
+                "the map of " + repr(code) + " left something besides numbers", 1
+            )
+            return
+        self._stack.push(mouseArray.new(out))
 
     def _doif(self):
-        """pops a quotation as a condition, another to execute if true,
+        """( f t c -- )
+        pops a quotation as a condition, another to execute if true,
         and another to execute if the condition is false"""
-        pass
+        cond  = self._stack.pop()
+        true  = self._stack.pop()
+        false = self._stack.pop()
+        if isnone(cond) or isnone(true) or isnone(false):
+            return None
+        enter = self._string_as_mouse
+        return mouseCompile.glue(self, (
+            (LIT,   cond),
+            (ENTER, enter),
+            (IF,    6),
+            (LIT,   true),
+            (ENTER, enter),
+            (JUMP,  8),
+            (LIT,   false),
+            (ENTER, enter),
+        ))
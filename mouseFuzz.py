@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+
+"""mouseFuzz - differential fuzzing of the mouse16 interpreter's modes
+
+Usage: mouseFuzz.py [ -n N ] [ --seed=N ] [ --size=N ] [ --timeout=S ]
+                   [ --jithot=N ] [ --ropemin=N ] [ MODE... ]
+
+Options:
+
+    -n N, --number=N   how many programs to generate [default: 500]
+          --seed=N     the seed they're generated from [default: 0]
+          --size=N     about how many tokens each one has [default: 12]
+          --timeout=S  how many seconds a run may take [default: 0.1]
+          --jithot=N   how many times round a loop goes before the JIT
+                       compiles it, in the modes checked [default: 3]
+          --ropemin=N  how long a string has to be to make a rope, in the
+                       modes checked [default: 16]
+    -h,   --help       print this help & exit
+
+Modes are mouseBench's: reference, optimized, ropes, jit. Omitting MODE
+checks all of them.
+
+First, each program in KNOWN is run in every mode checked, with the
+thresholds given and with the defaults, and has to leave just what the
+table says it does: that doesn't rely on any mode being right.
+
+Then each generated program is run on a fresh interpreter in the
+reference mode (no peephole pass) and in each mode checked, with the
+thresholds given, which are low enough for small programs to reach the
+JIT and ropes. What a mode leaves on both stacks, writes to stdout, warns
+about and raises has to match the reference. A program that doesn't
+match is cut down, a token at a time, to a smallest program that still
+doesn't, and printed. A program that runs past the timeout in any mode
+is skipped.
+
+At the end it prints how long each mode took to run the programs they
+all finished, next to the reference. The exit status is 1 if any
+program didn't match."""
+
+import io
+import random
+import signal
+import sys
+import time
+import warnings
+
+import mouseExec
+
+from docopt import docopt
+
+from mouseBench import MODES
+
+
+__all__ = [
+    "KNOWN",
+    "THRESHOLDS",
+    "known",
+    "generate",
+    "outcome",
+    "differ",
+    "minimize",
+    "fuzz",
+    "main",
+]
+
+
+# what programs are made of. each is a token of its own, so a program
+# that fails can be cut down a token at a time
+ATOMS = [
+    "0", "1", "2", "3", "7", "10", "300", "1.5", "0.25",
+    '""', '"a"', '"ab"', '"abc"', '"12"', '"3.5"', "'a", "'0",
+    # long enough to make ropes at the default --ropemin, and (repeated
+    # 300 times with *) at ROPEMIN
+    '"abcdefghijklmnopqrstuvwxyz"',
+]
+
+OPERATORS = list("+-*/<>=_$%^@&!,;~") + ["⍳", "⊂", "⊃", "Σ", "§", "»", "«"]
+
+# rarer ones, which call, jump, branch on quotations or start comments
+RARE = ["`", "\\", "|", "¦", ":", "$`", "¶"]
+
+# how many times a generated loop goes round: sometimes past mouseJit.JITHOT
+COUNTS = ["2", "3", "5", "120"]
+
+# what the body of a loop the JIT can compile does to its total, a step
+# at a time, and what a loop building a string (into a rope) adds to it
+STEPS = ["1+", "2*", "3-", "2/", "1.5*", "3+", "5<", "0=", "$+"]
+PIECES = ['"a"', '"abc"', '"12"', '"abcdefghijklmnopqrstuvwxyz"']
+
+# the mouseExec.Mouse thresholds the modes checked get, by default
+THRESHOLDS = {"jithot": 3, "ropemin": 16}
+
+# programs, and the stack each has to leave, worked out by hand: long
+# loops for the JIT, and strings past mouseRope.ROPEMIN for ropes
+KNOWN = [
+    ("0 150$(%1+%1-$)",                   [150, 0]),
+    ("0 150$(%^+%1-$)",                   [11325, 0]),
+    ("0 150$(%0.5+%1-$)",                 [75.0, 0]),
+    ('""500$(1-%"abcdefghij"+%$)',        ["abcdefghij" * 500, 0]),
+    ('"abcdefghij" 500 * _',              ["jihgfedcba" * 500]),
+    ('"abcdefghij" 500 * _ _ "x" +',      ["abcdefghij" * 500 + "x"]),
+    ('"abcdefghijklmnopqrstuvwxyz" _ "!" +', ["zyxwvutsrqponmlkjihgfedcba!"]),
+]
+
+
+class _Timeout(Exception):
+    """a run took longer than it was given"""
+
+
+def _alarm(signum, frame):
+    raise _Timeout()
+
+
+def generate(rng, size, depth = 0):
+    """a random program of about size tokens, as a list of them: atoms and
+    operators, with [ ], ( ) loops and { } quotations nested in it. some
+    of the loops are only arithmetic on a total, for the JIT, and some
+    only add to a string, for ropes"""
+    tokens = []  # type: List[str]
+    while len(tokens) < size:
+        pick = rng.random()
+        if depth < 2 and pick < 0.08:
+            tokens += ["["] + generate(rng, size // 3, depth + 1) + ["]"]
+        elif depth < 2 and pick < 0.14:
+            # counted down on the secondary stack, so the body can't upset it
+            tokens += [rng.choice(COUNTS), "$(", "~"]
+            tokens += generate(rng, size // 3, depth + 1)
+            tokens += ["~", "1-$)"]
+        elif depth < 2 and pick < 0.18:
+            # ( -- total 0 )
+            tokens += [rng.choice(["0", "1", "2.5"]), rng.choice(COUNTS), "$(", "%"]
+            tokens += [rng.choice(STEPS) for _ in range(rng.randint(1, 4))]
+            tokens += ["%", "1-$)"]
+        elif depth < 2 and pick < 0.22:
+            # ( -- string 0 )
+            tokens += [rng.choice(PIECES), rng.choice(COUNTS), "$(", "1-%"]
+            tokens += [rng.choice(PIECES)]
+            tokens += [rng.choice(["+", "%+"]), "%$)"]
+        elif depth < 2 and pick < 0.28:
+            tokens += ["{"] + generate(rng, size // 3, depth + 1) + ["}"]
+        elif pick < 0.31:
+            tokens.append(rng.choice(RARE))
+        elif pick < 0.6:
+            tokens.append(rng.choice(ATOMS))
+        else:
+            tokens.append(rng.choice(OPERATORS))
+    return tokens
+
+
+def _source(tokens):
+    return " ".join(tokens)
+
+
+def outcome(kwds, source, timeout):
+    """(what running source on a fresh Mouse(**kwds) did, how long it
+    took), or None if it took longer than timeout seconds"""
+    mouse = mouseExec.Mouse(**kwds)
+    out   = io.StringIO()
+    saved = sys.stdin, sys.stdout
+    sys.stdin, sys.stdout = io.StringIO(), out
+    raised = None
+    previous = signal.signal(signal.SIGALRM, _alarm)
+    try:
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            started = time.perf_counter()
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+            try:
+                mouse.execute(list(source))
+            except _Timeout:
+                return None
+            except Exception as error:
+                raised = type(error).__name__ + ": " + str(error)
+            finally:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+            seconds = time.perf_counter() - started
+    finally:
+        signal.signal(signal.SIGALRM, previous)
+        sys.stdin, sys.stdout = saved
+    return (
+        repr(mouse._stack.inspect()), repr(mouse._retstk.inspect()),
+        out.getvalue(),
+        [warning.category.__name__ + ": " + str(warning.message) for warning in caught],
+        raised,
+    ), seconds
+
+
+def known(modes, thresholds = THRESHOLDS, timeout = 5.0):
+    """[(source, mode, what it did)] for each program in KNOWN that
+    doesn't leave what the table says in one of modes, run both with
+    thresholds and without"""
+    failures = []  # type: List[Tuple[str, str, Any]]
+    for source, stack in KNOWN:
+        expected = repr(stack), "[]", "", [], None
+        for name, kwds in [MODES[0]] + list(modes):
+            for given in (kwds, dict(kwds, **thresholds)):
+                result = outcome(given, source, timeout)
+                if result is None or result[0] != expected:
+                    failures.append((source, name, result and result[0]))
+    return failures
+
+
+def _lowered(modes, thresholds):
+    """modes, each with thresholds added to its keyword arguments"""
+    return [(name, dict(kwds, **thresholds)) for name, kwds in modes]
+
+
+def differ(source, modes, timeout):
+    """{mode: (outcome, seconds)} for source in the reference mode and each
+    of modes (which are (name, kwds) pairs), and the names of the modes
+    whose outcomes differ from the reference's; None if any timed out"""
+    results = {}  # type: Dict[str, Tuple[Any, float]]
+    for name, kwds in [MODES[0]] + list(modes):
+        if name in results:
+            continue
+        result = outcome(kwds, source, timeout)
+        if result is None:
+            return None
+        results[name] = result
+    reference = results[MODES[0][0]][0]
+    return results, [name for name in results if results[name][0] != reference]
+
+
+def minimize(tokens, fails):
+    """a smallest list of tokens, cut from tokens, for which fails(tokens)
+    is still true: take out ever smaller runs of them while it stays true,
+    then single tokens until none can go"""
+    chunk = max(1, len(tokens) // 2)
+    while True:
+        at, before = 0, len(tokens)
+        while at < len(tokens):
+            cut = tokens[:at] + tokens[at + chunk:]
+            if fails(cut):
+                tokens = cut
+            else:
+                at += chunk
+        if chunk == 1 and len(tokens) == before:
+            return tokens
+        chunk = max(1, chunk // 2)
+
+
+def fuzz(
+    number, seed = 0, size = 12, modes = MODES[1:], timeout = 0.1,
+    report = None, thresholds = THRESHOLDS
+):
+    """run number programs generated from seed on the reference mode and
+    on modes (given thresholds), calling report(source, results, names)
+    with each minimized program which differs. (how many differed, how
+    many timed out, {mode: seconds} for the programs every mode finished)"""
+    rng     = random.Random(seed)
+    failed  = timedout = 0
+    seconds = {name: 0.0 for name, _ in [MODES[0]] + list(modes)}
+    modes   = _lowered(modes, thresholds)
+
+    for _ in range(number):
+        tokens = generate(rng, size)
+        ran    = differ(_source(tokens), modes, timeout)
+        if ran is None:
+            timedout += 1
+            continue
+        results, names = ran
+        for name, (_, taken) in results.items():
+            seconds[name] += taken
+        if not len(names):
+            continue
+
+        failed += 1
+
+        def fails(cut):
+            ran = differ(_source(cut), modes, timeout)
+            return ran is not None and set(names) <= set(ran[1])
+
+        tokens = minimize(tokens, fails)
+        if report is not None:
+            report(_source(tokens), *differ(_source(tokens), modes, timeout))
+
+    return failed, timedout, seconds
+
+
+def _report(source, results, names):
+    print("# differs: " + repr(source))
+    for name in [MODES[0][0]] + names:
+        print("  {:<10} {!r}".format(name, results[name][0]))
+
+
+def main():
+    args  = docopt(__doc__)
+    named = dict(MODES)
+    for name in args["MODE"]:
+        if name not in named:
+            print("no mode " + repr(name) + ": try " + ", ".join(named))
+            sys.exit(2)
+    modes = [(name, named[name]) for name in args["MODE"]] or MODES[1:]
+
+    thresholds = {
+        "jithot": int(args["--jithot"]), "ropemin": int(args["--ropemin"]),
+    }
+
+    wrong = known(modes, thresholds)
+    for source, name, result in wrong:
+        print("# wrong: {!r} in {}: {!r}".format(source, name, result))
+
+    failed, timedout, seconds = fuzz(
+        int(args["--number"]), int(args["--seed"]), int(args["--size"]),
+        modes, float(args["--timeout"]), _report, thresholds,
+    )
+
+    reference = seconds[MODES[0][0]]
+    for name, taken in seconds.items():
+        print("{:<32} {:>9.3f} s {:>7.2f}x".format(
+            name + " run", taken, reference / taken if taken else 0.0
+        ))
+    print("{} known programs wrong, {} programs, {} differed, {} timed out".format(
+        len(wrong), int(args["--number"]), failed, timedout
+    ))
+    sys.exit(1 if failed or len(wrong) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+
+"""the JIT for mouse16: --jit
+
+once a ( loop has gone round the interpreter's jithot (JITHOT, unless it's
+given another) times, its body is looked at again.
+if it's nothing but number literals and numeric builtins (arithmetic,
+comparisons, and stack shuffling), the whole loop is translated into a
+Python function which keeps the part of the stack it works on in local
+variables, and that function stands in for the loop from then on. if the
+body does anything else, each straight-line BLOCK in it that is made only
+of those is translated the same way instead.
+
+a translated region is specialized: it runs only while the funcdict is the
+one it was compiled against, and only on ints and floats, which everything
+it does keeps them. it checks both before it starts, and if either has
+changed, the interpreter carries on with the program as it was compiled,
+without the JIT, from the same place.
+
+translations are cached by their Python source, so the same code compiled
+again, in any Program, reuses the same function."""
+
+import copy
+import math
+
+import mouseStack
+
+from mouseClutter import *
+
+from mouseCompile import LIT, OP, NOP, JUMP, BLOCK, JIT, effect
+
+
+__all__ = [
+    "JITHOT",
+    "compile_loop",
+]
+
+
+# how many times round a loop has to go before it's compiled
+JITHOT = 100
+
+# how many translations to keep compiled
+JITCACHE = 256
+
+# operator -> the BINOPS handler it's translated for, and the expression
+# it's translated to, of the second-to-top (x) and top (y) items
+BINARY = {
+    "add":     (mouseStack._add, "{x} + {y}"),
+    "sub":     (mouseStack._sub, "{x} - {y}"),
+    "mlt":     (mouseStack._mlt, "{x} * {y}"),
+    "lss":     (mouseStack._lss, "int({x} < {y})"),
+    "gtr":     (mouseStack._gtr, "int({x} > {y})"),
+    "equ":     (mouseStack._equ, "int({x} == {y})"),
+    "swapsub": (mouseStack._sub, "{y} - {x}"),
+    "swaplss": (mouseStack._lss, "int({y} < {x})"),
+    "swapgtr": (mouseStack._gtr, "int({y} > {x})"),
+}
+
+# the same, for operators of the top item alone
+UNARY = {
+    "neg":    (None,            "0 - {x}"),
+    "dupadd": (mouseStack._add, "{x} + {x}"),
+    "dupmlt": (mouseStack._mlt, "{x} * {x}"),
+}
+
+# the handler's name in BINOPS, for each handler above
+_BINOPNAME = {
+    mouseStack._add: "add", mouseStack._sub: "sub", mouseStack._mlt: "mlt",
+    mouseStack._lss: "lss", mouseStack._gtr: "gtr", mouseStack._equ: "equ",
+}
+
+
+def _shuffle(name):
+    """the items operator name leaves on the stack, as indices into the
+    items it takes: worked out by running it on a stack of indices"""
+    need = effect(getattr(mouseStack.Stack, name))[0]
+    stk  = mouseStack.Stack()
+    stk.__stack__ = list(range(need))
+    getattr(stk, name)()
+    perm = stk.__stack__
+    # items at the bottom it leaves where they were, it doesn't take
+    keep = 0
+    while (
+        keep < min(need, len(perm)) and perm[keep] == keep
+        and keep not in perm[keep + 1:]
+    ):
+        keep += 1
+    return need - keep, tuple(i - keep for i in perm[keep:])
+
+# operator -> (how many items it takes, the indices of what it leaves)
+SHUFFLES = {
+    name: _shuffle(name)
+    for name in ("dup", "swap", "over", "rot", "drop", "nip", "tuck")
+}
+
+# generated source -> the compiled function
+_FUNCS = {}  # type: Dict[str, Callable[[List[Any]], Optional[int]]]
+
+
+class _Untranslatable(Exception):
+    """the region does something the JIT doesn't translate"""
+
+
+class _Region(object):
+
+    def __init__(self):
+        """a straight-line run of instructions being translated:
+        a stack of Python expressions, with the items taken from below it"""
+        self.stack = []  # type: List[str]
+        self.taken = 0   # type: int
+        self.lines = []  # type: List[str]
+        self.temps = 0   # type: int
+
+    def pop(self):
+        """the expression for the top item, taking one from the real
+        stack (a1 is the top on entry, a2 below it...) if there's none"""
+        if len(self.stack):
+            return self.stack.pop()
+        self.taken += 1
+        return "a" + str(self.taken)
+
+    def temp(self, expr):
+        """a new local holding expr"""
+        self.temps += 1
+        name = "t" + str(self.temps)
+        self.lines.append(name + " = " + expr)
+        return name
+
+    def feed(self, stack, opcode, arg):
+        """translate one instruction"""
+        if opcode == NOP or opcode == BLOCK:
+            return
+        if opcode == LIT:
+            if type(arg) not in (int, float) or not math.isfinite(arg):
+                raise _Untranslatable(arg)
+            self.stack.append(repr(arg) if arg >= 0 else "(" + repr(arg) + ")")
+            return
+        if opcode != OP or getattr(arg, "__self__", None) is not stack:
+            raise _Untranslatable(arg)
+
+        name = arg.__name__
+        if name in SHUFFLES:
+            need, perm = SHUFFLES[name]
+            items = [self.pop() for _ in range(need)][::-1]
+            self.stack.extend(items[i] for i in perm)
+        elif name in BINARY or name in UNARY:
+            handler, form = BINARY[name] if name in BINARY else UNARY[name]
+            if not isnone(handler) and not all(
+                mouseStack.BINOPS.get((_BINOPNAME[handler], x, y)) is handler
+                for x, y in mouseStack.NUMPAIRS
+            ):
+                raise _Untranslatable(name)
+            y = self.pop()
+            x = self.pop() if name in BINARY else y
+            self.stack.append(self.temp(form.format(x=x, y=y)))
+        else:
+            raise _Untranslatable(name)
+
+
+def _args(names):
+    return ", ".join(names) + ("," if len(names) == 1 else "")
+
+
+def _entry(region):
+    """the lines loading and checking the items a region takes"""
+    names = ["a" + str(n) for n in range(region.taken, 0, -1)]
+    if not len(names):
+        return []
+    return [
+        "if len(stk) < {}:".format(len(names)),
+        "    return None",
+        "{} = stk[-{}:]".format(_args(names), len(names)),
+        "if " + " or ".join(
+            "type({}) not in _NUM".format(name) for name in names
+        ) + ":",
+        "    return None",
+    ]
+
+
+def _function(lines):
+    """the function for a translation, compiled only the first time"""
+    source = "def region(stk):\n" + "".join("    " + line + "\n" for line in lines)
+    func = _FUNCS.get(source)
+    if isnone(func):
+        if len(_FUNCS) >= JITCACHE:
+            _FUNCS.clear()
+        scope = {"_NUM": (int, float)}
+        exec(compile(source, "<mouse jit>", "exec"), scope)
+        func = _FUNCS[source] = scope["region"]
+    return func
+
+
+def _straight(stack, code):
+    """the function for the straight-line instructions code: it returns
+    None if it can't run them, otherwise it runs them and returns 0"""
+    region = _Region()
+    for opcode, arg in code:
+        region.feed(stack, opcode, arg)
+    return _function(
+        _entry(region) + region.lines + [
+            "stk[len(stk) - {}:] = ({})".format(region.taken, _args(region.stack)),
+            "return 0",
+        ]
+    )
+
+
+def _loop(stack, code):
+    """the function for a ( loop whose body is the instructions code:
+    it returns None if it can't run it, otherwise it runs it until it's
+    done and returns how many times it went round"""
+    region = _Region()
+    cond   = region.pop()
+    for opcode, arg in code:
+        region.feed(stack, opcode, arg)
+    # each time round has to leave the stack as deep as it found it
+    if len(region.stack) != region.taken:
+        raise _Untranslatable("the loop changes the depth of the stack")
+    names = ["a" + str(n) for n in range(region.taken, 0, -1)]
+    return _function(
+        _entry(region) + [
+            "n = 0",
+            "while " + cond + ":",
+            "    n += 1",
+        ] + [
+            "    " + line for line in region.lines
+        ] + [
+            "    {} = {}".format(_args(names), _args(region.stack)),
+            "stk[len(stk) - {}:] = ({})".format(
+                region.taken, _args(names[:-1])
+            ),
+            "return n",
+        ]
+    )
+
+
+def _body(code, pc):
+    """the instructions in the body of the WHILE at pc, or None if
+    it isn't the head of a ( loop with an end"""
+    opcode, (exit, _) = code[pc]
+    if isnone(exit) or code[exit - 1] != (JUMP, pc):
+        return None
+    return code[pc + 1:exit - 1]
+
+
+def compile_loop(mouse, prog, pc):
+    """compile the loop headed by the WHILE at pc in prog, or failing
+    that, the BLOCKs in its body, swapping JIT instructions in for them.
+    what prog held before is kept as prog.plain to fall back on"""
+    stack   = mouse._stack
+    version = mouse.funcdict.version
+    code    = list(prog.code)
+    body    = _body(code, pc)
+    if isnone(body):
+        return
+
+    try:
+        func = _loop(stack, body)
+    except _Untranslatable:
+        pass
+    else:
+        exit, number = code[pc][1]
+        code[pc] = JIT, (version, func, exit, number)
+        return _install(prog, code)
+
+    changed = False
+    for at in range(pc + 1, pc + 1 + len(body)):
+        opcode, arg = code[at]
+        if opcode != BLOCK:
+            continue
+        after = at + 1 + len(arg[1])
+        try:
+            func = _straight(stack, code[at + 1:after])
+        except _Untranslatable:
+            continue
+        code[at] = JIT, (version, func, after, None)
+        changed = True
+    if changed:
+        _install(prog, code)
+
+
+def _install(prog, code):
+    """give prog the instructions code, keeping what it had as prog.plain"""
+    if prog.plain is prog:
+        prog.plain = copy.copy(prog)
+        prog.plain.plain = prog.plain
+    prog.code = tuple(code)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+"""library loading for mouse16: -lFILE, --lib=FILE
+
+a library is run once, in a private interpreter, and what it leaves behind
+(its stack, and the words it defines with :) is cached and shared read-only by every interpreter that loads it.
+the cache is keyed by the library's real path and modification time,
+so editing a library on disk makes the next load pick up the new version,
+and by the options of the interpreter loading it, which the private one
+is made with.
+
+code is cached as its source: each interpreter that loads a library gets
+quotations of its own, compiled for it, so the cache holds on to none of
+them.
+
+the cache is process-wide: workers forked after a library is loaded
+inherit the already-run library instead of running it again."""
+
+import os
+
+import mouseExec
+
+from mouseClutter import *
+
+from mouseCompile import Quotation
+
+
+__all__ = [
+    "Library",
+    "load",
+    "forget",
+]
+
+
+class Library(object):
+
+    def __init__(self, path, mtime, tokens, exports, words = ()):
+        """an immutable, already-run mouse library. quotations among the
+        exports are kept as their source alone, as words' bodies are"""
+        self.path    = path     # type: str
+        self.mtime   = mtime    # type: int
+        self.tokens  = tokens   # type: Tuple[str, ...]
+        self.exports = tuple(
+            _Source(item.source) if isinstance(item, Quotation) else item
+            for item in exports
+        )  # type: Tuple[Any, ...]
+        self.words   = words    # type: Tuple[Tuple[str, str], ...]
+
+    def install(self, mouse):
+        """give a running interpreter what this library left on its stack,
+        and define the words it defined, compiling their code for it"""
+        for name, source in self.words:
+            mouse.define(name, _quotation(mouse, source))
+        mouse._stack.pushn([
+            _quotation(mouse, item) if isinstance(item, _Source) else item
+            for item in self.exports
+        ])
+
+    def __repr__(self):
+        return "<Library {} ({} exports)>".format(
+            self.path, len(self.exports)
+        )
+
+
+class _Source(str):
+    """the source of a quotation a library left on its stack"""
+
+
+def _quotation(mouse, source):
+    """a new Quotation of source, compiled for the interpreter mouse"""
+    return Quotation(mouse.compile(source), mouse)
+
+
+# (realpath, options) -> Library
+_CACHE = {}  # type: Dict[Tuple[str, Tuple[Any, ...]], Library]
+
+
+def _key(path):
+    """the real path and freshness stamp of a library file"""
+    path = os.path.realpath(path)
+    return path, os.stat(path).st_mtime_ns
+
+
+def _options(mouse):
+    """the Mouse() keyword arguments that can change what a library leaves,
+    from the interpreter mouse (the defaults if it's None)"""
+    if isnone(mouse):
+        return {}
+    return dict(
+        optimize=mouse.optimize, depth=mouse.depth, ropes=mouse._stack.ropes,
+        jit=mouse.jit, jithot=mouse.jithot, ropemin=mouse._stack.ropemin,
+    )
+
+
+def load(path, mouse = None):
+    """return the Library for path, running it only if it's new or has
+    changed, in an interpreter with the options of mouse"""
+    path, mtime = _key(path)
+    options = _options(mouse)
+    key = path, tuple(sorted(options.items()))
+
+    lib = _CACHE.get(key)
+    if not isnone(lib) and lib.mtime == mtime:
+        return lib
+
+    with open(path, "r") as filio:
+        tokens = tuple(filio.read())
+
+    runner = mouseExec.Mouse(**options)
+    runner.execute(tokens)
+
+    words = tuple(
+        (name, word.body.source) for name, word in runner.words.items()
+        if runner.funcdict.get(name, (None,))[0] is word
+    )
+    lib = Library(path, mtime, tokens, tuple(runner._stack.inspect()), words)
+    _CACHE[key] = lib
+    return lib
+
+
+def forget(path = None):
+    """drop one library, or every library, from the cache"""
+    if isnone(path):
+        _CACHE.clear()
+        return
+    path = os.path.realpath(path)
+    for key in [key for key in _CACHE if key[0] == path]:
+        del _CACHE[key]
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+"""allocation profiling for mouse16: --memprofile
+
+with a Profile on an interpreter, every Program it compiles is rewritten
+so that each instruction measures, with tracemalloc, how much memory it
+allocates and how much of that it leaves allocated. the measurements
+are attributed to the instruction's token (an operator's glyph, a word,
+a literal) and to where it is in the source, so report() can say that
+the + at line 3 char 9 is what keeps growing.
+
+    peak  the most memory each run of it had allocated at once, summed:
+          what it churned through, even if it gave it all back
+    net   how much more was allocated after it ran than before, summed:
+          what it kept, such as a string it built and left on the stack
+
+the rewritten programs run each builtin through its checked method, and
+call a closure for every instruction, so they're much slower; nothing
+that's compiled before the Profile starts is measured. when an interpreter
+has no Profile, nothing is rewritten and nothing is measured, so it costs
+nothing at all.
+
+code in a string run with ` is placed by its line and char in the string,
+shown with the start of it; code in a { } quotation, in the source around it."""
+
+import sys
+import tracemalloc
+import weakref
+
+from mouseClutter import *
+
+from mouseCompile import LIT, OP, CALL, NOP, ENTER, BLOCK, Quotation
+
+
+__all__ = [
+    "TOP",
+    "Profile",
+]
+
+
+# how many lines of each table report() prints, by default
+TOP = 10
+
+# how many frames tracemalloc keeps per allocation: only the total matters
+FRAMES = 1
+
+
+class Profile(object):
+
+    def __init__(self, mouse):
+        """measure what the interpreter mouse allocates from now on"""
+        self.mouse = mouse
+        # (source, offset, token) -> [runs, peak bytes, net bytes]
+        self.sites = {}  # type: Dict[Tuple[str, int, str], List[int]]
+        # what's been rewritten, so nothing's measured twice
+        self.done  = weakref.WeakSet()  # type: WeakSet[Program]
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(FRAMES)
+        # (peak, net) bytes measuring nothing at all takes, taken off
+        # every measurement
+        self.overhead = 0, 0  # type: Tuple[int, int]
+        self.overhead = self._calibrate()
+
+    def stop(self):
+        """stop tracing allocations; what's been measured is kept"""
+        tracemalloc.stop()
+
+    def _calibrate(self, runs = 16):
+        """the least (peak, net) bytes a measured call to nothing takes"""
+        site = "", 0, ""
+        nothing = self._measure(nop, site)
+        least = None
+        for _ in range(runs):
+            del self.sites[site][:]
+            self.sites[site] += [0, 0, 0]
+            nothing()
+            counts = tuple(self.sites[site][1:])
+            least = counts if isnone(least) else min(least, counts)
+        del self.sites[site]
+        return least
+
+    def _measure(self, func, site):
+        """func, measured and attributed to site each time it's called"""
+        counts = self.sites.setdefault(site, [0, 0, 0])
+        traced = tracemalloc.get_traced_memory
+        reset  = tracemalloc.reset_peak
+        extra, kept = self.overhead
+
+        def measured(*args):
+            before = traced()[0]
+            reset()
+            try:
+                return func(*args)
+            finally:
+                current, peak = traced()
+                counts[0] += 1
+                counts[1] += peak - before - extra
+                counts[2] += current - before - kept
+
+        measured.__name__ = getattr(func, "__name__", "measured")
+        measured.__doc__  = getattr(func, "__doc__", None)
+        return measured
+
+    def instrument(self, prog, source = None, base = 0):
+        """rewrite prog, its unoptimized base and the quotations compiled
+        into it to measure each instruction. source and base are where it
+        came from: the source it's part of, and the offset it starts at"""
+        if prog in self.done:
+            return
+        self.done.add(prog)
+        source = prog.source if isnone(source) else source
+        push   = self.mouse._stack.push
+        code   = list(prog.code)
+
+        for pc, (opcode, arg) in enumerate(code):
+            start, end = prog.spans[pc]
+            site = source, base + start, prog.source[start:end].strip()
+
+            if opcode == LIT:
+                if isinstance(arg, Quotation):
+                    body = arg.programs.get(self.mouse)
+                    if not isnone(body):
+                        at = prog.source.find(body.source, start)
+                        self.instrument(body, source, base + max(at, start))
+                code[pc] = OP, self._measure(
+                    lambda item=arg: push(item), site
+                )
+            elif opcode in (OP, CALL, ENTER):
+                code[pc] = opcode, self._measure(arg, site)
+            elif opcode == BLOCK:
+                # its unchecked twins would go round the measured operators
+                code[pc] = NOP, None
+
+        prog.code = tuple(code)
+        if prog.base is not prog:
+            self.instrument(prog.base, source, base)
+
+    def table(self, by, top = TOP):
+        """the top [(key, runs, peak bytes, net bytes)] by net bytes, where
+        key is the token if by is "token", or else (source, offset, token)"""
+        totals = {}  # type: Dict[Any, List[int]]
+        for site, counts in self.sites.items():
+            key = site[2] if by == "token" else site
+            total = totals.setdefault(key, [0, 0, 0])
+            for n, count in enumerate(counts):
+                total[n] += count
+        return sorted(
+            ((key,) + tuple(total) for key, total in totals.items() if total[0]),
+            key=lambda row: (row[3], row[2]), reverse=True,
+        )[:top]
+
+    def report(self, top = TOP, textfile = None):
+        """write the top sites by operator, and by source position, to
+        textfile (sys.stderr by default)"""
+        textfile = sys.stderr if isnone(textfile) else textfile
+        row = "{:>10} {:>12} {:>12}  {}\n"
+        textfile.write("\nallocations by operator:\n")
+        textfile.write(row.format("runs", "peak bytes", "net bytes", "token"))
+        for token, runs, peak, net in self.table("token", top):
+            textfile.write(row.format(runs, peak, net, token))
+
+        textfile.write("\nallocations by source position:\n")
+        textfile.write(row.format("runs", "peak bytes", "net bytes", "where"))
+        for (source, offset, token), runs, peak, net in self.table("site", top):
+            line = source.count("\n", 0, offset) + 1
+            char = offset - source.rfind("\n", 0, offset)
+            textfile.write(row.format(
+                runs, peak, net, "{} at line {} char {} of {!r}".format(
+                    token, line, char, _snippet(source)
+                ),
+            ))
+        textfile.flush()
+
+
+def _snippet(source, width = 24):
+    """the start of source, to say which source a position is in"""
+    if len(source) <= width and "\n" not in source:
+        return source
+    return source.split("\n", 1)[0][:width] + "..."
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+
+"""counters for a mouse16 interpreter: --metrics=FILE
+
+every Mouse keeps a Metrics as mouse.metrics, counting as it runs:
+
+    blocked       how many operators ran inside BLOCKs, without a dispatch
+                  of their own, and how many times round the JIT went
+    jumps         \\ gotos, [ branches past their ], ) jumps back to their (,
+                  and ( loops that ended
+    caches        hits and misses of the strings run with `, the !!PY!!
+                  strings, the checked \\ targets, and the string literals
+                  the compiler interns (a hit is one sharing an earlier str)
+    depth         the deepest each stack got, sampled at every call and
+                  return, every ~, and the end of every run; a BLOCK knows
+                  how deep it gets before it starts. a loop the JIT runs is
+                  only seen when it ends
+    time          seconds spent running, and how much of that was in the
+                  i/o operators (see mouseStack.Stack.iotime)
+
+all of that is counted where the runner already branches, calls or
+checks, so it's cheap enough to leave on. counting=True (--metrics turns
+it on) counts each instruction too, at the price of a call apiece:
+
+    instructions  how many the runner dispatched, by opcode, plus the
+                  operators run inside BLOCKs without a dispatch of their own
+    operators     how many times each operator and word was called, by the
+                  glyph it's bound to (or its name, if it's been rebound),
+                  whether it was dispatched or run inside a BLOCK
+
+and the stack is checked before each instruction, so its depth is exact.
+as_dict() is the lot, and to_json() and dump_file() are what --metrics
+writes when mouse16.py exits."""
+
+import collections
+import json
+import sys
+
+from mouseCompile import OPNAMES, OP, CALL, ENTER
+
+
+__all__ = [
+    "Metrics",
+]
+
+
+class Metrics(object):
+
+    def __init__(self, mouse, counting = False):
+        """the counters for the interpreter mouse, all zero;
+        counting is whether to count each instruction as well"""
+        self.mouse    = mouse
+        self.counting = counting  # type: bool
+        self.reset()
+
+    def reset(self):
+        """start counting again from zero"""
+        # dispatches of each opcode, indexed by it, if counting
+        self.opcodes   = [0] * len(OPNAMES)  # type: List[int]
+        # calls of each operator or word, by it, if counting
+        self.operators = collections.defaultdict(int)  # type: Dict[Callable, int]
+        # operators a BLOCK ran without dispatching them
+        self.blocked   = 0    # type: int
+        # times round loops the JIT ran instead of the runner
+        self.jitted    = 0    # type: int
+        # [ that jumped past their ], ) that jumped back to their (,
+        # and ( loops that ended
+        self.branches  = 0    # type: int
+        self.loops     = 0    # type: int
+        self.exits     = 0    # type: int
+        self.strhits   = 0    # type: int
+        self.strmisses = 0    # type: int
+        self.pyhits    = 0    # type: int
+        self.pymisses  = 0    # type: int
+        self.gotohits  = 0    # type: int
+        self.gotomisses = 0   # type: int
+        # string literals that did and didn't share an earlier one's str
+        self.literalhits   = 0  # type: int
+        self.literalmisses = 0  # type: int
+        self.maxstack  = 0    # type: int
+        self.maxretstk = 0    # type: int
+        # seconds in Mouse.run
+        self.runtime   = 0.0  # type: float
+        for stk in (self.mouse._stack, self.mouse._retstk):
+            stk.iotime = 0.0
+
+    def sample(self):
+        """note how deep the stacks are now"""
+        depth = len(self.mouse._stack.__stack__)
+        if depth > self.maxstack:
+            self.maxstack = depth
+        depth = len(self.mouse._retstk.__stack__)
+        if depth > self.maxretstk:
+            self.maxretstk = depth
+
+    def count(self, opcode, arg):
+        """note that the runner's about to run the instruction (opcode, arg),
+        and how deep the stack is before it does"""
+        self.opcodes[opcode] += 1
+        if opcode == OP or opcode == CALL or opcode == ENTER:
+            self.operators[arg] += 1
+        depth = len(self.mouse._stack.__stack__)
+        if depth > self.maxstack:
+            self.maxstack = depth
+
+    def block(self, block, count):
+        """note that the BLOCK argument block ran its first count
+        instructions (all of them, unless it fell back on the checked ones)"""
+        for op in block[3][:count]:
+            if op is not None:
+                self.operators[op] += 1
+
+    def by_name(self):
+        """{glyph or name: calls} for every operator and word called"""
+        table = self.mouse.funcdict
+        names = {}  # type: Dict[Callable, str]
+        for name in table:
+            try:
+                names.setdefault(table[name][0], name)
+            except TypeError:  # unhashable, so never counted either
+                pass
+        counts = collections.defaultdict(int)  # type: Dict[str, int]
+        for op, count in self.operators.items():
+            counts[names.get(op) or getattr(op, "__name__", repr(op))] += count
+        return dict(counts)
+
+    def as_dict(self):
+        """every counter, in a dict of plain values; the instructions and
+        operators only if counting"""
+        iotime = self.mouse._stack.iotime + self.mouse._retstk.iotime
+        counts = {
+            "blocked":      self.blocked,
+            "jitted":       self.jitted,
+            "jumps": {
+                "goto":   self.gotohits + self.gotomisses,
+                "if":     self.branches,
+                "loop":   self.loops,
+                "exit":   self.exits,
+            },
+            "caches": {
+                "strings": {"hits": self.strhits, "misses": self.strmisses},
+                "python":  {"hits": self.pyhits, "misses": self.pymisses},
+                "goto":    {"hits": self.gotohits, "misses": self.gotomisses},
+                "literals": {
+                    "hits": self.literalhits, "misses": self.literalmisses,
+                },
+            },
+            "depth": {
+                "stack":  self.maxstack,
+                "retstk": self.maxretstk,
+            },
+            "time": {
+                "run":     self.runtime,
+                "io":      iotime,
+                "compute": max(0.0, self.runtime - iotime),
+            },
+        }
+        if self.counting:
+            counts.update({
+                "instructions": sum(self.opcodes) + self.blocked,
+                "dispatched":   sum(self.opcodes),
+                "opcodes": {
+                    name: count for name, count in zip(OPNAMES, self.opcodes)
+                },
+                "operators": self.by_name(),
+            })
+        return counts
+
+    def to_json(self, **kwds):
+        """as_dict() as JSON; kwds go to json.dumps"""
+        return json.dumps(self.as_dict(), **kwds)
+
+    def dump_file(self, path):
+        """write the counters as JSON to the file at path, or stderr if it's -"""
+        text = self.to_json(indent=2, sort_keys=True) + "\n"
+        if path == "-":
+            sys.stderr.write(text)
+            sys.stderr.flush()
+            return
+        with open(path, "w") as filio:
+            filio.write(text)
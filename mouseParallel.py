@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+"""parallel map for mouse16: ¨
+
+¨ runs a quotation (or a string of code) once for each element of an array,
+the element alone on an empty stack, and packs the number each run leaves on
+top into a new array, in order. the array is cut into chunks which are handed
+to a pool of worker processes, each with an interpreter of its own: a worker
+compiles the code (and the words it might call) the first time it sees it,
+and runs every element it's given after that against the same Program.
+
+code is sent to the workers as source, never as a compiled Program, so what
+it means there is only what it means here if the words it calls are the same:
+the words defined with : are sent along with it.
+
+the pool is process-wide, started the first time it's needed, and kept until
+exit. with one worker, or an array no longer than a chunk, the map runs in
+this process instead, still on a stack of its own."""
+
+import atexit
+import multiprocessing
+import os
+
+import mouseExec
+
+from mouseClutter import *
+
+
+__all__ = [
+    "WORKERS",
+    "pmap",
+    "shutdown",
+]
+
+
+# how many worker processes to map with, by default
+WORKERS = os.cpu_count() or 1
+
+# how many chunks to cut an array into for each worker, with no chunksize
+CHUNKS = 4
+
+# (source, words, optimize, depth, ropes, jit, jithot, ropemin)
+#   -> (runner, quotation), per process
+_RUNNERS = {}  # type: Dict[Tuple[Any, ...], Tuple[mouseExec.Mouse, Any]]
+
+# how many distinct pieces of code each process keeps compiled
+RUNNERCACHE = 64
+
+# worker count -> the pool of that many processes
+_POOLS = {}  # type: Dict[int, multiprocessing.pool.Pool]
+
+
+def _runner(key):
+    """the interpreter and compiled Program for a task's code, made once"""
+    runner = _RUNNERS.get(key)
+    if isnone(runner):
+        source, words, optimize, depth, ropes, jit, jithot, ropemin = key
+        mouse = mouseExec.Mouse(
+            optimize=optimize, depth=depth, ropes=ropes, jit=jit,
+            jithot=jithot, ropemin=ropemin,
+        )
+        for name, body in words:
+            mouse.define(name, mouse._quote(body))
+        if len(_RUNNERS) >= RUNNERCACHE:
+            _RUNNERS.clear()
+        runner = _RUNNERS[key] = mouse, mouse._quote(source)
+    mouse, quot = runner
+    return mouse, quot.program(mouse)
+
+
+def _work(task):
+    """run a task's code on each of its values; the list of what each
+    run left on top of the stack (None if it left nothing)"""
+    key, values = task
+    mouse, prog = _runner(key)
+    out = []  # type: List[Any]
+    for value in values:
+        # looked up each time round: ~ trades the two stacks' lists
+        del mouse._retstk.__stack__[:]
+        mouse._stack.__stack__[:] = [value]
+        mouse.run(prog)
+        stk = mouse._stack.__stack__
+        out.append(stk[-1] if len(stk) else None)
+    del mouse._stack.__stack__[:], mouse._retstk.__stack__[:]
+    return out
+
+
+def _pool(workers):
+    """the pool of workers processes, started if it isn't yet"""
+    pool = _POOLS.get(workers)
+    if isnone(pool):
+        pool = _POOLS[workers] = multiprocessing.Pool(workers)
+    return pool
+
+
+def shutdown():
+    """stop every worker process; the next map starts them again"""
+    for pool in _POOLS.values():
+        pool.terminate()
+        pool.join()
+    _POOLS.clear()
+
+atexit.register(shutdown)
+
+
+def pmap(mouse, source, arr, workers = None, chunksize = None):
+    """the values left by running source on each element of arr, in order,
+    in interpreters like mouse (same words, same options)
+
+    workers is how many processes to spread the chunks over (WORKERS if
+    None), and chunksize how many elements go in each (enough for CHUNKS
+    chunks per worker if None). an exception from a worker is raised here"""
+    workers = WORKERS if isnone(workers) else max(1, int(workers))
+    if isnone(chunksize):
+        chunksize = -(-len(arr) // (workers * CHUNKS))
+    chunksize = max(1, int(chunksize))
+
+    words = tuple(
+        (name, word.body.source) for name, word in mouse.words.items()
+        if mouse.funcdict.get(name, (None,))[0] is word
+    )
+    key = (
+        source, words, mouse.optimize, mouse.depth, mouse._stack.ropes,
+        mouse.jit, mouse.jithot, mouse._stack.ropemin,
+    )
+    # slices of an array.array are arrays: they pickle as packed doubles
+    tasks = [
+        (key, arr[start:start + chunksize])
+        for start in range(0, len(arr), chunksize)
+    ]
+
+    if workers == 1 or len(tasks) <= 1:
+        chunks = map(_work, tasks)
+    else:
+        chunks = _pool(workers).map(_work, tasks, 1)
+    return [value for chunk in chunks for value in chunk]
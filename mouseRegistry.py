@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+"""the operator registry: what each glyph (or word name) is bound to
+
+a Registry maps names to (function, arguments) pairs like the dict it
+replaces, and also keeps the reverse mapping, from each function to the
+names bound to it, up to date as bindings change. every change bumps its
+version, which is how compiled programs, and the caches kept with cache(),
+tell that a binding they were built from has changed."""
+
+import collections.abc
+
+from mouseClutter import *
+
+from mouseCompile import effect
+
+
+__all__ = [
+    "Registry",
+]
+
+
+class Registry(collections.abc.MutableMapping):
+
+    def __init__(self, bindings = ()):
+        """a registry holding bindings, a mapping or (name, entry) pairs,
+        where each entry is (function, arguments)"""
+        self._ops    = {}  # type: Dict[str, Tuple[Callable, Tuple[Any, ...]]]
+        self._names  = {}  # type: Dict[Callable, List[str]]
+        self._caches = {}  # type: Dict[Any, Tuple[int, Any]]
+        self.version = 0   # type: int
+        self.update(bindings)
+        self.version = 0
+
+    # the mapping interface: lookups go straight to the forward index
+
+    def __getitem__(self, name):
+        return self._ops[name]
+
+    def get(self, name, default = None):
+        return self._ops.get(name, default)
+
+    def __contains__(self, name):
+        return name in self._ops
+
+    def __iter__(self):
+        return iter(self._ops)
+
+    def __len__(self):
+        return len(self._ops)
+
+    def __setitem__(self, name, entry):
+        if name in self._ops:
+            self._unindex(name)
+        self._ops[name] = entry
+        self._names.setdefault(entry[0], []).append(name)
+        self.version += 1
+
+    def __delitem__(self, name):
+        self._unindex(name)
+        del self._ops[name]
+        self.version += 1
+
+    def _unindex(self, name):
+        func  = self._ops[name][0]
+        names = self._names[func]
+        names.remove(name)
+        if not len(names):
+            del self._names[func]
+
+    def __repr__(self):
+        return "<Registry of {} bindings, version {}>".format(
+            len(self._ops), self.version
+        )
+
+    # the reverse index and metadata
+
+    def names(self, func):
+        """every name bound to func, in the order they were bound"""
+        return tuple(self._names.get(func, ()))
+
+    def name(self, func):
+        """the first name bound to func, or None"""
+        names = self._names.get(func)
+        return names[0] if names else None
+
+    def effect(self, name):
+        """(depth needed, change in depth) of the function bound to name,
+        from its docstring (see mouseCompile.effect), or None"""
+        return effect(self._ops[name][0])
+
+    def doc(self, name):
+        """the docstring of the function bound to name, or None"""
+        doc = getattr(self._ops[name][0], "__doc__", None)
+        return doc if isstr(doc) else None
+
+    def listing(self):
+        """[(name, function name, docstring)] for every documented binding"""
+        return [
+            (name, getattr(func, "__name__", repr(func)), self.doc(name))
+            for name, (func, _) in self._ops.items()
+            if not isnone(self.doc(name))
+        ]
+
+    def cache(self, key, build):
+        """build(), computed again only once the registry has changed"""
+        version, value = self._caches.get(key, (None, None))
+        if version != self.version:
+            value = build()
+            self._caches[key] = self.version, value
+        return value
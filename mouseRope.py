@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+
+"""ropes: strings that are joined, cut and reversed without copying them
+
+with its ropes flag set, a Stack makes a Rope instead of a new str when
++ joins, or _ reverses, strings of at least its ropemin (ROPEMIN, unless
+it's given another) chars between them, so building a big string piece
+by piece stops copying all of it each time.
+a Rope is immutable and stands for the string str() gives back, which is
+worked out only when something needs the characters, and then kept.
+
+operators without a handler for ropes (see mouseStack.BINOPS) get the
+strings they stand for instead, so a Rope behaves just like a str."""
+
+from mouseClutter import *
+
+
+__all__ = [
+    "ROPEMIN",
+    "Rope",
+    "unrope",
+]
+
+
+# how long a string has to get before + and _ make ropes of it
+ROPEMIN = 4096
+
+
+class Rope(object):
+
+    __slots__ = ("left", "right", "flipped", "length", "_flat")
+
+    def __init__(self, left, right = "", flipped = False):
+        """left joined to right (each a str or a Rope),
+        reversed if flipped"""
+        self.left    = left     # type: Union[str, Rope]
+        self.right   = right    # type: Union[str, Rope]
+        self.flipped = flipped  # type: bool
+        self.length  = len(left) + len(right)  # type: int
+        # the string this stands for, once something's needed it
+        self._flat   = None     # type: Optional[str]
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        if isnone(self._flat):
+            self._flat = _flatten(self)
+        return self._flat
+
+    def __repr__(self):
+        return repr(str(self))
+
+    def __eq__(self, other):
+        if isstr(other) or isinstance(other, Rope):
+            return len(self) == len(other) and str(self) == str(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(str(self))
+
+    # immutable, so copies can be the rope itself
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def reverse(self):
+        """this rope backwards, sharing all of its pieces"""
+        return Rope(self.left, self.right, not self.flipped)
+
+    def first(self):
+        """the first char, or "" if it's empty, without flattening"""
+        return _edge(self, False)
+
+    def cut(self, stop):
+        """the same as str(self)[:stop] for an int stop, sharing every
+        piece but the one the cut falls in"""
+        stop = slice(None, stop).indices(self.length)[1]
+        kept = []  # type: List[Union[str, Rope]]
+        node = self
+        while (
+            isinstance(node, Rope) and isnone(node._flat)
+            and not node.flipped and stop < node.length
+        ):
+            if stop <= len(node.left):
+                node = node.left
+            else:
+                kept.append(node.left)
+                stop -= len(node.left)
+                node = node.right
+        if stop < len(node):
+            node = str(node)[:stop]
+        for left in reversed(kept):
+            node = Rope(left, node)
+        return node
+
+
+def _flatten(rope):
+    """the string a Rope stands for, without recursing"""
+    parts = []  # type: List[str]
+    todo  = [(rope, False)]
+    while len(todo):
+        node, flip = todo.pop()
+        if isinstance(node, Rope):
+            if isnone(node._flat):
+                flip ^= node.flipped
+                # the piece to come out first goes on last
+                if flip:
+                    todo.append((node.left, flip))
+                    todo.append((node.right, flip))
+                else:
+                    todo.append((node.right, flip))
+                    todo.append((node.left, flip))
+                continue
+            node = node._flat
+        parts.append(node[::-1] if flip else node)
+    return "".join(parts)
+
+
+def _edge(node, last):
+    """the first (or last) char of what node stands for, or "" """
+    while isinstance(node, Rope):
+        if not isnone(node._flat):
+            node = node._flat
+            break
+        if node.flipped:
+            last = not last
+        if last:
+            node = node.right if len(node.right) else node.left
+        else:
+            node = node.left if len(node.left) else node.right
+    if not len(node):
+        return ""
+    return node[-1] if last else node[0]
+
+
+def unrope(obj):
+    """obj, or the string it stands for if it's a Rope"""
+    return str(obj) if isinstance(obj, Rope) else obj
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+
+"""daemon mode for mouse16: --serve
+
+a daemon listens on a Unix socket that only its user can connect to, and
+forks a pool of worker processes which each hold a Mouse that's already
+built (and has loaded --lib, if there is one), waiting for a script. a
+worker takes a connection and forks a child of its own for it, which reads
+the request, runs it on the interpreter with stdin, stdout and stderr
+pointed at the connection, sends back the exit status and exits. the worker
+waits for it, then takes the next connection with its interpreter just as
+it was, so nothing one script does is seen by another: not its stacks,
+words or funcdict, nor what it changes at module level (rebound operators,
+mouseLib's caches, mouseClutter's). a worker that dies is replaced.
+
+requests and responses are framed as mouseClient describes, and
+mouseClient is the client to send them with."""
+
+import io
+import os
+import signal
+import socket
+import struct
+import sys
+import traceback
+
+import mouseExec
+
+from mouseClutter import *
+
+from mouseClient import SOCKET, SCRIPT, PATH, STDIN, END, STDOUT, STDERR, EXIT, send, recv
+
+
+__all__ = [
+    "POOL",
+    "serve",
+]
+
+
+# how many workers wait for requests, by default
+POOL = 4
+
+# how many connections can wait for a worker before more are refused
+BACKLOG = 64
+
+# how much output a worker buffers before it sends a frame of it
+CHUNK = 8192
+
+
+class _Frames(io.RawIOBase):
+
+    def __init__(self, sock, kind):
+        """a binary file whose writes go to sock as frames of kind"""
+        self.sock = sock  # type: socket.socket
+        self.kind = kind  # type: bytes
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if len(data):
+            send(self.sock, self.kind, bytes(data))
+        return len(data)
+
+
+def _stream(sock, kind):
+    """a text file sending what's written to it in frames of kind"""
+    return io.TextIOWrapper(
+        io.BufferedWriter(_Frames(sock, kind), CHUNK), encoding="utf-8",
+        errors="replace",
+    )
+
+
+def _request(conn):
+    """(source or None, stdin bytes, error or None) read from conn.
+    the whole request is read even once there's an error, so the client
+    isn't cut off while it's still sending"""
+    source, stdin, error = None, b"", None
+    while True:
+        kind, payload = recv(conn)
+        if kind == SCRIPT:
+            source = payload.decode("utf-8", "replace")
+        elif kind == PATH:
+            path = payload.decode("utf-8", "replace")
+            try:
+                with open(path, "r") as filio:
+                    source = filio.read()
+            except (IOError, OSError) as err:
+                error = "can't read " + repr(path) + ": " + str(err)
+        elif kind == STDIN:
+            stdin += payload
+        elif kind == END:
+            if isnone(error) and isnone(source):
+                error = "no script"
+            return (source if isnone(error) else None), stdin, error
+        else:
+            return None, stdin, "the request ended early"
+
+
+def _run(mouse, source, stdin, conn):
+    """run source on mouse with the standard streams on conn; the status"""
+    out, err = _stream(conn, STDOUT), _stream(conn, STDERR)
+    saved = sys.stdin, sys.stdout, sys.stderr
+    sys.stdin  = io.StringIO(stdin.decode("utf-8", "replace"))
+    sys.stdout, sys.stderr = out, err
+    status = 0
+    try:
+        # warnings are filtered as mouseStack set them up: "always", as on the CLI
+        mouse.execute(list(source))
+    except SystemExit as error:
+        status = error.code if isinstance(error.code, int) else 1
+    except Exception:
+        traceback.print_exc()
+        status = 1
+    finally:
+        sys.stdin, sys.stdout, sys.stderr = saved
+        for stream in (out, err):
+            try:
+                stream.flush()
+            except OSError:
+                pass
+    return status
+
+
+def _handle(conn, mouse):
+    """serve one connection with mouse"""
+    source, stdin, error = _request(conn)
+    if not isnone(error):
+        send(conn, STDERR, ("mouse16: " + error + "\n").encode("utf-8"))
+        status = 2
+    else:
+        status = _run(mouse, source, stdin, conn)
+    send(conn, EXIT, struct.pack(">i", status))
+
+
+def _child(listener, conn, mouse):
+    """serve conn with mouse, in a process of its own; never returns"""
+    status = 0
+    try:
+        listener.close()
+        with conn:
+            try:
+                _handle(conn, mouse)
+            except OSError:
+                pass  # the client went away
+    except BaseException:
+        traceback.print_exc()
+        status = 1
+    finally:
+        os._exit(status)
+
+
+def _worker(listener, lib, options):
+    """take connections until killed, serving each in a child forked
+    from one interpreter that's never run anything; never returns"""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    status = 0
+    try:
+        mouse = mouseExec.Mouse(**options)
+        if lib:
+            mouse.load_library(lib)
+        while True:
+            conn, _ = listener.accept()
+            with conn:
+                pid = os.fork()
+                if not pid:
+                    _child(listener, conn, mouse)
+            os.waitpid(pid, 0)
+    except BaseException:
+        traceback.print_exc()
+        status = 1
+    finally:
+        os._exit(status)
+
+
+def _spawn(listener, lib, options):
+    """fork a worker; its pid"""
+    pid = os.fork()
+    if not pid:
+        _worker(listener, lib, options)
+    return pid
+
+
+def _listen(path):
+    """a socket listening at path, which mustn't have a daemon on it"""
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            os.unlink(path)  # left behind by a daemon that's gone
+        else:
+            raise OSError("a daemon is already listening at " + path)
+        finally:
+            probe.close()
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # whoever can connect can run code as us: nobody else may
+    umask = os.umask(0o177)
+    try:
+        listener.bind(path)
+    finally:
+        os.umask(umask)
+    os.chmod(path, 0o600)
+    listener.listen(BACKLOG)
+    return listener
+
+
+def _stop(signum, frame):
+    raise SystemExit(0)
+
+
+def serve(path = None, pool = POOL, lib = None, **options):
+    """serve requests on the Unix socket path (mouseClient.SOCKET if None)
+    with pool workers, each running scripts on a Mouse(**options) that's
+    loaded lib first, until interrupted or terminated"""
+    path = SOCKET if isnone(path) else path
+    listener = _listen(path)
+    signal.signal(signal.SIGTERM, _stop)
+    workers = set()  # type: Set[int]
+    try:
+        for _ in range(max(1, pool)):
+            workers.add(_spawn(listener, lib, options))
+        print("mouse16: serving on " + path + " with " + str(len(workers)) + " workers", file=sys.stderr)
+        while True:
+            pid, _ = os.wait()
+            if pid in workers:
+                workers.discard(pid)
+                workers.add(_spawn(listener, lib, options))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+        for pid in workers:
+            try:
+                os.waitpid(pid, 0)
+            except OSError:
+                pass
+        listener.close()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
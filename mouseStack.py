@@ -2,11 +2,17 @@
 
 from mouseClutter import *
 
-import warnings
-import sys
+from mouseRope import ROPEMIN, Rope, unrope
+
+import mouseArray
 
+from mouseArray import ARRAY
 
-from mouse16 import _FROMFILE
+import functools
+import math
+import time
+import warnings
+import sys
 
 
 # allows warnings that occur multiple times in a session to be visible
@@ -48,17 +54,28 @@ class FatalException(Warning):
     pass
 
 
-class BadInternalCallException(Exception):
-    """
-    actually-fatal exceptions about probable bugs in Mouse/this program
-    """
-    pass
+def _io(method):
+    """an i/o operator which adds the time it takes to its stack's iotime"""
+    @functools.wraps(method)
+    def timed(self, *args, **kwds):
+        started = time.perf_counter()
+        try:
+            return method(self, *args, **kwds)
+        finally:
+            self.iotime += time.perf_counter() - started
+    return timed
 
 
 class Stack(object):
 
     def __init__(self: object):
         self.__stack__ = []
+        # whether + and _ make Ropes of big strings (see mouseRope)
+        self.ropes = False  # type: bool
+        # how long a string + or _ makes into a Rope has to be
+        self.ropemin = ROPEMIN  # type: int
+        # seconds spent in the i/o operators (see mouseMetrics)
+        self.iotime = 0.0  # type: float
 
     def log(self, logstring, errno, stklvl = 3):
         """logging interface for runtime warnings and exceptions"""
@@ -70,8 +87,11 @@ class Stack(object):
             4: FatalException
         }
         warnings.warn(logstring, logsdict[errno], stacklevel=stklvl)
-        if errno == 4 and _FROMFILE:
-            raise SystemExit(4)
+        if errno == 4:
+            # imported late: mouse16 imports everything else
+            import mouse16
+            if mouse16._FROMFILE:
+                raise SystemExit(4)
 
     def error(self, errkey):
         """interface for throwing fatal errors"""
@@ -191,72 +211,52 @@ class Stack(object):
 
     # begin math operators
 
+    def dispatch(self, name):
+        """( y x -- ? )
+        pop two operands and run the handler registered in BINOPS
+        for the operator name and the operands' types"""
+        stk = self.__stack__
+        if len(stk) > 1:
+            y = stk.pop()
+            if y is None:
+                return
+            x = stk.pop()
+            if x is None:
+                return
+        else:
+            # let popn report the underflow
+            y, x = self.popn()
+            if anyof(isnone(x), isnone(y)):
+                return
+
+        op = BINOPS.get((name, type(x), type(y)))
+        if op is None:
+            self._nohandler(name, x, y)
+        else:
+            op(self, x, y)
+
+    def _nohandler(self, name, x, y):
+        """there's no handler for these operand types: try again with
+        ropes as the strings they stand for, or else it's undefined"""
+        if isinstance(x, Rope) or isinstance(y, Rope):
+            x, y = unrope(x), unrope(y)
+            op = BINOPS.get((name, type(x), type(y)))
+            if not isnone(op):
+                return op(self, x, y)
+        self.nosuchop(name, [x, y])
+
     def add(self):
         """( y x -- x+y )
         performs binary addition
         if x and y are strings, concatenates strings."""
-        y, x = self.popn()
-        if anyof(isnone(x), isnone(y)):
-            return
-
-        if allof(isstr(x), isstr(y)):
-            self.push(x + y)
-
-        elif allof(isstr(x), isnum(y)) or allof(isnum(x), isstr(y)):
-            try:
-                cr_x, cr_y = coer(x, "num"), coer(y, "num")
-            except ValueError:  # one or more of the operands can't be numified
-                self.push(str(x) + str(y))
-            else:
-                self.push(cr_x + cr_y)
-
-        elif allof(isnum(x), isnum(y)):
-            self.push(x + y)
-        else:
-            self.nosuchop("add", [x, y])
+        self.dispatch("add")
 
     def sub(self):
         """( z y x -- z x-y )
         subtract x from y: perform binary negation
         if x and y are strings,
         remove z occurrences of x from y, or all occurrences if ~z"""
-        y, x = self.popn()
-        if anyof(isnone(x), isnone(y)):
-            return
-
-        if allof(isstr(x), isstr(y)):
-            try:
-                z = self.pop()
-            except SystemExit:
-                z = len(x)
-            if isnum(z) and int(z) > 0:
-                x = x.replace(y, "", z)
-            else:
-                x = x.replace(y, "")
-            self.push(x)
-
-        elif allof(isstr(x), isnum(y)):
-            try:
-                cr_x = coer(x, "num")
-            except ValueError:
-                self.push(x[:signflip(y)])
-            else:
-                self.push(cr_x - y)
-
-        elif allof(isnum(x), isstr(y)):
-            try:
-                cr_y = coer(y, "num")
-            except ValueError:
-                self.push(y[:signflip(x)])
-            else:
-                self.push(cr_y - x)
-
-        elif allof(isnum(x), isnum(y)):
-            self.push(x - y)
-
-        else:
-            self.nosuchop("sub", [x, y])
-        return
+        self.dispatch("sub")
 
     def mlt(self):
         """( y x -- x*y )
@@ -264,126 +264,238 @@ class Stack(object):
         if one operand is a string and the other is an integer,
         the string will be copied and catenated onto itself
         if both operands are strings, interleaving will occur"""
-        y, x = self.popn()
-        if anyof(isnone(x), isnone(y)):
-            return
-
-        if allof(isstr(x), isstr(y)):
-            self.push("".join(i for j in zip(x, y) for i in j))
-        elif (
-            allof(isnum(y), isstr(x)) or
-            allof(isnum(x), isstr(y)) or
-            allof(isnum(x), isnum(y))
-        ):
-            self.push(x * y)
-        else:
-            self.nosuchop("mlt", [x, y])
-
+        self.dispatch("mlt")
 
     def dmd(self):
         """( y x --  x/y x%y )
         push x div y, then push x modulo y: perform binary div, then binary mod
         this operator is not yet defined for strings"""
-        y, x = self.popn()
-        if anyof(isnone(x), isnone(y)):
-            return
-
-        if allof(isnum(x), isnum(y)):
-            try:
-                self.pushn([x % y, x / y])
-            except ZeroDivisionError:
-                self.error("zerodiv")
-        else:
-            self.nosuchop("dmd", [x, y])
-
+        self.dispatch("dmd")
 
     def flr(self):
         """( y x -- x//y )
         divide x by y, flooring the result: perform binary floor division
         this operator is not yet defined for strings."""
-        y, x = self.popn()
-        if anyof(isnone(x), isnone(y)):
-            return
-
-        if allof(isnum(x), isnum(y)):
-            try:
-                self.push(x // y)
-            except ZeroDivisionError:
-                self.error("zerodiv")
-        else:
-            self.nosuchop("flr", [x, y])
+        self.dispatch("flr")
 
     def lss(self):
         """( y x -- x<y? )
         push 1 if x is less than y: perform binary ordering"""
-        y, x = self.popn()
-        if anyof(isnone(x), isnone(y)):
-            return
-
-        try:
-            self.push(bool2int(x < y))
-        except TypeError:
-            self.nosuchop("lss", [x, y])
-        return
+        self.dispatch("lss")
 
     def gtr(self):
         """( y x -- x>y? )
         push 1 if x is greater than y: perform binary ordering"""
-        y, x = self.popn()
-        if anyof(isnone(x), isnone(y)):
-            return
-
-        try:
-            self.push(bool2int(x > y))
-        except TypeError:
-            self.nosuchop("gtr", [x, y])
-        return
+        self.dispatch("gtr")
 
     def equ(self):
         """( y x -- x=y? )
         push 1 if x is equal to y: perform equality comparison"""
-        y, x = self.popn()
-        if anyof(isnone(x), isnone(y)):
-            return
+        self.dispatch("equ")
+
+    # superinstructions: common operator pairs, fused by mouseCompile.optimize
+    # each one does exactly what its pair would, in one dispatch
+
+    def dupadd(self):
+        """( x -- x+x )
+        $+ : add x to itself"""
+        self._dupop("add", self.add)
+
+    def dupmlt(self):
+        """( x -- x*x )
+        $* : multiply x by itself"""
+        self._dupop("mlt", self.mlt)
+
+    def swapsub(self):
+        """( y x -- y-x )
+        %- : subtract with the operands swapped"""
+        self._swapop("sub", self.sub)
+
+    def swaplss(self):
+        """( y x -- y<x? )
+        %< : less-than with the operands swapped"""
+        self._swapop("lss", self.lss)
+
+    def swapgtr(self):
+        """( y x -- y>x? )
+        %> : greater-than with the operands swapped"""
+        self._swapop("gtr", self.gtr)
+
+    def _dupop(self, name, then):
+        """dup, then the binary operator name"""
+        stk = self.__stack__
+        if not len(stk) or stk[-1] is None:
+            # the slow way round gets underflow exactly right
+            self.dup()
+            return then()
+        x = stk.pop()
+        op = BINOPS.get((name, type(x), type(x)))
+        if op is None:
+            self._nohandler(name, x, x)
+        else:
+            op(self, x, x)
+
+    def _swapop(self, name, then):
+        """swap, then the binary operator name"""
+        stk = self.__stack__
+        if len(stk) < 2 or stk[-1] is None or stk[-2] is None:
+            self.swap()
+            return then()
+        y = stk.pop()
+        x = stk.pop()
+        op = BINOPS.get((name, type(y), type(x)))
+        if op is None:
+            self._nohandler(name, y, x)
+        else:
+            op(self, y, x)
+
+    # unchecked twins of the commonest operators, for the runner to call
+    # in a BLOCK it's proved the stack is deep enough for. each one fails
+    # with IndexError, before changing anything, if the stack isn't;
+    # the Nones a failed operator leaves behind go the checked way round
+
+    def unchecked(self, name):
+        """the unchecked twin of the operator method name, or None"""
+        if name in UNCHECKED_BINOPS:
+            return functools.partial(self._rawdispatch, name)
+        if name in UNCHECKED_DUPOPS:
+            return functools.partial(self._rawdupop, name)
+        if name in UNCHECKED_SWAPOPS:
+            return functools.partial(self._rawswapop, name)
+        return getattr(self, "_raw" + name, None)
+
+    def _rawdispatch(self, name):
+        stk = self.__stack__
+        x, y = stk[-2], stk[-1]
+        if x is None or y is None:
+            return self.dispatch(name)
+        del stk[-2:]
+        op = BINOPS.get((name, type(x), type(y)))
+        if op is None:
+            self._nohandler(name, x, y)
+        else:
+            op(self, x, y)
+
+    def _rawdupop(self, name):
+        stk = self.__stack__
+        x = stk[-1]
+        if x is None:
+            return getattr(self, name)()
+        del stk[-1]
+        op = BINOPS.get((UNCHECKED_DUPOPS[name], type(x), type(x)))
+        if op is None:
+            self._nohandler(UNCHECKED_DUPOPS[name], x, x)
+        else:
+            op(self, x, x)
+
+    def _rawswapop(self, name):
+        stk = self.__stack__
+        x, y = stk[-2], stk[-1]
+        if x is None or y is None:
+            return getattr(self, name)()
+        del stk[-2:]
+        op = BINOPS.get((UNCHECKED_SWAPOPS[name], type(y), type(x)))
+        if op is None:
+            self._nohandler(UNCHECKED_SWAPOPS[name], y, x)
+        else:
+            op(self, y, x)
 
-        if allof(isnum(x), isnum(y)):
-            self.push(bool2int(x == y))
+    def _rawdup(self):
+        stk = self.__stack__
+        stk.append(stk[-1])
 
-        elif allof(isstr(x), isstr(y)):
-            xsum, ysum = strsum(x), strsum(y)
-            self.push(bool2int(xsum == ysum))
+    def _rawswap(self):
+        stk = self.__stack__
+        x, y = stk[-2], stk[-1]
+        if x is None or y is None:
+            return self.swap()
+        stk[-2], stk[-1] = y, x
 
-        elif allof(isnum(x), isstr(y)):
-            try:
-                coer(y, "num")
-            except ValueError:
-                self.push(bool2int(str(x) == str(y)))
-            else:
-                self.push(bool2int(float(x) == float(y)))
-
-        elif allof(isstr(x), isnum(y)):
-            try:
-                coer(x, "num")
-            except ValueError:
-                sum_x = strsum(x)
-                self.push(bool2int(sum_x == y))
-            else:
-                self.push(bool2int(float(x) == float(y)))
-        else:
-            self.nosuchop("equ", [x, y])
+    def _rawover(self):
+        stk = self.__stack__
+        stk.append(stk[-2])
+
+    def _rawdrop(self):
+        del self.__stack__[-1]
+
+    def _rawnip(self):
+        del self.__stack__[-2]
 
     def neg(self):
         """( x -- -x )
-        push the inverse sign of x
-        on strings, reverses the string"""
+        push the inverse sign of x (of each element, for an array)
+        on strings, reverses the string (lazily, for a Rope)"""
         x = self.pop()
         if isnum(x):
             self.push(signflip(x))
+        elif isinstance(x, ARRAY):
+            self.push(mouseArray.negate(x))
+        elif isinstance(x, Rope):
+            self.push(x.reverse())
+        elif isstr(x) and self.ropes and len(x) >= self.ropemin:
+            self.push(Rope(x, "", True))
         elif isstr(x) or isarr(x):
             self.push(x[::-1])
         else:
             self.nosuchop("dmd", [x, None])
 
+    # packed numeric arrays (see mouseArray)
+
+    def pack(self):
+        """( ? n -- a )
+        pop a count, then that many numbers, and push them as an array"""
+        n = self.pop()
+        if isnone(n):
+            return
+        if not isnum(n) or not math.isfinite(n) or n < 0:
+            self.log("need a count of numbers to pack, not " + repr(n), 1)
+            return
+        stk = self.__stack__
+        n = int(n)
+        if len(stk) < n:
+            self.error("stackunderflow")
+            return
+        items = stk[len(stk) - n:]
+        if not all(map(isnum, items)):
+            self.log("can only pack numbers into an array", 1)
+            return
+        del stk[len(stk) - n:]
+        self.push(mouseArray.new(items))
+
+    def explode(self):
+        """( a -- ? )
+        pop an array; push each of its elements, then how many there were"""
+        x = self.pop()
+        if isnone(x):
+            return
+        if not isinstance(x, ARRAY):
+            self.log("can't explode a " + repr(type(x)).split("'")[1], 1)
+            return
+        self.__stack__.extend(x)
+        self.push(len(x))
+
+    def total(self):
+        """( a -- n )
+        push the sum of an array's elements"""
+        x = self.pop()
+        if isnone(x):
+            return
+        if not isinstance(x, ARRAY):
+            self.log("can't sum a " + repr(type(x)).split("'")[1], 1)
+            return
+        self.push(mouseArray.total(x))
+
+    def iota(self):
+        """( n -- a )
+        push the array 0, 1 ... n-1"""
+        n = self.pop()
+        if isnone(n):
+            return
+        if not isnum(n) or not math.isfinite(n) or n < 0:
+            self.log("need a length for an array, not " + repr(n), 1)
+            return
+        self.push(mouseArray.iota(int(n)))
+
     # here ends math and begins actual stack operations
     # all of these should be type-agnostic
 
@@ -468,6 +580,7 @@ class Stack(object):
 
     # i/o
 
+    @_io
     def put(self, *args, **kwds):
         """( x -- )
         pops the top of the stack and prints/executes"""
@@ -480,10 +593,11 @@ class Stack(object):
             del length
         del x
 
+    @_io
     def emit(self, *args, **kwds):
         """( x -- )
         pops the top of the stack and prints that unicode char"""
-        x = self.pop()  # type: Union[str, int]
+        x = unrope(self.pop())  # type: Union[str, int]
         try:
             x = int(x)
         except TypeError:
@@ -496,11 +610,13 @@ class Stack(object):
             del length
         del x
 
+    @_io
     def get(self):
         """push a string from stdin until a newline is found"""
         x = input()
         self.push(x)
 
+    @_io
     def get_exact(self):
         """( x -- y )
         get exactly x bytes of stdin, and push them as a string"""
@@ -513,6 +629,7 @@ class Stack(object):
         from input_constrain import thismany
         self.push(thismany(x))
 
+    @_io
     def get_until(self):
         """( x -- y )
         get stdin until the character with codepoint x is read, pushing to y"""
@@ -526,8 +643,236 @@ class Stack(object):
 
     # prints a "presentable" representation of the stack
 
+    @_io
     def reveal(self):
         """prints the entire stack, pleasantly"""
         stack = self.inspect()
         peek = repr(stack)
         sys.stdout.write("<{}> {}".format(len(stack), peek[1:len(peek) - 1]))
+
+
+# type-pair dispatch for the binary operators.
+# BINOPS maps (operator name, type(x), type(y)) to a handler(stack, x, y)
+# which pushes the result, so an operator picks its behaviour with one dict
+# lookup instead of walking a chain of isstr/isnum tests.
+# it's filled in below, at import; user code can add to it (or override it)
+# with the binop decorator, e.g. to teach + about lists:
+#
+#   @mouseStack.binop("add", (list, list))
+#   def add_lists(stk, x, y):
+#       stk.push(x + y)
+
+BINOPS = {}  # type: Dict[Tuple[str, type, type], Callable]
+
+NUMTYPES = (int, float)
+
+NUMPAIRS = tuple((a, b) for a in NUMTYPES for b in NUMTYPES)
+
+STRNUM = tuple((str, t) for t in NUMTYPES)
+
+NUMSTR = tuple((t, str) for t in NUMTYPES)
+
+
+# operators with unchecked twins that go through BINOPS, and the BINOPS
+# name the fused dup and swap operators run
+UNCHECKED_BINOPS = frozenset(("add", "sub", "mlt", "dmd", "flr", "lss", "gtr", "equ"))
+
+UNCHECKED_DUPOPS = {"dupadd": "add", "dupmlt": "mlt"}
+
+UNCHECKED_SWAPOPS = {"swapsub": "sub", "swaplss": "lss", "swapgtr": "gtr"}
+
+
+def binop(name, *pairs):
+    """register the decorated handler for operator name on each (xtype, ytype)"""
+    def register(handler):
+        for xtype, ytype in pairs:
+            BINOPS[name, xtype, ytype] = handler
+        return handler
+    return register
+
+
+@binop("add", *NUMPAIRS)
+def _add(stk, x, y):
+    stk.push(x + y)
+
+
+@binop("add", (str, str))
+def _add_str(stk, x, y):
+    if stk.ropes and len(x) + len(y) >= stk.ropemin:
+        stk.push(Rope(x, y))
+    else:
+        stk.push(x + y)
+
+
+@binop("add", (Rope, str), (str, Rope), (Rope, Rope))
+def _add_rope(stk, x, y):
+    stk.push(Rope(x, y))
+
+
+@binop("add", *STRNUM + NUMSTR)
+def _add_strnum(stk, x, y):
+    cr_x, cr_y = numify(x), numify(y)
+    if cr_x is NOTNUM or cr_y is NOTNUM:
+        # one of the operands can't be numified
+        stk.push(str(x) + str(y))
+    else:
+        stk.push(float(cr_x) + float(cr_y))
+
+
+@binop("sub", *NUMPAIRS)
+def _sub(stk, x, y):
+    stk.push(x - y)
+
+
+@binop("sub", (str, str))
+def _sub_str(stk, x, y):
+    try:
+        z = stk.pop()
+    except SystemExit:
+        z = len(x)
+    if isnum(z) and int(z) > 0:
+        x = x.replace(y, "", z)
+    else:
+        x = x.replace(y, "")
+    stk.push(x)
+
+
+@binop("sub", *STRNUM)
+def _sub_strnum(stk, x, y):
+    cr_x = numify(x)
+    if cr_x is NOTNUM:
+        stk.push(x[:signflip(y)])
+    else:
+        stk.push(float(cr_x) - y)
+
+
+@binop("sub", *NUMSTR)
+def _sub_numstr(stk, x, y):
+    cr_y = numify(y)
+    if cr_y is NOTNUM:
+        stk.push(y[:signflip(x)])
+    else:
+        stk.push(float(cr_y) - x)
+
+
+# what a numeric string can start with, besides whitespace
+_NUMSTART = frozenset("+-0123456789.~")
+
+
+def _numeric(rope):
+    """whether a Rope could be a numeral, without flattening it if it can't"""
+    first = rope.first()
+    return first in _NUMSTART or first.isspace()
+
+
+@binop("sub", (Rope, int))
+def _sub_ropenum(stk, x, y):
+    if _numeric(x):
+        _sub_strnum(stk, str(x), y)
+    else:
+        stk.push(x.cut(signflip(y)))
+
+
+@binop("sub", (int, Rope))
+def _sub_numrope(stk, x, y):
+    if _numeric(y):
+        _sub_numstr(stk, x, str(y))
+    else:
+        stk.push(y.cut(signflip(x)))
+
+
+@binop("mlt", *NUMPAIRS + STRNUM + NUMSTR)
+def _mlt(stk, x, y):
+    stk.push(x * y)
+
+
+@binop("mlt", (str, str))
+def _mlt_str(stk, x, y):
+    # interleave, stopping at the end of the shorter string
+    n = min(len(x), len(y))
+    woven = [None] * (n * 2)
+    woven[0::2] = x[:n]
+    woven[1::2] = y[:n]
+    stk.push("".join(woven))
+
+
+@binop("dmd", *NUMPAIRS)
+def _dmd(stk, x, y):
+    try:
+        stk.pushn([x % y, x / y])
+    except ZeroDivisionError:
+        stk.error("zerodiv")
+
+
+@binop("flr", *NUMPAIRS)
+def _flr(stk, x, y):
+    try:
+        stk.push(x // y)
+    except ZeroDivisionError:
+        stk.error("zerodiv")
+
+
+# arrays work element by element, against each other or against a number
+
+ARRAYPAIRS = (
+    ((ARRAY, ARRAY),)
+    + tuple((ARRAY, t) for t in NUMTYPES)
+    + tuple((t, ARRAY) for t in NUMTYPES)
+)
+
+
+def _elementwise(name):
+    def handler(stk, x, y):
+        stk.push(mouseArray.elementwise(name, x, y))
+    return handler
+
+
+@binop("dmd", *ARRAYPAIRS)
+def _dmd_array(stk, x, y):
+    try:
+        stk.pushn(mouseArray.divmod_(x, y))
+    except ZeroDivisionError:
+        stk.error("zerodiv")
+
+
+# ordering is Python's, for anything Python can order against its own kind
+
+ORDERABLE = NUMPAIRS + ((str, str), (list, list), (tuple, tuple))
+
+
+@binop("lss", *ORDERABLE)
+def _lss(stk, x, y):
+    stk.push(bool2int(x < y))
+
+
+@binop("gtr", *ORDERABLE)
+def _gtr(stk, x, y):
+    stk.push(bool2int(x > y))
+
+
+@binop("equ", *NUMPAIRS, (str, str))
+def _equ(stk, x, y):
+    stk.push(bool2int(x == y))
+
+
+@binop("equ", *NUMSTR)
+def _equ_numstr(stk, x, y):
+    cr_y = numify(y)
+    if cr_y is NOTNUM:
+        stk.push(bool2int(str(x) == y))
+    else:
+        stk.push(bool2int(float(x) == float(cr_y)))
+
+
+@binop("equ", *STRNUM)
+def _equ_strnum(stk, x, y):
+    cr_x = numify(x)
+    if cr_x is NOTNUM:
+        stk.push(bool2int(strsum(x) == y))
+    else:
+        stk.push(bool2int(float(cr_x) == float(y)))
+
+
+# registered last, so an array operand always goes element by element
+for _name in ("add", "sub", "mlt", "lss", "gtr", "equ"):
+    binop(_name, *ARRAYPAIRS)(_elementwise(_name))
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+"""per-record streaming for mouse16: --each
+
+like awk, --each runs one program once for each record of its input:
+a line, or whatever comes between --sep separators. the program is compiled
+once, and again only after a run rebinds a name; each run starts from an
+empty stack holding nothing but the record:
+a number if it's a numeric literal, like awk's fields, otherwise a string. whatever the program writes goes out through one buffered
+writer, and if it leaves anything on the stack, the top is written after it,
+followed by a newline, like the top of the stack at the end of a script.
+
+records are read a chunk at a time, so a stream of any length takes as much
+memory as its longest record."""
+
+import io
+import sys
+
+from mouseClutter import *
+
+
+__all__ = [
+    "CHUNK",
+    "records",
+    "each",
+]
+
+
+# how much of the input to read at a time
+CHUNK = 1 << 16
+
+
+def records(infile, sep = "\n"):
+    """each record of the text file infile, without its separator"""
+    if sep == "\n":
+        for line in infile:
+            yield line[:-1] if line.endswith("\n") else line
+        return
+    tail = ""
+    while True:
+        chunk = infile.read(CHUNK)
+        if not len(chunk):
+            break
+        # a separator can straddle two chunks: look for it in both
+        parts = (tail + chunk).split(sep)
+        tail  = parts.pop()
+        yield from parts
+    if len(tail):
+        yield tail
+
+
+class _Buffered(io.TextIOBase):
+
+    def __init__(self, textfile):
+        """a text file collecting what's written to it, and writing it
+        to textfile CHUNK chars at a time"""
+        self.textfile = textfile
+        self.parts    = []  # type: List[str]
+        self.size     = 0   # type: int
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= CHUNK:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if len(self.parts):
+            self.textfile.write("".join(self.parts))
+            self.parts, self.size = [], 0
+        self.textfile.flush()
+
+
+def each(mouse, source, infile = None, outfile = None, sep = "\n"):
+    """run the mouse code source on mouse once for each record of infile
+    (sys.stdin by default), writing to outfile (sys.stdout by default)
+    through a buffer; how many records there were"""
+    infile  = sys.stdin if isnone(infile) else infile
+    outfile = sys.stdout if isnone(outfile) else outfile
+    prog    = mouse.compile(source)
+    out     = _Buffered(outfile)
+    count   = 0
+    saved, sys.stdout = sys.stdout, out
+    try:
+        for record in records(infile, sep):
+            # (not kept between runs: ~ trades the two stacks' lists)
+            del mouse._retstk.__stack__[:]
+            value = numify(record)
+            mouse._stack.__stack__[:] = [record if value is NOTNUM else value]
+            if prog.version != mouse.funcdict.version:
+                # something was rebound since it was compiled: recompile it
+                # now, rather than again in mouse.run for every record
+                prog = mouse.compile(source)
+            mouse.run(prog)
+            stk = mouse._stack.__stack__
+            if len(stk):
+                out.write(str(stk[-1]))
+                out.write("\n")
+            count += 1
+    finally:
+        sys.stdout = saved
+        out.flush()
+    return count
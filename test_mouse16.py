@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+"""tests for ¶ comments: python -m pytest
+
+the tests of the rest are in the test_*.py for each module. here, as
+there, check runs each program with and without the peephole pass, and it
+has to leave the stack worked out by hand in both, with the same warnings"""
+
+import pytest
+
+import mouseExec
+
+from mouseCompile import OPNAMES
+
+
+def opnames(source):
+    """the names of the opcodes source compiles to, peephole pass and all"""
+    prog = mouseExec.Mouse().compile(source)
+    return [OPNAMES[opcode] for opcode, _ in prog.code]
+
+
+# ¶ comments
+
+@pytest.mark.parametrize("source, stack", [
+    ("1 ¶ 2 3 ¶ 4",                [1, 4]),
+    ("¶ one\n1 2+\n¶ two\n3",      [3, 3]),
+    ("  ¶ indented\n5",            [5]),
+    # a ¶ in a string literal doesn't end the comment
+    ('1 ¶ "x¶y" ¶ 2',              [1, 2]),
+    # nor start one
+    ('"a¶b" 1',                    ["a¶b", 1]),
+])
+def test_comment_skipped(source, stack, check):
+    check(source, stack)
+
+
+def test_comment_compiles_to_nothing():
+    assert opnames("1 ¶ 2 3 + ¶ 4") == ["LIT", "LIT"]
+    assert opnames("¶ one\n¶ two\n") == []
+
+
+def test_unclosed_comment_warns(check):
+    check("1 2 ¶ 3", [1, 2], ["found EOF before the end of the comment at char 5"])
+
+
+def test_goto_into_comment_goes_on_after_it(check):
+    # 6 is inside the comment: carry on from the 4
+    check("6 \\ ¶ 1 ¶ 4", [4])
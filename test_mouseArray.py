@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+
+"""tests for packed arrays (mouseArray, and the operators on them in
+mouseStack): python -m pytest"""
+
+import array
+
+import pytest
+
+
+def test_pack_and_explode(check):
+    check("1 2 3 3 ⊂", [array.array("d", [1, 2, 3])])
+    check("3 ⍳ ⊃", [0.0, 1.0, 2.0, 3])
+
+
+def test_iota(check):
+    check("4 ⍳", [array.array("d", [0, 1, 2, 3])])
+    check("4 ⍳ Σ", [6.0])
+
+
+# "1e999" 0 + is inf, and inf inf - nan: numbers, but not counts
+
+@pytest.mark.parametrize("count", ['"1e999" 0 +', '"1e999" 0 + $ -', "2 _", '"x"'])
+def test_pack_needs_a_count(check, count):
+    check("1 " + count + " ⊂", [1], ["need a count of numbers to pack"])
+
+
+@pytest.mark.parametrize("count", ['"1e999" 0 +', '"1e999" 0 + $ -', "2 _", '"x"'])
+def test_iota_needs_a_length(check, count):
+    check(count + " ⍳", [], ["need a length for an array"])
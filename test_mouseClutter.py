@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+"""tests for mouseClutter: python -m pytest"""
+
+import pytest
+
+from mouseClutter import *
+from mouseClutter import _numify_short
+
+
+@pytest.mark.parametrize("text, num", [
+    ("0",        0),
+    ("1",        1),
+    ("-1",       -1),
+    ("+1",       1),
+    ("0012",     12),
+    (" 1 ",      1),
+    ("\n5\n",    5),
+    ("1.5",      1.5),
+    (".5",       0.5),
+    ("5.",       5.0),
+    # the locale-independent decimal point
+    ("123~5",    123.5),
+    ("1e3",      1000.0),
+    ("1E-3",     0.001),
+    ("-1.5e+2",  -150.0),
+    ("1" * 100,  int("1" * 100)),
+])
+def test_numify_accepts(text, num):
+    assert numify(text) == num
+    assert type(numify(text)) is type(num)
+
+
+@pytest.mark.parametrize("text", [
+    "", " ", "-", "+", ".", "~", "e5", "1e", "1e+", "1.2.3", "1.2~3", "1 2",
+    "0x10", "1j", "1_0", "nan", "inf", "-inf", "Infinity", "١٢", "abc", "1a",
+])
+def test_numify_rejects(text):
+    assert numify(text) is NOTNUM
+
+
+def test_numify_past_the_digit_limit():
+    # more digits than int() takes from a str: as big as a float gets
+    assert numify("9" * 5000) == float("inf")
+
+
+@pytest.mark.parametrize("obj", [5, 2.5, -0.0])
+def test_numify_numbers_are_themselves(obj):
+    assert numify(obj) is obj
+
+
+@pytest.mark.parametrize("obj", [None, True, [1], b"1"])
+def test_numify_non_strings_rejected(obj):
+    assert numify(obj) is NOTNUM
+
+
+def test_numify_caches_short_strings_only():
+    numify("12")
+    before = _numify_short.cache_info()
+    assert numify("12") == 12
+    assert _numify_short.cache_info().hits == before.hits + 1
+    text = "1" * (NUMCACHEMAX + 1)
+    assert numify(text) == numify(text) == int(text)
+    assert _numify_short.cache_info().currsize == before.currsize
+
+
+def test_coer_num():
+    assert coer("12", "num") == 12.0 and type(coer("12", "num")) is float
+    with pytest.raises(ValueError):
+        coer("nan", "num")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+"""tests for mouseCompile: python -m pytest"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import mouseExec
+
+from mouseCompile import BLOCK, JUMP, WHILE, effect
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# every module imports first, in a fresh interpreter, without going round
+# in circles through mouse16
+
+@pytest.mark.parametrize("module", [
+    "mouseCompile", "mouseRegistry", "mouseJit", "mouseDump", "mouseMetrics",
+    "mouseMemprof", "mouseStack", "mouseExec", "mouseLib", "mouseStream",
+    "mouseParallel", "mouseServe", "mouse16",
+])
+def test_imports_alone(module):
+    subprocess.run(
+        [sys.executable, "-c", "import " + module], cwd=HERE, check=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+# ( ) loops
+
+def test_loop_compiles_to_a_back_edge():
+    code = mouseExec.Mouse(optimize=False).compile("3$(1-$)").code
+    assert code[2][0] == WHILE
+    assert code[-1] == (JUMP, 2)
+    assert code[2][1][0] == len(code)
+
+
+@pytest.mark.parametrize("source, stack", [
+    ("0 5$(%1+%1-$)",   [5, 0]),
+    ("0 150$(%^+%1-$)", [11325, 0]),
+    # a loop that never goes round
+    ("7 0(1)",          [7]),
+    # nested: three times round, twice round each time
+    ("0 3$(~ 2$(~ % 1+ % ~ 1-$) ~ 1-$)", [6, 0]),
+])
+def test_loop(check, source, stack):
+    check(source, stack)
+
+
+def test_loop_iterations_counted():
+    mouse = mouseExec.Mouse(optimize=False)
+    prog  = mouse.compile("0 150$(%1+%1-$)")
+    mouse.run(prog)
+    assert list(prog.iterations) == [150]
+
+
+# BLOCKs, and the stack effects they're worked out from
+
+@pytest.mark.parametrize("glyph, need, delta", [
+    ("+", 2, -1),
+    # the items on the left it leaves alone aren't needed
+    ("$", 1, 1),
+    ("^", 2, 1),
+    ("&", 3, 0),
+    ("-", 2, -1),
+])
+def test_effect(glyph, need, delta):
+    assert effect(mouseExec.Mouse().funcdict[glyph][0]) == (need, delta)
+
+
+def test_block_runs_in_a_loop():
+    # one item on the stack is all 1 + $ 10 < needs
+    mouse = mouseExec.Mouse()
+    prog  = mouse.compile("0 1 ( 1 + $ 10 < )")
+    assert any(opcode == BLOCK for opcode, _ in prog.code)
+    mouse.run(prog)
+    assert mouse._stack.inspect() == [10]
+    assert mouse.metrics.blocked > 0
+
+
+def test_block_too_shallow_runs_checked(check):
+    assert mouseExec.Mouse().compile("1 +").code[0][0] == BLOCK
+    check("1 +", [], ["stack underflow"])
+
+
+def test_block_underflow_midway_runs_checked(check):
+    # int / str leaves nothing, which dmd's stack effect doesn't say:
+    # the unchecked + underflows, and the checked one takes over
+    assert mouseExec.Mouse().compile('1 "ab" / +').code[0][0] == BLOCK
+    check('1 "ab" / +', [], ["undefined operator", "stack underflow"])
+
+
+# \ into spans the peephole pass rewrote
+
+def test_goto_into_folded_span(check):
+    # 13 is the +, folded into 1 2 + 4 * -> 12
+    source = "5 5 13 \\ 1 2 + 4 *"
+    assert mouseExec.Mouse().compile(source).map.pc(13) is None
+    check(source, [40])
+
+
+def test_goto_into_fused_span(check):
+    # 13 is the +, fused with the $ before it
+    source = "3 4 13 \\ 7 $ +"
+    assert mouseExec.Mouse().compile(source).map.pc(13) is None
+    check(source, [7])
+
+
+def test_goto_into_literal_warns(check):
+    check('5 \\ "abc" 1', ["abc", 1], ["can't _goto 5: it's inside a literal"])
+
+
+# nested quotations, lexed without recursing
+
+def test_deeply_nested_quotations(run):
+    left, caught = run("{" * 2000 + "1" + "}" * 2000)
+    assert len(left) == 1 and not len(caught)
+
+
+def test_nested_quotation_compiled_in():
+    mouse = mouseExec.Mouse()
+    mouse.execute(list("{{{2 3*}`1+}`}`"))
+    assert mouse._stack.inspect() == [7]
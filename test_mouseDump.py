@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+"""tests for mouseDump: python -m pytest"""
+
+import io
+import math
+
+import pytest
+
+import mouseArray
+import mouseDump
+import mouseExec
+
+from mouseCompile import Quotation
+from mouseRope import Rope
+
+
+def dumped(main, ret = ()):
+    """the dump of an interpreter with main and ret on its stacks"""
+    mouse = mouseExec.Mouse()
+    mouse._stack.__stack__[:]  = main
+    mouse._retstk.__stack__[:] = ret
+    binfile = io.BytesIO()
+    mouseDump.dump(mouse, binfile)
+    return binfile.getvalue()
+
+
+def loaded(data):
+    """the stacks of a fresh interpreter that's loaded data"""
+    mouse = mouseExec.Mouse()
+    mouseDump.load(mouse, data)
+    return mouse._stack.inspect(), mouse._retstk.inspect()
+
+
+@pytest.mark.parametrize("item", [
+    0, 1, -1, 63, -64, 64, 2 ** 100, -(2 ** 100),
+    0.5, -2.25, float("inf"), 1e-300,
+    "", "abc", "¶¦¨ ünïcode", "x" * 1000,
+    None,
+])
+def test_item_round_trips(item):
+    main, ret = loaded(dumped([item], [item, 7]))
+    assert main == [item] and ret == [item, 7]
+    assert type(main[0]) is type(item)
+
+
+def test_nan_round_trips():
+    main, _ = loaded(dumped([float("nan")]))
+    assert math.isnan(main[0])
+
+
+def test_rope_is_flattened():
+    main, _ = loaded(dumped([Rope("ab" * 10, "cd" * 10)]))
+    assert main == ["ab" * 10 + "cd" * 10] and type(main[0]) is str
+
+
+def test_arrays_round_trip():
+    # after a string, so the array's data has to be padded to 8 bytes
+    arrays = [mouseArray.new([]), mouseArray.new([1.5, -2, 1e300]), mouseArray.iota(100)]
+    main, _ = loaded(dumped(["abc"] + arrays))
+    assert main == ["abc"] + arrays
+    assert all(type(arr) is type(arrays[0]) for arr in main[1:])
+
+
+def test_quotation_round_trips_and_runs():
+    mouse = mouseExec.Mouse()
+    mouse.execute(list("{2 3*} 4"))
+    binfile = io.BytesIO()
+    mouseDump.dump(mouse, binfile)
+    main, _ = loaded(binfile.getvalue())
+    assert isinstance(main[0], Quotation) and main[0].source == "2 3*"
+    again = mouseExec.Mouse()
+    mouseDump.load(again, binfile.getvalue())
+    again.execute(list("%`"))
+    assert again._stack.inspect() == [4, 6]
+
+
+def test_unknown_type_not_dumped():
+    with pytest.raises(TypeError):
+        dumped([object()])
+
+
+# what isn't a whole dump leaves the stacks as they were
+
+def test_every_truncation_rejected():
+    data = dumped([1, -2.5, "str", mouseArray.iota(3)], ["ret", None])
+    for end in range(len(data)):
+        mouse = mouseExec.Mouse()
+        mouse._stack.__stack__[:] = ["kept"]
+        with pytest.raises(ValueError):
+            mouseDump.load(mouse, data[:end])
+        assert mouse._stack.inspect() == ["kept"], end
+
+
+def test_corrupt_dumps_rejected():
+    data = dumped(["abc", 5])
+    magic = len(mouseDump.MAGIC)
+    corrupt = [
+        b"not a dump at all",
+        # a tag that isn't one
+        data[:magic + 1] + b"z" + data[magic + 2:],
+        # a string that isn't UTF-8
+        data[:magic] + b"\x01s\x02\xff\xfe\x00",
+        # a count far past the end
+        data[:magic] + b"\xff\xff\xff\x7f",
+    ]
+    for bad in corrupt:
+        with pytest.raises(ValueError):
+            loaded(bad)
+
+
+def test_files(tmp_path):
+    path = str(tmp_path / "stacks.dump")
+    mouse = mouseExec.Mouse()
+    mouse.execute(list('1 "two" 3 ⍳'))
+    mouseDump.dump_file(mouse, path)
+    again = mouseExec.Mouse()
+    mouseDump.load_file(again, path)
+    assert again._stack.inspect() == mouse._stack.inspect()
+
+
+def test_empty_file_rejected(tmp_path):
+    path = tmp_path / "empty.dump"
+    path.write_bytes(b"")
+    with pytest.raises(ValueError):
+        mouseDump.load_file(mouseExec.Mouse(), str(path))
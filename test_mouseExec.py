@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+"""tests for mouseExec: python -m pytest"""
+
+import pytest
+
+import mouseExec
+
+
+# : words, and recompiling after them
+
+def test_word_defined_after_use_is_compiled_in(check):
+    # g is lexed before it's defined: the rest recompiles once it is
+    check('{5} "g" : g', [5])
+
+
+def test_word_redefined(check):
+    check('{5} "g" : g {6} "g" : g', [5, 6])
+    check('{1+} "f" : 0 f {2+} "f" : f', [3])
+
+
+def test_builtin_rebound_mid_program(check):
+    check('{ - } "+" : 5 3 +', [2])
+
+
+def test_redefined_word_in_loop(check):
+    check('{1+} "f" : 0 3$(%f%1-$) {10+} "f" : % f', [0, 13])
+
+
+def test_rebinding_that_relexes_what_ran(check):
+    # once ":b" is a word, :b lexes as one token, straddling the : that
+    # defined it: the recompiled program goes on after it
+    check('{1}":b":b', [])
+    check('{1}":b":b :b', [1])
+
+
+# named stacks
+
+def test_move_to_and_from_a_named_stack(check):
+    check('1 2 3 2 "s" » 9 2 "s" «', [1, 9, 2, 3])
+
+
+@pytest.mark.parametrize("source", [
+    '"x" 1 »',
+    # inf, which is a number but not a count
+    '"1e999" 0 + "s" »',
+    '"1e999" 0 + _ "s" «',
+])
+def test_move_needs_a_count(check, source):
+    check(source, [], ["can't move"])
+
+
+# \ gotos
+
+def test_goto_cached_target_in_loop(check):
+    # the same \ to the ), over the 9, each time round
+    check("0 3$(%1+%1-$ 19 \\ 9)", [3, 0])
+
+
+def test_goto_target_cached():
+    mouse = mouseExec.Mouse()
+    mouse.execute(list("0 3$(%1+%1-$ 19 \\ 9)"))
+    # checked the first time round, and cached for the other two
+    assert (mouse.metrics.gotomisses, mouse.metrics.gotohits) == (1, 2)
+
+
+# the caches of compiled ` strings and !!PY!! code
+
+def test_string_compiled_once():
+    mouse = mouseExec.Mouse()
+    mouse.execute(list('0 5$(%"1+"`%1-$)'))
+    assert mouse._stack.inspect() == [5, 0]
+    assert (mouse.metrics.strmisses, mouse.metrics.strhits) == (1, 4)
+
+
+def test_python_compiled_once_and_its_namespace_kept():
+    mouse = mouseExec.Mouse()
+    mouse.execute(list(
+        '"!!PY!!n = 0" ` 0 5$("!!PY!!n += 1" ` 1-$) "!!PY!!stack.push(n)" `'
+    ))
+    assert mouse._stack.inspect() == [0, 0, 5]
+    assert (mouse.metrics.pymisses, mouse.metrics.pyhits) == (3, 4)
+
+
+def test_python_cache_drops_the_least_recent(monkeypatch):
+    monkeypatch.setattr(mouseExec, "PYCACHE", 2)
+    mouse = mouseExec.Mouse()
+    for source in ("a = 1", "b = 2", "a = 1", "c = 3", "a = 1", "b = 2"):
+        mouse._compile_python(source)
+    # b went when c came in, a having been run since
+    assert list(mouse._python) == ["a = 1", "b = 2"]
+    assert (mouse.metrics.pymisses, mouse.metrics.pyhits) == (4, 2)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+"""tests for mouseJit: python -m pytest"""
+
+import pytest
+
+import mouseExec
+
+from mouseCompile import JIT
+
+
+# compiled after 3 times round, so that even short loops are
+JIT_ON = [{"jit": True, "jithot": 3}, {"jit": True, "jithot": 3, "optimize": False}]
+
+
+@pytest.mark.parametrize("source", [
+    "0 150$(%^+%1-$)",
+    "1 20$(%2*%1-$)",
+    # the sum of the squares
+    "0 30$($$*&+%1-$)",
+    "100 0(1-$)",
+    # a float, and a negative literal
+    "0.5 30$(%.25_+%1-$)",
+    # a loop that prints, whose BLOCKs are compiled instead
+    "0 10$(%1+$!%1-$)",
+    # nested loops
+    "0 5$(~ 10$(~ % 1+ % ~ 1-$) ~ 1-$)",
+])
+def test_same_as_without(run, source):
+    expected = run(source)
+    for kwds in JIT_ON:
+        assert run(source, **kwds) == expected, kwds
+
+
+def test_loop_compiled():
+    mouse = mouseExec.Mouse(jit=True, jithot=3)
+    prog  = mouse.compile("0 150$(%^+%1-$)")
+    mouse.run(prog)
+    assert mouse._stack.inspect() == [11325, 0]
+    assert any(opcode == JIT for opcode, _ in prog.code)
+    assert mouse.metrics.jitted > 0
+    assert sum(prog.iterations) == 150
+
+
+def test_not_compiled_without_jit():
+    mouse = mouseExec.Mouse(jithot=3)
+    prog  = mouse.compile("0 150$(%^+%1-$)")
+    mouse.run(prog)
+    assert not any(opcode == JIT for opcode, _ in prog.code)
+    assert mouse.metrics.jitted == 0
+
+
+def test_falls_back_on_plain_after_rebinding():
+    mouse = mouseExec.Mouse(jit=True, jithot=3)
+    prog  = mouse.compile("0 150$(%^+%1-$)")
+    mouse.run(prog)
+    jitted = mouse.metrics.jitted
+    # rebinding a word bumps the funcdict's version: the region was
+    # compiled against the old one, so it mustn't run
+    mouse.execute(list('{1} "w" :'))
+    mouse._stack.clean()
+    mouse.run(prog)
+    assert mouse._stack.inspect() == [11325, 0]
+    assert mouse.metrics.jitted == jitted
+    assert not any(opcode == JIT for opcode, _ in prog.plain.code)
+
+
+def test_falls_back_on_plain_for_non_numbers():
+    left = []
+    for kwds in ({}, {"jit": True, "jithot": 3}):
+        mouse = mouseExec.Mouse(**kwds)
+        prog  = mouse.compile("5$(%1+%1-$)")
+        mouse._stack.push(0)
+        mouse.run(prog)
+        # the region takes what's under the counter: a string, this time
+        mouse._stack.clean()
+        mouse._stack.push("x")
+        mouse.run(prog)
+        left.append(mouse._stack.inspect())
+    assert any(opcode == JIT for opcode, _ in prog.code)
+    assert prog.plain is not prog
+    assert left[0] == left[1]
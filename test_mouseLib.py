@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+"""tests for mouseLib: python -m pytest"""
+
+import gc
+import os
+import weakref
+
+import pytest
+
+import mouseExec
+import mouseLib
+
+from mouseCompile import Quotation
+from mouseRope import Rope
+
+
+@pytest.fixture
+def library(tmp_path):
+    """the path of a library defining sq, and leaving 7 and {1+}"""
+    path = tmp_path / "lib.mouse"
+    path.write_text('{$*} "sq" : 7 {1+}')
+    yield str(path)
+    mouseLib.forget(str(path))
+
+
+def test_words_and_exports_installed(library):
+    mouse = mouseExec.Mouse()
+    mouse.load_library(library)
+    # run the {1+} on the 7, and square that
+    mouse.execute(list("` sq"))
+    assert mouse._stack.inspect() == [64]
+
+
+def test_each_interpreter_gets_its_own_quotations(library):
+    one, two = mouseExec.Mouse(), mouseExec.Mouse()
+    one.load_library(library)
+    two.load_library(library)
+    assert one.words["sq"].body is not two.words["sq"].body
+    assert one._stack.inspect()[1] is not two._stack.inspect()[1]
+    assert isinstance(one._stack.inspect()[1], Quotation)
+
+
+def test_interpreter_collected_after_calling_a_library_word(library):
+    mouse = mouseExec.Mouse()
+    mouse.load_library(library)
+    mouse.execute(list("3 sq"))
+    # the word's code is bound to the interpreter's stack, if not to it
+    gone = weakref.ref(mouse), weakref.ref(mouse._stack)
+    del mouse
+    gc.collect()
+    assert gone[0]() is None and gone[1]() is None
+
+
+def test_library_runs_with_the_loaders_options(tmp_path):
+    path = tmp_path / "join.mouse"
+    path.write_text('"' + "a" * 20 + '" "' + "b" * 20 + '" %+')
+    try:
+        plain = mouseExec.Mouse()
+        plain.load_library(str(path))
+        roped = mouseExec.Mouse(ropes=True, ropemin=16)
+        roped.load_library(str(path))
+        assert type(plain._stack.inspect()[0]) is str
+        assert isinstance(roped._stack.inspect()[0], Rope)
+    finally:
+        mouseLib.forget(str(path))
+
+
+# the cache, by path and modification time
+
+def test_unchanged_library_not_run_again(library):
+    assert mouseLib.load(library) is mouseLib.load(library)
+    mouse = mouseExec.Mouse()
+    assert mouse.load_library(library) is mouseLib.load(library, mouse)
+
+
+def test_edited_library_run_again(library):
+    first = mouseLib.load(library)
+    with open(library, "w") as filio:
+        filio.write("8")
+    # a second on, however coarse the file system's clock is
+    stamp = os.stat(library).st_mtime_ns + 10 ** 9
+    os.utime(library, ns=(stamp, stamp))
+    again = mouseLib.load(library)
+    assert again is not first and again.exports == (8,)
+    assert mouseLib.load(library) is again
+
+
+def test_forget(library):
+    first = mouseLib.load(library)
+    mouseLib.forget(library)
+    assert mouseLib.load(library) is not first
+    mouseLib.forget()
+    assert not mouseLib._CACHE
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+"""tests for mouseMemprof: python -m pytest"""
+
+import io
+import tracemalloc
+
+import pytest
+
+import mouseExec
+
+from mouseCompile import BLOCK, NOP, OP
+
+
+@pytest.fixture
+def profiled():
+    """a Mouse measuring what it allocates, without the peephole pass (which
+    would fold away what's measured), stopped after the test"""
+    mouse = mouseExec.Mouse(optimize=False, memprofile=True)
+    yield mouse
+    mouse.memprofile.stop()
+
+
+def by_token(mouse):
+    return {row[0]: row[1:] for row in mouse.memprofile.table("token")}
+
+
+def test_same_results_as_without(run):
+    source = '"ab" 3 * 1 2+ {2 3+}` 0 5$(%1+%1-$)'
+    expected = run(source)
+    try:
+        for kwds in ({"memprofile": True}, {"memprofile": True, "optimize": False}):
+            assert run(source, **kwds) == expected, kwds
+    finally:
+        tracemalloc.stop()
+
+
+def test_what_an_operator_keeps_is_its_net(profiled):
+    profiled.execute(list('"ab" 50000 *'))
+    runs, peak, net = by_token(profiled)["*"]
+    assert runs == 1
+    assert net >= 100000 and peak >= net
+
+
+def test_runs_counted_per_site(profiled):
+    profiled.execute(list("1 1+ 1+ 1+"))
+    assert by_token(profiled)["+"][0] == 3
+    sites = [row for row in profiled.memprofile.table("site") if row[0][2] == "+"]
+    assert len(sites) == 3 and all(row[1] == 1 for row in sites)
+
+
+def test_quotation_bodies_measured(profiled):
+    profiled.execute(list("{2 3+}`"))
+    assert by_token(profiled)["+"][0] == 1
+    # placed where the + is in the source around the { }
+    (site,) = [row[0] for row in profiled.memprofile.table("site") if row[0][2] == "+"]
+    assert site[1] == 4
+
+
+def test_blocks_not_run_unmeasured():
+    mouse = mouseExec.Mouse(memprofile=True)
+    try:
+        prog = mouse.compile("1 2 $ $ + + +")
+        assert all(opcode != BLOCK for opcode, _ in prog.code)
+        assert prog.code[0][0] == NOP
+    finally:
+        mouse.memprofile.stop()
+
+
+def test_nothing_rewritten_without_a_profile():
+    mouse = mouseExec.Mouse(optimize=False)
+    assert mouse.memprofile is None
+    assert mouse.compile("1 2+").code[2] == (OP, mouse._stack.add)
+
+
+def test_report(profiled):
+    profiled.execute(list('"ab" 50000 * 1 2+'))
+    textfile = io.StringIO()
+    profiled.memprofile.report(top=2, textfile=textfile)
+    text = textfile.getvalue()
+    assert "allocations by operator:" in text
+    assert "allocations by source position:" in text
+    assert "* at line 1 char 12 of" in text
+    # two rows under each heading, besides the column names
+    assert len([line for line in text.splitlines() if line.startswith(" ")]) == 6
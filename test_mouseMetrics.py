@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+"""tests for mouseMetrics: python -m pytest"""
+
+import io
+import sys
+import warnings
+
+import mouseExec
+
+
+def metrics(source, **kwds):
+    """the Metrics of a fresh Mouse(**kwds) that's run source"""
+    mouse = mouseExec.Mouse(**kwds)
+    saved = sys.stdout
+    sys.stdout = io.StringIO()
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            mouse.execute(list(source))
+    finally:
+        sys.stdout = saved
+    return mouse.metrics
+
+
+def test_counting_is_opt_in():
+    counts = metrics("1 2 +").as_dict()
+    assert "operators" not in counts and "opcodes" not in counts
+    counts = metrics("1 2 +", optimize=False, counting=True).as_dict()
+    assert counts["operators"]["+"] == 1
+
+
+def test_block_fallback_counted():
+    counted = metrics('1 "ab" / +', counting=True)
+    assert counted.blocked == 3
+    assert counted.as_dict()["operators"]["/"] == 1
+    # the BLOCK's counted without counting too
+    assert metrics('1 "ab" / +').blocked == 3
+
+
+def test_only_loop_back_edges_counted():
+    jumps = metrics("0 5$(%1+%1-$)", counting=True).as_dict()["jumps"]
+    assert jumps["loop"] == 5 and jumps["exit"] == 1
+    # ¦ glues its loop together with a JUMP back to the condition, not a )
+    counted = metrics("3 {$}{1-}¦", counting=True)
+    assert counted.as_dict()["opcodes"]["JUMP"] == 3
+    assert counted.loops == 0
+
+
+# the depth
+
+def test_depth_is_exact_when_counting():
+    source = "1 2 3 4 5 6 7 8 9 10 $ + + + + + + + + + +"
+    assert metrics(source, optimize=False, counting=True).maxstack == 11
+
+
+def test_depth_inside_block():
+    # the whole program is one BLOCK, which never stops at 6 deep
+    source = "1 2 $ $ $ $ % + + + + +"
+    assert mouseExec.Mouse().compile(source).code[0][0] == mouseExec.BLOCK
+    for kwds in ({"optimize": False, "counting": True}, {"optimize": True}):
+        assert metrics(source, **kwds).maxstack == 6, kwds
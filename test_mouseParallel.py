@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+"""tests for mouseParallel and ¨: python -m pytest"""
+
+import array
+
+import pytest
+
+import mouseExec
+import mouseParallel
+
+
+@pytest.fixture(params=[1, 2], ids=["in-process", "pool"])
+def workers(request):
+    """how many workers to map with: 1 maps in this process, 2 in a pool"""
+    yield request.param
+    mouseParallel.shutdown()
+
+
+def test_map(check, workers):
+    check(
+        "7 ⍳ {$*1+} ¨", [array.array("d", [1, 2, 5, 10, 17, 26, 37])],
+        modes=[{"workers": workers, "chunksize": 2}],
+    )
+    assert bool(mouseParallel._POOLS) == (workers > 1)
+
+
+def test_map_a_string_of_code(check, workers):
+    check('3 ⍳ "2*" ¨', [array.array("d", [0, 2, 4])], modes=[{"workers": workers}])
+
+
+def test_map_with_the_callers_words(check, workers):
+    check('{$*} "sq" : 4 ⍳ {sq} ¨', [array.array("d", [0, 1, 4, 9])],
+          modes=[{"workers": workers, "chunksize": 1}])
+
+
+def test_map_of_an_empty_array(check, workers):
+    check("0 ⍳ {1+} ¨", [array.array("d")], modes=[{"workers": workers}])
+
+
+def test_map_leaving_a_non_number(check, workers):
+    check('3 ⍳ {"a"} ¨', [], ["the map of '\"a\"' left something besides numbers"],
+          modes=[{"workers": workers}])
+
+
+def test_map_over_a_non_array(check):
+    check("1 {1} ¨", [], ["can't map over a int"])
+
+
+def test_pmap_keeps_the_order(workers):
+    mouse = mouseExec.Mouse()
+    arr   = array.array("d", range(100))
+    out   = mouseParallel.pmap(mouse, "_", arr, workers, 7)
+    assert out == [-x for x in range(100)]
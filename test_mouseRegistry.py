@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+"""tests for mouseRegistry: python -m pytest"""
+
+import mouseExec
+
+from mouseClutter import nop
+from mouseRegistry import Registry
+
+
+def test_reverse_index_follows_bindings():
+    table = Registry({"a": (nop, ()), "b": (nop, ()), "c": (len, ())})
+    assert table.names(nop) == ("a", "b") and table.name(len) == "c"
+    table["a"] = (len, ())
+    assert table.names(nop) == ("b",) and table.names(len) == ("c", "a")
+    del table["b"]
+    assert table.name(nop) is None and "b" not in table
+    assert len(table) == 2
+
+
+def test_every_change_bumps_the_version():
+    table = Registry({"a": (nop, ())})
+    assert table.version == 0
+    table["b"] = (nop, ())
+    table["a"] = (len, ())
+    del table["b"]
+    assert table.version == 3
+
+
+def test_cache_rebuilt_after_a_change():
+    table = Registry({"a": (nop, ())})
+    built = []
+    build = lambda: built.append(1) or len(built)
+    assert table.cache("key", build) == table.cache("key", build) == 1
+    table["b"] = (nop, ())
+    assert table.cache("key", build) == 2
+
+
+def test_effect_and_doc():
+    mouse = mouseExec.Mouse()
+    assert mouse.funcdict.effect("+") == (2, -1)
+    assert mouse.funcdict.doc("+").lstrip().startswith("( y x -- x+y )")
+    assert any(name == "+" for name, _, _ in mouse.funcdict.listing())
+
+
+# what's compiled against a binding is compiled again once it changes
+
+def test_rebinding_recompiles_quotations():
+    mouse = mouseExec.Mouse()
+    quot  = mouse._quote("5 3 +")
+    prog  = quot.program(mouse)
+    assert quot.program(mouse) is prog
+    mouse.execute(list('{ - } "+" :'))
+    assert prog.version != mouse.funcdict.version
+    again = quot.program(mouse)
+    assert again is not prog and again.version == mouse.funcdict.version
+    mouse.run(again)
+    assert mouse._stack.inspect() == [2]
+
+
+def test_rebinding_recompiles_words_calling_it(check):
+    # sum is compiled calling +; once + is -, so does sum
+    check('{ + } "sum" : 5 3 sum { - } "+" : 5 3 sum', [8, 2])
+
+
+def test_rebinding_recompiles_the_rest_of_the_program():
+    mouse = mouseExec.Mouse()
+    compiled = []
+    compile_ = mouse.compile
+    mouse.compile = lambda source: compiled.append(source) or compile_(source)
+    source = '5 3 + { * } "+" : 5 3 +'
+    mouse.execute(list(source))
+    assert mouse._stack.inspect() == [8, 15]
+    # once to start with, and once after the :
+    assert compiled.count(source) == 2
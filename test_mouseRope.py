@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+"""tests for mouseRope: python -m pytest"""
+
+import copy
+
+import pytest
+
+from mouseRope import Rope, unrope
+
+
+def ropes():
+    """(rope, the str it stands for) pairs, some flattened already"""
+    cases = [
+        (Rope("abc", "def"), "abcdef"),
+        (Rope("", "xyz"), "xyz"),
+        (Rope("xyz"), "xyz"),
+        (Rope(Rope("ab", "cd"), Rope("ef", "gh")), "abcdefgh"),
+        (Rope("abc", "def").reverse(), "fedcba"),
+        (Rope(Rope("ab", "cd").reverse(), "ef"), "dcbaef"),
+        (Rope(Rope("ab", "cd"), "ef").reverse().reverse(), "abcdef"),
+        (Rope("", ""), ""),
+    ]
+    flat = Rope(Rope("12", "34"), "56")
+    str(flat.left)
+    cases.append((flat, "123456"))
+    cases.append((Rope(flat, "78").reverse(), "87654321"))
+    return cases
+
+
+@pytest.mark.parametrize("rope, text", ropes())
+def test_flatten(rope, text):
+    assert len(rope) == len(text)
+    assert str(rope) == text and str(rope) == text  # and once it's kept
+    assert rope == text and text == rope and hash(rope) == hash(text)
+
+
+@pytest.mark.parametrize("rope, text", ropes())
+def test_first(rope, text):
+    assert rope.first() == text[:1]
+
+
+@pytest.mark.parametrize("rope, text", ropes())
+def test_cut(rope, text):
+    for stop in range(-len(text) - 1, len(text) + 2):
+        assert str(rope.cut(stop)) == text[:stop], stop
+
+
+def test_cut_shares_the_pieces_before_it():
+    left = Rope("a" * 10, "b" * 10)
+    cut  = Rope(left, "c" * 10).cut(25)
+    assert cut.left is left and str(cut) == "a" * 10 + "b" * 10 + "ccccc"
+
+
+def test_concat_of_ropes():
+    rope = Rope("", "")
+    for n in range(50):
+        rope = Rope(rope, str(n))
+    assert str(rope) == "".join(map(str, range(50)))
+    assert Rope(rope, rope) == str(rope) * 2
+
+
+def test_deep_rope_flattened_without_recursing():
+    rope = Rope("")
+    for _ in range(100000):
+        rope = Rope(rope, "x").reverse()
+    assert str(rope) == "x" * 100000
+    assert rope.first() == "x"
+
+
+def test_copies_are_itself():
+    rope = Rope("ab", "cd")
+    assert copy.copy(rope) is rope and copy.deepcopy(rope) is rope
+
+
+def test_unrope():
+    assert unrope(Rope("ab", "cd")) == "abcd" and type(unrope(Rope("ab"))) is str
+    assert unrope("ab") == "ab" and unrope(5) == 5
+
+
+# what the interpreter does with them
+
+@pytest.mark.parametrize("source", [
+    '"' + "a" * 20 + '" "' + "b" * 20 + '" %+',
+    '"' + "a" * 20 + '" "' + "b" * 20 + '" %+ _',
+    '"' + "a" * 20 + '" 5$(% "bc" + % 1-$)',
+])
+def test_same_as_without(run, source):
+    expected = run(source)
+    roped = run(source, ropes=True, ropemin=16)
+    assert roped == expected
+    assert any(isinstance(item, Rope) for item in roped[0])
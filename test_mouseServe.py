@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+"""tests for mouseServe and mouseClient: python -m pytest"""
+
+import io
+import os
+import stat
+import subprocess
+import sys
+import time
+
+import pytest
+
+import mouseClient
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(scope="module")
+def daemon(tmp_path_factory):
+    """the socket path of a daemon with two workers, serving until the
+    tests are done"""
+    path = str(tmp_path_factory.mktemp("serve") / "mouse16.sock")
+    proc = subprocess.Popen(
+        [sys.executable, "-c", "import mouseServe; mouseServe.serve(%r, 2)" % path],
+        cwd=HERE, stderr=subprocess.DEVNULL,
+    )
+    try:
+        for _ in range(200):
+            if os.path.exists(path):
+                break
+            time.sleep(0.05)
+        else:
+            pytest.fail("the daemon never listened")
+        yield path
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+def request(daemon, **kwds):
+    """(exit status, stdout, stderr) of a request to daemon"""
+    out, err = io.BytesIO(), io.BytesIO()
+    status = mouseClient.run(sockpath=daemon, out=out, err=err, **kwds)
+    return status, out.getvalue(), err.getvalue()
+
+
+def test_script_round_trip(daemon):
+    assert request(daemon, script="1 2+!") == (0, b"3", b"")
+
+
+def test_script_reads_stdin(daemon):
+    assert request(daemon, script="?1+!", stdin=b"41\n") == (0, b"42.0", b"")
+
+
+def test_script_at_a_path(daemon, tmp_path):
+    path = tmp_path / "script.mou"
+    path.write_text('"hi"!')
+    assert request(daemon, path=str(path)) == (0, b"hi", b"")
+
+
+def test_exit_status_comes_back(daemon):
+    status, _, _ = request(daemon, script='"!!PY!!exit(3)"`')
+    assert status == 3
+
+
+def test_unreadable_script_is_status_2(daemon):
+    status, out, err = request(daemon, path="/nonexistent/script.mou")
+    assert status == 2 and out == b""
+    assert err.startswith(b"mouse16: can't read")
+
+
+def test_warnings_go_to_stderr(daemon):
+    status, _, err = request(daemon, script="+")
+    assert status == 0 and b"stack underflow" in err
+
+
+def test_requests_dont_see_each_other(daemon):
+    assert request(daemon, script='{7} "w" : 1 2 3')[0] == 0
+    # every request starts from the worker's untouched interpreter
+    look = '"!!PY!!print(len(stack.__stack__), \'w\' in mouse.funcdict)"`'
+    for _ in range(3):
+        assert request(daemon, script=look) == (0, b"0 False\n", b"")
+
+
+def test_socket_is_private(daemon):
+    assert stat.S_IMODE(os.stat(daemon).st_mode) == 0o600
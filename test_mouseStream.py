@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+
+"""tests for mouseStream: python -m pytest"""
+
+import io
+
+import mouseExec
+import mouseStream
+
+
+def test_each_runs_once_per_record():
+    out = io.StringIO()
+    count = mouseStream.each(
+        mouseExec.Mouse(), "2*", io.StringIO("1\n2\n3\n"), out
+    )
+    assert count == 3
+    assert out.getvalue().split() == ["2", "4", "6"]
+
+
+def test_each_recompiles_once_after_rebinding():
+    mouse = mouseExec.Mouse()
+    compiled = []
+    compile_ = mouse.compile
+
+    def counted(source):
+        compiled.append(source)
+        return compile_(source)
+
+    mouse.compile = counted
+    out = io.StringIO()
+    count = mouseStream.each(
+        mouse, '{1+} "inc" : inc', io.StringIO("1\n2\n3\n4\n5\n"), out
+    )
+    assert count == 5
+    assert out.getvalue().split() == ["2", "3", "4", "5", "6"]
+    assert compiled.count('{1+} "inc" : inc') <= 3